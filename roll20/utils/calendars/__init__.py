@@ -0,0 +1,34 @@
+# -*- coding: UTF-8 -*-
+#
+# Calendar calculations and rendering for the Inner Sea and Imperium calendars.
+#
+# Importing the package does no work beyond building the lookup tables for the
+# calendars that are used. The command line scripts in the parent directory are
+# thin wrappers around these modules:
+#
+#   system   - Table driven engine that both calendars are defined in.
+#   innersea - Inner Sea dates and moon phases.
+#   imperium - Imperium dates.
+#   imperialdates - Fast parsing and formatting of ddd-yyyy Imperial dates.
+#   batch    - Vectorised Inner Sea conversions, using NumPy if available.
+#   convert  - Conversion between Inner Sea, Imperium and Gregorian dates.
+#   timeline - Indexed campaign events, shown on rendered calendars.
+#   search   - Finding days by weekday, moon, month and leap year.
+#   query    - Answering many Inner Sea date queries at once, for --batch.
+#   render   - DokuWiki and HTML output for both calendars.
+#   ics      - iCalendar export, with recurring events.
+#   export   - Rendering ranges of years in parallel.
+#   cache    - On-disk cache of rendered months.
+#   images   - Resizing, caching and inlining of month images.
+#   ephemeris - Precomputed binary Inner Sea day data, read with mmap.
+#   jstables - Inner Sea lookup tables as JavaScript, for Roll20 API scripts.
+#   celestial - Several moons: batched phases, conjunctions and night brightness.
+#   benchmark - Timing of the hot paths, with saved baselines.
+#   profiling - Per stage timings and call counts, for --profile.
+#   service  - Local HTTP service for calendar data, and loadtest for it.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
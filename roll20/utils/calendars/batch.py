@@ -0,0 +1,66 @@
+# -*- coding: UTF-8 -*-
+#
+# Batch versions of the Inner Sea date and moon phase calculations, for
+# converting large numbers of days at once. Uses NumPy if it is installed,
+# otherwise falls back to plain Python lists.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+from . import innersea
+from .innersea import CYCLE_LENGTH, CYCLE_TABLE, LEAP_YEAR, LUNAR_CYCLE, YEAR_LENGTH
+from .innersea import MONTH_OFFSETS, LEAP_OFFSETS, MOON_CYCLE_PHASE
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+if (numpy is not None):
+    CYCLE_ARRAY = numpy.array(CYCLE_TABLE, dtype=numpy.int64)
+    OFFSETS_ARRAY = numpy.array([ MONTH_OFFSETS, LEAP_OFFSETS ], dtype=numpy.int64)
+    MOON_CYCLE_ARRAY = numpy.array(MOON_CYCLE_PHASE, dtype=numpy.int64)
+
+# Batch version of getDate() for any number of epoc days. Returns a tuple of
+# (years, months, days, days of week, moon phase indexes). If NumPy is
+# available, these are arrays computed in a single vectorised pass, otherwise
+# they are lists.
+def batchDates(epocDays):
+    if (numpy is None):
+        years, months, days, weekdays, phases = [], [], [], [], []
+        for epocDay in epocDays:
+            year, month, day, weekday = innersea.getDate(epocDay)
+            years.append(year)
+            months.append(month)
+            days.append(day)
+            weekdays.append(weekday)
+            phases.append(MOON_CYCLE_PHASE[epocDay % LUNAR_CYCLE])
+        return (years, months, days, weekdays, phases)
+
+    epocDays = numpy.asarray(epocDays, dtype=numpy.int64)
+    cycle, cycleDay = numpy.divmod(epocDays - 1, CYCLE_LENGTH)
+    dates = CYCLE_ARRAY[cycleDay]
+
+    return (cycle * LEAP_YEAR + dates[:, 0], dates[:, 1], dates[:, 2],
+            (epocDays - 1) % 7 + 1, MOON_CYCLE_ARRAY[epocDays % LUNAR_CYCLE])
+
+# Batch version of getEpocDay(), taking equal length sequences of days, months
+# and years. Returns an array if NumPy is available, otherwise a list.
+def batchEpocDays(days, months, years):
+    if (numpy is None):
+        return [ innersea.getEpocDay(d, m, y) for d, m, y in zip(days, months, years) ]
+
+    days = numpy.asarray(days, dtype=numpy.int64)
+    months = numpy.asarray(months, dtype=numpy.int64)
+    years = numpy.asarray(years, dtype=numpy.int64)
+    isLeapYear = (years % LEAP_YEAR == 0).astype(numpy.int64)
+
+    return YEAR_LENGTH * (years - 1) + (years - 1) // LEAP_YEAR + OFFSETS_ARRAY[isLeapYear, months - 1] + days
+
+# Batch conversion of dates straight to (years, months, days, days of week,
+# moon phase indexes), as for batchDates().
+def batchDatesFromDays(days, months, years):
+    return batchDates(batchEpocDays(days, months, years))
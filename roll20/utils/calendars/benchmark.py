@@ -0,0 +1,191 @@
+# -*- coding: UTF-8 -*-
+#
+# Benchmarks for the calendar calculations and rendering. Each benchmark is
+# run over 1, 100 and 10000 years by default, and the best time of several
+# runs is kept. Results can be saved as a JSON baseline, and later runs
+# compared against it to catch anything that has got slower.
+#
+# Usage:
+#   python3 -m calendars.benchmark --save baseline.json
+#   python3 -m calendars.benchmark --compare baseline.json --threshold 0.2
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import argparse
+import functools
+import json
+import platform
+import sys
+import time
+
+from . import convert
+from . import imperialdates
+from . import imperium
+from . import innersea
+from . import render
+
+FIRST_YEAR = 4700
+IMPERIUM_FIRST_YEAR = 1100
+SCALES = [ 1, 100, 10000 ]
+
+# Empties every cache, so that each run does the full amount of work.
+def clearCaches():
+    innersea.getNamedMoonsOfYear.cache_clear()
+    innersea.getYearLayout.cache_clear()
+
+def benchEpocDay(years):
+    getEpocDay = innersea.getEpocDay
+    for year in range(FIRST_YEAR, FIRST_YEAR + years):
+        cal = innersea.LEAP_DAYS if (year % 8) == 0 else innersea.MONTH_DAYS
+        for month in range(1, 13):
+            for day in range(1, cal[month - 1] + 1):
+                getEpocDay(day, month, year)
+
+def benchYear(years):
+    getYear = innersea.getYear
+    for epocDay in range(innersea.getEpocDay(1, 1, FIRST_YEAR), innersea.getEpocDay(1, 1, FIRST_YEAR + years)):
+        getYear(epocDay)
+
+def benchMoonPhaseIndex(years):
+    getMoonPhaseIndex = innersea.getMoonPhaseIndex
+    for year in range(FIRST_YEAR, FIRST_YEAR + years):
+        cal = innersea.LEAP_DAYS if (year % 8) == 0 else innersea.MONTH_DAYS
+        for month in range(1, 13):
+            for day in range(1, cal[month - 1] + 1):
+                getMoonPhaseIndex(day, month, year)
+
+def benchMoonsOfYear(years):
+    for year in range(FIRST_YEAR, FIRST_YEAR + years):
+        innersea.getMoonsOfYear(year)
+
+def benchDokuWiki(years):
+    for year in range(FIRST_YEAR, FIRST_YEAR + years):
+        for month in range(1, 13):
+            render.innerSeaCalendar(month, year)
+
+def benchHTML(years):
+    for year in range(FIRST_YEAR, FIRST_YEAR + years):
+        for month in range(1, 13):
+            render.innerSeaCalendar(month, year, html=True)
+
+def benchImperium(years):
+    for year in range(IMPERIUM_FIRST_YEAR, IMPERIUM_FIRST_YEAR + years):
+        for month in range(1, 14):
+            render.imperiumCalendar(month, year=year)
+
+def benchConvert(years):
+    start = convert.toAbsolute("innersea", 1, 1, FIRST_YEAR)
+    days = range(start, start + years * innersea.YEAR_LENGTH)
+    convert.batchConvert(*reversed(convert.batchFromAbsolute("innersea", days)), fromCalendar="innersea", toCalendar="gregorian")
+
+# A Traveller style log with a line for each week of the given number of
+# years, each holding a ddd-yyyy date, about 3MB per 1000 years. Kept
+# between runs, so only the first run pays for building it.
+@functools.lru_cache(maxsize=4)
+def getSampleLog(years):
+    lines = []
+    first = imperium.SYSTEM.getYearStart(IMPERIUM_FIRST_YEAR)
+    for epocDay in range(first, imperium.SYSTEM.getYearStart(IMPERIUM_FIRST_YEAR + years), 7):
+        lines.append("Jump-2 to Efate on %s, 40 tons of fuel, crew of %d.\n" %
+                     (imperialdates.formatEpocDay(epocDay), epocDay % 9 + 1))
+    return "".join(lines)
+
+def benchImperialParse(years):
+    log = getSampleLog(years)
+    describeDay = imperialdates.describeDay
+    for offset, dayInYear, year in imperialdates.findDates(log):
+        describeDay(dayInYear)
+
+def benchImperialFormat(years):
+    formatEpocDay = imperialdates.formatEpocDay
+    first = imperium.SYSTEM.getYearStart(IMPERIUM_FIRST_YEAR)
+    for epocDay in range(first, imperium.SYSTEM.getYearStart(IMPERIUM_FIRST_YEAR + years)):
+        formatEpocDay(epocDay)
+
+BENCHMARKS = [ ("getEpocDay", benchEpocDay),
+               ("getYear", benchYear),
+               ("getMoonPhaseIndex", benchMoonPhaseIndex),
+               ("getMoonsOfYear", benchMoonsOfYear),
+               ("convert-batch", benchConvert),
+               ("calendar-dokuwiki", benchDokuWiki),
+               ("calendar-html", benchHTML),
+               ("imperium-calendar", benchImperium),
+               ("imperial-parse", benchImperialParse),
+               ("imperial-format", benchImperialFormat) ]
+
+# Runs every benchmark at every scale, and returns a dictionary of the best
+# time in seconds for each, keyed by "name/years".
+def runBenchmarks(scales=SCALES, repeat=3, only=None, out=None):
+    results = {}
+    for name, function in BENCHMARKS:
+        if (only and name not in only):
+            continue
+        for years in scales:
+            best = None
+            for r in range(0, repeat):
+                clearCaches()
+                start = time.perf_counter()
+                function(years)
+                elapsed = time.perf_counter() - start
+                if (best is None or elapsed < best):
+                    best = elapsed
+            results[name + "/" + str(years)] = best
+            if (out):
+                out.write("%-30s %12.6fs\n" % (name + "/" + str(years), best))
+    return results
+
+# Compares results against a baseline. Returns a list of messages for each
+# benchmark that is more than threshold (e.g. 0.2 for 20%) slower. Anything
+# that took less than minTime seconds in the baseline is too noisy to judge,
+# so is skipped.
+def findRegressions(results, baseline, threshold, minTime=0.001):
+    regressions = []
+    for key in sorted(results):
+        if (key not in baseline or baseline[key] < minTime):
+            continue
+        if (results[key] > baseline[key] * (1 + threshold)):
+            regressions.append("%s: %.6fs, baseline %.6fs (+%.0f%%)" %
+                               (key, results[key], baseline[key], 100 * (results[key] / baseline[key] - 1)))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the calendar calculations and rendering.")
+    parser.add_argument("--scales", default=",".join(str(s) for s in SCALES),
+                        help="Comma separated numbers of years to run each benchmark over.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs to take the best of.")
+    parser.add_argument("--only", action="append", help="Only run this benchmark. May be repeated.")
+    parser.add_argument("--save", metavar="FILE", help="Save the results as a JSON baseline.")
+    parser.add_argument("--compare", metavar="FILE", help="Compare the results with a JSON baseline.")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Fraction slower than the baseline that counts as a regression.")
+    parser.add_argument("--min-time", dest="minTime", type=float, default=0.001,
+                        help="Ignore benchmarks that took less than this many seconds in the baseline.")
+    args = parser.parse_args(argv)
+
+    scales = [ int(s) for s in args.scales.split(",") ]
+    results = runBenchmarks(scales, args.repeat, args.only, sys.stdout)
+
+    if (args.save):
+        with open(args.save, "w") as f:
+            json.dump({ "python": platform.python_version(), "results": results }, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    if (args.compare):
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = findRegressions(results, baseline, args.threshold, args.minTime)
+        for regression in regressions:
+            print("SLOWER " + regression)
+        if (regressions):
+            return 1
+        print("No regressions over " + str(int(args.threshold * 100)) + "%")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+# -*- coding: UTF-8 -*-
+#
+# An on-disk cache of rendered months, so that rebuilding a long almanac only
+# renders the months that have changed. Each month is stored in a file named
+# by a hash of everything that goes into it: the calendar, year, month,
+# format, images path, any events in the month, and the source of the
+# modules that do the rendering, so that changing the code or its constants
+# never gives stale output.
+#
+# The cache is limited in size. When it grows too large, the least recently
+# used months are deleted. Files are touched when they are read, so this
+# carries over between runs.
+#
+# The limit is enforced by each process on its own. A worker process only
+# counts what was in the cache when it started plus what it has written
+# itself, so when several workers share a directory it can end up larger
+# than the limit by as much as the other workers wrote. The next process to
+# write to it trims it back down.
+#
+# A cache can be shared by threads rendering at the same time. The index and
+# the counts are only changed while holding the cache's lock, and since every
+# file is written under a temporary name and renamed, readers never see part
+# of one.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import collections
+import hashlib
+import os
+import tempfile
+import threading
+
+# Default limit on the size of the cache, in bytes.
+MAX_BYTES = 100 * 1024 * 1024
+
+# Modules whose source affects the rendered output.
+CODE_MODULES = [ "system.py", "innersea.py", "imperium.py", "render.py", "cache.py", "images.py", "timeline.py" ]
+
+CODE_HASH = None
+
+# Returns a hash of the source of the rendering modules, worked out once.
+def getCodeHash():
+    global CODE_HASH
+    if (CODE_HASH is None):
+        digest = hashlib.sha256()
+        directory = os.path.dirname(os.path.abspath(__file__))
+        for name in CODE_MODULES:
+            with open(os.path.join(directory, name), "rb") as f:
+                digest.update(f.read())
+        CODE_HASH = digest.hexdigest()
+    return CODE_HASH
+
+class FragmentCache(object):
+    def __init__(self, directory, maxBytes=MAX_BYTES):
+        self.directory = directory
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+        self.entries = None
+        self.totalBytes = 0
+        self.lock = threading.Lock()
+
+    # Pickles without the index of files or the lock, which each process
+    # makes for itself.
+    def __getstate__(self):
+        return (self.directory, self.maxBytes)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    # Returns the key for a month. events is a list of the events in the month.
+    def getKey(self, calendar, year, month, html, images, events=None):
+        digest = hashlib.sha256(getCodeHash().encode("ascii"))
+        digest.update(repr((calendar, year, month, bool(html), images)).encode("utf-8"))
+        for event in events or []:
+            digest.update(repr((event.start, event.end, event.title)).encode("utf-8"))
+        return digest.hexdigest()
+
+    def getPath(self, key):
+        return os.path.join(self.directory, key[:2], key[2:] + ".txt")
+
+    # Reads the sizes of everything already in the cache, oldest first.
+    def loadIndex(self):
+        files = []
+        if (os.path.isdir(self.directory)):
+            for sub in os.scandir(self.directory):
+                if (not sub.is_dir()):
+                    continue
+                for entry in os.scandir(sub.path):
+                    if (entry.name.endswith(".txt")):
+                        stat = entry.stat()
+                        files.append((stat.st_mtime, entry.path, stat.st_size))
+        files.sort()
+        self.entries = collections.OrderedDict((path, size) for mtime, path, size in files)
+        self.totalBytes = sum(self.entries.values())
+
+    # Returns the cached text for a key, or None if it isn't there.
+    def get(self, key):
+        with self.lock:
+            if (self.entries is None):
+                self.loadIndex()
+        path = self.getPath(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+            os.utime(path)
+        except OSError:
+            with self.lock:
+                self.misses += 1
+            return None
+
+        with self.lock:
+            if (path in self.entries):
+                self.entries.move_to_end(path)
+            self.hits += 1
+        return text
+
+    # Stores the text for a key, then removes old entries if the cache has
+    # grown too big. The file is written under a temporary name and renamed,
+    # so that other processes never see half a file.
+    def put(self, key, text):
+        with self.lock:
+            if (self.entries is None):
+                self.loadIndex()
+        path = self.getPath(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = text.encode("utf-8")
+        handle, tempPath = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(handle, "wb") as f:
+            f.write(data)
+        os.replace(tempPath, path)
+
+        with self.lock:
+            self.totalBytes += len(data) - self.entries.pop(path, 0)
+            self.entries[path] = len(data)
+            while self.totalBytes > self.maxBytes and len(self.entries) > 1:
+                oldPath, size = self.entries.popitem(last=False)
+                self.totalBytes -= size
+                try:
+                    os.remove(oldPath)
+                except OSError:
+                    pass
+
+    # Returns the rendered month for a key, calling render() to produce it
+    # if it isn't already cached.
+    def fetch(self, key, render):
+        text = self.get(key)
+        if (text is None):
+            text = render()
+            self.put(key, text)
+        return text
+
+    def getHitRate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    # Returns a one line summary of how well the cache did.
+    def getSummary(self):
+        return "Cache: %d hits, %d misses (%.1f%% hit rate)" % (self.hits, self.misses, 100 * self.getHitRate())
@@ -0,0 +1,284 @@
+# -*- coding: UTF-8 -*-
+#
+# Skies with any number of moons. The Inner Sea calendar has a single moon,
+# Somal, built from MOON_PERIOD and PHASE_LENGTH, but other settings (and many
+# Traveller worlds) have several, each with its own period.
+#
+# Each moon is reduced to a table of its phase (0 - 7, as for the Inner Sea
+# moon) for every day of its cycle, the smallest whole number of days after
+# which its phases repeat. A moon of 29.5 days repeats every 59 days, one of
+# 27.3 days every 273 days. Built from MOON_PERIOD, this gives exactly the
+# Inner Sea calendar's own phases. That makes the phases of every moon for any
+# number of days a single table lookup per moon, done as one NumPy operation
+# per moon when NumPy is installed.
+#
+# Conjunctions, such as every moon being full at once, are found from the
+# cycles rather than by checking each day. For each moon, the days of its
+# cycle on which it is in a wanted phase are known from its table, and the
+# Chinese remainder theorem combines these into the days of the combined
+# cycle on which every moon is, so a search jumps straight from one
+# conjunction to the next however long the combined cycle is.
+#
+# The brightness of the night is the total of each moon's BRIGHTNESS for its
+# phase, scaled by how bright the moon is compared to Somal.
+#
+# Usage:
+#   python3 -m calendars.celestial --innersea --moon Bret:38.25:10 --from-year 4700 --to-year 4720
+#   python3 -m calendars.celestial --moon A:27.3 --moon B:41:5:0.5 --brightness --from-year 4707 --to-year 4707
+#   python3 -m calendars.celestial --innersea --moon Bret:38.25:10 --check
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import argparse
+import bisect
+import fractions
+import itertools
+import math
+import sys
+
+from . import batch
+from . import innersea
+
+# Largest denominator used for a period given as a decimal, so 27.32 is taken
+# as 683/25 days. Keeps the cycles, and so the tables, a sensible size.
+MAX_DENOMINATOR = 100
+
+# Fraction of the way through its period at which each phase ends, from
+# PHASE_LENGTH.
+PHASE_ENDS = [ fractions.Fraction(sum(innersea.PHASE_LENGTH[:p + 1]), sum(innersea.PHASE_LENGTH))
+               for p in range(0, len(innersea.PHASE_LENGTH)) ]
+
+class Moon(object):
+    # A moon with a table of its phase for each day of its cycle, where the
+    # phase on an epoc day is table[(epocDay - epoch) % len(table)].
+    # brightness is how bright it is compared to Somal.
+    def __init__(self, name, table, epoch=0, brightness=1):
+        self.name = name
+        self.table = list(table)
+        self.cycle = len(self.table)
+        self.epoch = epoch
+        self.brightness = brightness
+        if (batch.numpy is not None):
+            self.array = batch.numpy.array(self.table, dtype=batch.numpy.int64)
+
+    # Returns a moon with the given period in days, which is full at the
+    # start of epoch. Each phase lasts the same share of the period as it
+    # does for the Inner Sea moon.
+    @classmethod
+    def fromPeriod(cls, name, period, epoch=0, brightness=1):
+        period = fractions.Fraction(period).limit_denominator(MAX_DENOMINATOR)
+        if (period <= 1):
+            raise ValueError("The period of " + name + " must be more than a day")
+        table = []
+        for day in range(0, period.numerator):
+            age = day - math.floor(day / period) * period
+            table.append(bisect.bisect_right(PHASE_ENDS, age / period))
+        return cls(name, table, epoch, brightness)
+
+    def __repr__(self):
+        return "Moon(%r, cycle=%d, epoch=%d, brightness=%r)" % (self.name, self.cycle, self.epoch, self.brightness)
+
+    def getPhase(self, epocDay):
+        return self.table[(epocDay - self.epoch) % self.cycle]
+
+    # Returns the days of the cycle on which the moon is in one of phases.
+    def getCycleDays(self, phases):
+        return [ (d + self.epoch) % self.cycle for d, phase in enumerate(self.table) if phase in phases ]
+
+# Somal, the moon of the Inner Sea calendar.
+def getInnerSeaMoon():
+    return Moon("Somal", innersea.MOON_CYCLE_PHASE)
+
+# Returns a list of errors if a moon built from MOON_PERIOD doesn't have
+# exactly the phases of the Inner Sea calendar.
+def checkInnerSeaMoon():
+    if (Moon.fromPeriod("Somal", innersea.MOON_PERIOD).table != innersea.MOON_CYCLE_PHASE):
+        return [ "A moon with a period of " + str(innersea.MOON_PERIOD) + " days doesn't match the Inner Sea moon" ]
+    return []
+
+# Combines the residues of two cycles with the Chinese remainder theorem.
+# Returns (modulus, sorted residues) of the days which are one of residues1
+# modulo modulus1 and one of residues2 modulo modulus2. The moduli don't need
+# to be coprime.
+def combineCycles(modulus1, residues1, modulus2, residues2):
+    g = math.gcd(modulus1, modulus2)
+    modulus = modulus1 // g * modulus2
+    step = modulus1 // g
+    inverse = pow(step, -1, modulus2 // g) if modulus2 // g > 1 else 0
+    combined = []
+    for a in residues1:
+        for b in residues2:
+            if ((b - a) % g):
+                continue
+            k = ((b - a) // g * inverse) % (modulus2 // g)
+            combined.append((a + modulus1 * k) % modulus)
+    combined.sort()
+    return (modulus, combined)
+
+class Sky(object):
+    def __init__(self, moons):
+        if (not moons):
+            raise ValueError("A sky needs at least one moon")
+        self.moons = list(moons)
+
+    # Returns a list of the phase of each moon on an epoc day.
+    def getPhases(self, epocDay):
+        return [ moon.getPhase(epocDay) for moon in self.moons ]
+
+    # Returns the phases of every moon for any number of epoc days at once,
+    # as one array (or list) per moon. With NumPy, each moon is a single
+    # lookup of all the days in its table.
+    def getPhaseArrays(self, epocDays):
+        numpy = batch.numpy
+        if (numpy is None):
+            epocDays = list(epocDays)
+            return [ [ moon.table[(d - moon.epoch) % moon.cycle] for d in epocDays ] for moon in self.moons ]
+        epocDays = numpy.asarray(epocDays, dtype=numpy.int64)
+        return [ moon.array[(epocDays - moon.epoch) % moon.cycle] for moon in self.moons ]
+
+    # Returns how bright the night is on an epoc day.
+    def getBrightness(self, epocDay):
+        return sum(moon.brightness * innersea.BRIGHTNESS[moon.getPhase(epocDay)] for moon in self.moons)
+
+    # Returns the brightness of the night for any number of epoc days at once.
+    def getBrightnessArray(self, epocDays):
+        phases = self.getPhaseArrays(epocDays)
+        if (batch.numpy is None):
+            return [ sum(moon.brightness * innersea.BRIGHTNESS[p] for moon, p in zip(self.moons, day))
+                     for day in zip(*phases) ]
+        brightness = batch.numpy.array(innersea.BRIGHTNESS)
+        return sum(moon.brightness * brightness[p] for moon, p in zip(self.moons, phases))
+
+    # Returns (modulus, residues) such that the days on which every moon is in
+    # one of its wanted phases are exactly those equal to one of the residues
+    # modulo modulus. phases has a list of phases for each moon, or None for
+    # any phase.
+    def getConjunctionCycle(self, phases):
+        modulus, residues = 1, [ 0 ]
+        for moon, wanted in zip(self.moons, phases):
+            if (wanted is None):
+                continue
+            modulus, residues = combineCycles(modulus, residues, moon.cycle, moon.getCycleDays(wanted))
+            if (not residues):
+                break
+        return (modulus, residues)
+
+    # Yields every epoc day from first to last inclusive on which every moon
+    # is in one of its wanted phases, in order. If last is None, carries on
+    # for ever.
+    def findConjunctions(self, phases, first, last=None):
+        modulus, residues = self.getConjunctionCycle(phases)
+        if (not residues):
+            return
+        base = first - first % modulus
+        index = bisect.bisect_left(residues, first - base)
+        while True:
+            for residue in itertools.islice(residues, index, None):
+                epocDay = base + residue
+                if (last is not None and epocDay > last):
+                    return
+                yield epocDay
+            base += modulus
+            index = 0
+
+    # Returns the first epoc day after the given one on which every moon is in
+    # one of its wanted phases, or None if that never happens.
+    def findNextConjunction(self, phases, epocDay):
+        return next(self.findConjunctions(phases, epocDay + 1), None)
+
+    # Checks the phases, brightness and conjunctions against working them out
+    # a day at a time from first to last, and returns a list of errors.
+    def check(self, phases, first, last):
+        errors = []
+        days = range(first, last + 1)
+        arrays = self.getPhaseArrays(days)
+        brightness = self.getBrightnessArray(days)
+        for i, epocDay in enumerate(days):
+            if ([ int(a[i]) for a in arrays ] != self.getPhases(epocDay)):
+                errors.append("Epoc day %d: batched phases differ" % epocDay)
+            if (brightness[i] != self.getBrightness(epocDay)):
+                errors.append("Epoc day %d: batched brightness differs" % epocDay)
+
+        found = list(self.findConjunctions(phases, first, last))
+        expected = [ d for d in days
+                     if all(w is None or p in w for p, w in zip(self.getPhases(d), phases)) ]
+        if (found != expected):
+            errors.append("Found %d conjunctions, checking every day found %d" % (len(found), len(expected)))
+        return errors
+
+# Parses NAME:PERIOD[:EPOCH[:BRIGHTNESS]] into a Moon.
+def parseMoon(text):
+    parts = text.split(":")
+    if (len(parts) < 2 or len(parts) > 4):
+        raise ValueError("Expected a moon as NAME:PERIOD[:EPOCH[:BRIGHTNESS]], not '" + text + "'")
+    epoch = int(parts[2]) if len(parts) > 2 else 0
+    brightness = float(parts[3]) if len(parts) > 3 else 1
+    return Moon.fromPeriod(parts[0], fractions.Fraction(parts[1]), epoch, brightness)
+
+# Describes a day, e.g. "4707-3-5 Starday: Somal Full Moon, Bret Waxing Gibbous".
+def describeDay(sky, epocDay):
+    year, month, day, weekday = innersea.getDate(epocDay)
+    moons = ", ".join(moon.name + " " + innersea.MOON_PHASES[p] for moon, p in zip(sky.moons, sky.getPhases(epocDay)))
+    return "%d-%d-%d %s: %s" % (year, month, day, innersea.WEEK[weekday - 1], moons)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Phases, brightness and conjunctions of several moons.")
+    parser.add_argument("--innersea", action="store_true", default=False,
+                        help="Include Somal, the moon of the Inner Sea calendar.")
+    parser.add_argument("--moon", action="append", default=[], metavar="NAME:PERIOD[:EPOCH[:BRIGHTNESS]]",
+                        help="A moon with a period in days, full on epoc day EPOCH. May be repeated.")
+    parser.add_argument("--phase", action="append", metavar="PHASES",
+                        help="Wanted phases (0 - 7, comma separated, or * for any) of each moon in turn. " +
+                             "Without this, finds the days on which every moon is full.")
+    parser.add_argument("--brightness", action="store_true", default=False,
+                        help="List the phases and brightness of the night for each day.")
+    parser.add_argument("--from-year", dest="fromYear", type=int, default=4707, metavar="YEAR")
+    parser.add_argument("--to-year", dest="toYear", type=int, metavar="YEAR")
+    parser.add_argument("--limit", type=int, help="Stop after this many conjunctions.")
+    parser.add_argument("--check", action="store_true", default=False,
+                        help="Check against working everything out a day at a time.")
+    args = parser.parse_args(argv)
+
+    try:
+        moons = [ getInnerSeaMoon() ] if args.innersea else []
+        moons += [ parseMoon(m) for m in args.moon ]
+        sky = Sky(moons)
+        if (args.phase):
+            if (len(args.phase) != len(moons)):
+                parser.error("Give --phase once for each moon")
+            phases = [ None if p == "*" else [ int(x) for x in p.split(",") ] for p in args.phase ]
+        else:
+            phases = [ [ 0 ] ] * len(moons)
+    except ValueError as e:
+        parser.error(str(e))
+
+    toYear = args.fromYear if args.toYear is None else args.toYear
+    first = innersea.getEpocDay(1, 1, args.fromYear)
+    last = innersea.getEpocDay(31, 12, toYear)
+
+    if (args.check):
+        errors = checkInnerSeaMoon() + sky.check(phases, first, last)
+        for error in errors:
+            print(error)
+        print("Checked %d days of %d moons, %d errors." % (last - first + 1, len(moons), len(errors)))
+        return 1 if errors else 0
+
+    if (args.brightness):
+        days = range(first, last + 1)
+        for epocDay, brightness in zip(days, sky.getBrightnessArray(days)):
+            print("%s (brightness %g)" % (describeDay(sky, epocDay), brightness))
+        return 0
+
+    modulus, residues = sky.getConjunctionCycle(phases)
+    sys.stderr.write("Conjunctions repeat every %d days, %d times in each cycle.\n" % (modulus, len(residues)))
+    for epocDay in itertools.islice(sky.findConjunctions(phases, first, last), args.limit):
+        print(describeDay(sky, epocDay))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+# -*- coding: UTF-8 -*-
+#
+# Conversion between Inner Sea (Absalom Reckoning), Imperium and Gregorian
+# dates. Every date is converted through a single absolute day number, which
+# is the proleptic Gregorian ordinal used by Python's datetime.date (1 January
+# 1 AD is day 1). Each calendar has a fixed offset between its own epoc days
+# and the absolute day, so a conversion is two table driven lookups.
+#
+# The calendars are lined up as follows, which can be changed with setAnchor():
+#
+#   innersea  - 1 Abadius 4707 AR is 1 January 2007 AD, following the usual
+#               convention that Absalom Reckoning is 2700 years ahead.
+#   imperium  - Holiday (day 001) of year 0 is 1 January 4521 AD, the year the
+#               Third Imperium was founded.
+#   gregorian - Absolute days are Gregorian days.
+#
+# Dates are passed in as (day, month, year), as for getEpocDay(), and returned
+# as (year, month, day), as from getDate(). Imperium holidays have month 0.
+#
+# The batch functions take sequences of days, months and years, and use NumPy
+# if it is installed.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import datetime
+
+from . import imperium
+from . import innersea
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+SYSTEMS = { "innersea": innersea.SYSTEM, "imperium": imperium.SYSTEM }
+
+# Absolute day number of epoc day 0 for each calendar.
+OFFSETS = {}
+
+# Lines up a calendar so that the given date in it falls on the given
+# Gregorian date.
+def setAnchor(calendar, day, month, year, gregorian):
+    OFFSETS[calendar] = gregorian.toordinal() - SYSTEMS[calendar].getEpocDay(day, month, year)
+
+setAnchor("innersea", 1, 1, 4707, datetime.date(2007, 1, 1))
+setAnchor("imperium", 1, 0, 0, datetime.date(4521, 1, 1))
+
+# Returns the absolute day number of a date in the given calendar.
+def toAbsolute(calendar, day, month, year):
+    if (calendar == "gregorian"):
+        return datetime.date(year, month, day).toordinal()
+    return SYSTEMS[calendar].getEpocDay(day, month, year) + OFFSETS[calendar]
+
+# Returns (year, month, day) for an absolute day number in the given calendar.
+def fromAbsolute(calendar, absoluteDay):
+    if (calendar == "gregorian"):
+        date = datetime.date.fromordinal(absoluteDay)
+        return (date.year, date.month, date.day)
+    return SYSTEMS[calendar].getDate(absoluteDay - OFFSETS[calendar])[:3]
+
+# Returns the absolute day number of a day of the year (1 based), such as the
+# ddd of an Imperial ddd-yyyy date.
+def dayOfYearToAbsolute(calendar, dayInYear, year):
+    if (calendar == "gregorian"):
+        return datetime.date(year, 1, 1).toordinal() + dayInYear - 1
+    return SYSTEMS[calendar].getEpocDayOfYear(dayInYear, year) + OFFSETS[calendar]
+
+# Returns (year, day of year) for an absolute day number.
+def absoluteToDayOfYear(calendar, absoluteDay):
+    if (calendar == "gregorian"):
+        date = datetime.date.fromordinal(absoluteDay)
+        return (date.year, date.timetuple().tm_yday)
+    system = SYSTEMS[calendar]
+    return (system.getYear(absoluteDay - OFFSETS[calendar]), system.getDayInYear(absoluteDay - OFFSETS[calendar]))
+
+# Converts a single date from one calendar to another, returning
+# (year, month, day).
+def convert(day, month, year, fromCalendar, toCalendar):
+    return fromAbsolute(toCalendar, toAbsolute(fromCalendar, day, month, year))
+
+# Arrays for vectorised conversion, built the first time each calendar is
+# used. For each calendar, a tuple of (cycle table, start of each year in the
+# cycle, month offsets for each year in the cycle, day in year of each
+# holiday).
+ARRAYS = {}
+
+def getArrays(calendar):
+    if (calendar not in ARRAYS):
+        system = SYSTEMS[calendar]
+        ARRAYS[calendar] = (numpy.array([ entry[:3] for entry in system.cycleTable ], dtype=numpy.int64),
+                            numpy.array([ y[0] for y in system.cycleYears ], dtype=numpy.int64),
+                            numpy.array([ y[1] for y in system.cycleYears ], dtype=numpy.int64),
+                            numpy.array([ h[0] for h in system.holidays ] or [ 0 ], dtype=numpy.int64))
+    return ARRAYS[calendar]
+
+# Vectorised toAbsolute() for arrays of days, months and years.
+def arrayToAbsolute(calendar, days, months, years):
+    if (calendar == "gregorian"):
+        dates = (years - 1970).astype("datetime64[Y]") + (months - 1).astype("timedelta64[M]")
+        dates = dates.astype("datetime64[D]") + (days - 1).astype("timedelta64[D]")
+        return dates.astype(numpy.int64) + datetime.date(1970, 1, 1).toordinal()
+
+    system = SYSTEMS[calendar]
+    table, yearStarts, monthOffsets, holidays = getArrays(calendar)
+    cycle, yearInCycle = numpy.divmod(years - 1, system.leapYear)
+    epocDays = cycle * system.cycleLength + yearStarts[yearInCycle] + monthOffsets[yearInCycle, months] + days
+    if (system.holidays):
+        isHoliday = (months == 0)
+        holidayDays = cycle * system.cycleLength + yearStarts[yearInCycle] + holidays[numpy.clip(days - 1, 0, len(holidays) - 1)]
+        epocDays = numpy.where(isHoliday, holidayDays, epocDays)
+    return epocDays + OFFSETS[calendar]
+
+# Vectorised fromAbsolute(), returning arrays of (years, months, days).
+def arrayFromAbsolute(calendar, absoluteDays):
+    if (calendar == "gregorian"):
+        dates = (absoluteDays - datetime.date(1970, 1, 1).toordinal()).astype("datetime64[D]")
+        years = dates.astype("datetime64[Y]")
+        months = dates.astype("datetime64[M]")
+        return (years.astype(numpy.int64) + 1970,
+                (months - years.astype("datetime64[M]")).astype(numpy.int64) + 1,
+                (dates - months.astype("datetime64[D]")).astype(numpy.int64) + 1)
+
+    system = SYSTEMS[calendar]
+    table = getArrays(calendar)[0]
+    cycle, cycleDay = numpy.divmod(absoluteDays - OFFSETS[calendar] - 1, system.cycleLength)
+    dates = table[cycleDay]
+    return (cycle * system.leapYear + dates[:, 0], dates[:, 1], dates[:, 2])
+
+# Converts many dates at once. Takes equal length sequences of days, months
+# and years, and returns (years, months, days). These are arrays if NumPy is
+# available, otherwise lists.
+def batchConvert(days, months, years, fromCalendar, toCalendar):
+    if (numpy is None):
+        results = [ convert(d, m, y, fromCalendar, toCalendar) for d, m, y in zip(days, months, years) ]
+        return ([ r[0] for r in results ], [ r[1] for r in results ], [ r[2] for r in results ])
+
+    absoluteDays = arrayToAbsolute(fromCalendar,
+                                   numpy.asarray(days, dtype=numpy.int64),
+                                   numpy.asarray(months, dtype=numpy.int64),
+                                   numpy.asarray(years, dtype=numpy.int64))
+    return arrayFromAbsolute(toCalendar, absoluteDays)
+
+# Converts many absolute day numbers to dates in one calendar, returning
+# (years, months, days) as for batchConvert().
+def batchFromAbsolute(calendar, absoluteDays):
+    if (numpy is None):
+        results = [ fromAbsolute(calendar, a) for a in absoluteDays ]
+        return ([ r[0] for r in results ], [ r[1] for r in results ], [ r[2] for r in results ])
+
+    return arrayFromAbsolute(calendar, numpy.asarray(absoluteDays, dtype=numpy.int64))
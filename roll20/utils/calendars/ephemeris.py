@@ -0,0 +1,196 @@
+# -*- coding: UTF-8 -*-
+#
+# A precomputed binary ephemeris of the Inner Sea calendar, for long running
+# tools which need to look up lots of days. The file is built once for a span
+# of years, then opened with mmap, so that every lookup is a single read at
+# an offset in the file and nothing is loaded that isn't used.
+#
+# The file starts with a header, followed by one five byte record for each
+# epoc day in the span:
+#
+#   day of week (1 - 7), moon phase index (0 - 7),
+#   named moon (0 for none, otherwise 1 + its index in MOON_NAME),
+#   month (1 - 12), day of month (1 - 31)
+#
+# The header records a hash of the calendar's constants, so a file built
+# from different constants is refused rather than giving wrong answers.
+#
+# Usage:
+#   python3 -m calendars.ephemeris build ephemeris.bin --from-year 1 --to-year 10000
+#   python3 -m calendars.ephemeris check ephemeris.bin
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import sys
+
+from . import batch
+from . import innersea
+
+MAGIC = b"ISEPHEM1"
+
+# Magic, size of each record, first epoc day, number of days, constants hash.
+HEADER = struct.Struct("<8sHxxqq16s")
+RECORD_SIZE = 5
+
+# Number of years built at a time, so that memory use doesn't grow with the
+# span being built.
+BUILD_CHUNK = 1000
+
+# Raised when an ephemeris file can't be used.
+class EphemerisError(Exception):
+    pass
+
+# Returns a hash of everything the records are worked out from.
+def getConstantsHash():
+    constants = (innersea.MONTH_DAYS, innersea.LEAP_DAYS, innersea.LEAP_YEAR, innersea.SYSTEM.epochWeekday,
+                 innersea.MOON_CYCLE_PHASE, innersea.NAMED_MOON_DAYS, innersea.MOON_NAME)
+    return hashlib.sha256(repr(constants).encode("utf-8")).digest()[:16]
+
+# Returns the records for the epoc days first to last inclusive as bytes.
+def buildRecords(firstDay, lastDay):
+    moons = bytearray(lastDay - firstDay + 1)
+    for year in range(innersea.getYear(firstDay), innersea.getYear(lastDay) + 1):
+        for index, (day, name) in enumerate(innersea.getNamedMoonsOfYear(year)):
+            if (firstDay <= day <= lastDay):
+                moons[day - firstDay] = index + 1
+
+    years, months, days, weekdays, phases = batch.batchDates(range(firstDay, lastDay + 1))
+    if (batch.numpy is not None):
+        numpy = batch.numpy
+        columns = (weekdays, phases, numpy.frombuffer(bytes(moons), dtype=numpy.uint8), months, days)
+        return numpy.stack(columns, axis=1).astype(numpy.uint8).tobytes()
+
+    records = bytearray()
+    for record in zip(weekdays, phases, moons, months, days):
+        records += bytes(record)
+    return bytes(records)
+
+# Writes an ephemeris file covering every day from the start of firstYear to
+# the end of lastYear.
+def buildEphemeris(path, firstYear, lastYear):
+    if (lastYear < firstYear):
+        raise EphemerisError("The first year must not be after the last")
+    firstDay = innersea.getEpocDay(1, 1, firstYear)
+    lastDay = innersea.getEpocDay(31, 12, lastYear)
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, RECORD_SIZE, firstDay, lastDay - firstDay + 1, getConstantsHash()))
+        for year in range(firstYear, lastYear + 1, BUILD_CHUNK):
+            chunkLast = min(year + BUILD_CHUNK - 1, lastYear)
+            f.write(buildRecords(innersea.getEpocDay(1, 1, year), innersea.getEpocDay(31, 12, chunkLast)))
+
+class Ephemeris(object):
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            if (os.fstat(f.fileno()).st_size < HEADER.size):
+                raise EphemerisError(path + " is not an ephemeris file")
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, recordSize, self.firstDay, self.days, constantsHash = HEADER.unpack_from(self.map, 0)
+        error = None
+        if (magic != MAGIC or recordSize != RECORD_SIZE):
+            error = " is not an ephemeris file"
+        elif (constantsHash != getConstantsHash()):
+            error = " was built from different calendar constants, and must be rebuilt"
+        elif (len(self.map) != HEADER.size + self.days * RECORD_SIZE):
+            error = " is truncated"
+        if (error):
+            self.map.close()
+            raise EphemerisError(path + error)
+
+        self.lastDay = self.firstDay + self.days - 1
+        # Offset in the file of epoc day 0's record, whether or not it is there.
+        self.base = HEADER.size - self.firstDay * RECORD_SIZE
+
+    def close(self):
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+    # Returns the record for an epoc day, as a tuple of (day of week, moon
+    # phase index, named moon, month, day of month).
+    def getRecord(self, epocDay):
+        if (epocDay < self.firstDay or epocDay > self.lastDay):
+            raise IndexError("Epoc day " + str(epocDay) + " is outside the ephemeris")
+        offset = self.base + epocDay * RECORD_SIZE
+        return tuple(self.map[offset:offset + RECORD_SIZE])
+
+    def getEpocDayOfWeek(self, epocDay):
+        return self.getRecord(epocDay)[0]
+
+    def getEpocMoonPhaseIndex(self, epocDay):
+        return self.getRecord(epocDay)[1]
+
+    # Returns the name of the named moon on a day, or None.
+    def getNamedMoon(self, epocDay):
+        moon = self.getRecord(epocDay)[2]
+        return innersea.MOON_NAME[moon - 1] if moon else None
+
+    def getMoonPhaseIndex(self, day, month, year):
+        return self.getRecord(innersea.getEpocDay(day, month, year))[1]
+
+    # Checks every step'th day against the live calculations, and returns a
+    # list of errors.
+    def check(self, step=1):
+        errors = []
+        moons = {}
+        for epocDay in range(self.firstDay, self.lastDay + 1, step):
+            weekday, phase, moon, month, day = self.getRecord(epocDay)
+            year = innersea.getYear(epocDay)
+            if (year not in moons):
+                moons = { year: innersea.getMoonsOfYear(year) }
+            name = moons[year].get(epocDay)
+            expected = (innersea.getEpocDayOfWeek(epocDay), innersea.getEpocMoonPhaseIndex(epocDay),
+                        name, innersea.getMonthInYear(epocDay), innersea.getDayInMonth(epocDay))
+            found = (weekday, phase, innersea.MOON_NAME[moon - 1] if moon else None, month, day)
+            if (found != expected):
+                errors.append("Epoc day " + str(epocDay) + ": expected " + str(expected) + ", found " + str(found))
+        return errors
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and check binary Inner Sea ephemeris files.")
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    build = commands.add_parser("build", help="Build an ephemeris file.")
+    build.add_argument("file")
+    build.add_argument("--from-year", dest="fromYear", type=int, default=1, metavar="YEAR")
+    build.add_argument("--to-year", dest="toYear", type=int, default=10000, metavar="YEAR")
+
+    check = commands.add_parser("check", help="Check an ephemeris file against the live calculations.")
+    check.add_argument("file")
+    check.add_argument("--step", type=int, default=1, help="Only check every STEP'th day.")
+
+    args = parser.parse_args(argv)
+
+    try:
+        if (args.command == "build"):
+            buildEphemeris(args.file, args.fromYear, args.toYear)
+        with Ephemeris(args.file) as ephemeris:
+            errors = ephemeris.check(args.step if args.command == "check" else 97)
+    except (OSError, EphemerisError) as e:
+        print(e)
+        return 2
+
+    for error in errors:
+        print(error)
+    print("Checked %s: %d days from %d to %d, %d errors." %
+          (args.file, ephemeris.days, ephemeris.firstDay, ephemeris.lastDay, len(errors)))
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+# -*- coding: UTF-8 -*-
+#
+# Exports a range of years, rendering the years in parallel worker processes
+# but writing them out in order. The output is exactly the same as running
+# the calendar script once for each year and joining the results together.
+#
+# Years, or any list of months, can also be rendered by a pool of threads in
+# this process, each using the same render.RenderContext. Threads don't make
+# rendering itself any faster, since only one thread runs Python code at a
+# time, but they let a long running process (such as the calendar service)
+# render several calendars at once without the cost of starting workers, and
+# the output is always identical to rendering the same things one by one.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import collections
+import concurrent.futures
+import os
+import time
+
+from . import imperium
+from . import innersea
+from . import render
+
+PAGES = render.PAGES
+SYSTEMS = { "innersea": innersea.SYSTEM, "imperium": imperium.SYSTEM }
+
+# Number of years each worker is allowed to get ahead of the writer.
+YEARS_AHEAD = 4
+
+# Renders a whole year of a calendar as a string. Runs in a worker process.
+def renderYear(calendar, year, html=False, images=None, events=None, cache=None):
+    return "".join(PAGES[calendar](year, None, html, images, events, cache))
+
+# Renders a year using a cache, and returns (text, cache hits, cache misses)
+# so that the worker's counts can be added up by the parent process.
+def renderCachedYear(calendar, year, html, images, events, cache):
+    text = renderYear(calendar, year, html, images, events, cache)
+    return (text, cache.hits, cache.misses)
+
+# Returns just the events in a year, so that workers are only sent what they
+# need rather than the whole timeline.
+def getYearEvents(calendar, year, events):
+    if (not events):
+        return None
+    system = SYSTEMS[calendar]
+    return events.subset(system.getYearStart(year), system.getYearStart(year + 1) - 1)
+
+# Submits function(*arguments) to a pool for each tuple of arguments, and
+# yields the results in the same order. No more than ahead calls are queued
+# up at once, so memory does not grow with the number of calls.
+def mapInOrder(pool, function, arguments, ahead):
+    pending = collections.deque()
+    for args in arguments:
+        pending.append(pool.submit(function, *args))
+        if (len(pending) >= ahead):
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+# Yields the rendered text for each year from fromYear to toYear inclusive,
+# in order. Years are rendered by a pool of worker processes, or threads if
+# threads is set, with only a few years per worker queued up at a time, so
+# memory does not grow with the length of the range. If workers is 1,
+# everything is done in this thread. If a cache is given, its hit and miss
+# counts include the work done by every worker.
+def renderYears(calendar, fromYear, toYear, html=False, images=None, workers=None, events=None, cache=None,
+                threads=False):
+    if (workers is None):
+        workers = os.cpu_count() or 1
+
+    if (workers <= 1):
+        for year in range(fromYear, toYear + 1):
+            yield renderYear(calendar, year, html, images, events, cache)
+        return
+
+    if (threads):
+        yield from renderPages(render.RenderContext(calendar, html, images, events, cache),
+                               range(fromYear, toYear + 1), workers)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        ahead = workers * YEARS_AHEAD
+        if (cache is None):
+            arguments = ((calendar, year, html, images, getYearEvents(calendar, year, events))
+                         for year in range(fromYear, toYear + 1))
+            yield from mapInOrder(pool, renderYear, arguments, ahead)
+        else:
+            arguments = ((calendar, year, html, images, getYearEvents(calendar, year, events), cache)
+                         for year in range(fromYear, toYear + 1))
+            for text, hits, misses in mapInOrder(pool, renderCachedYear, arguments, ahead):
+                cache.hits += hits
+                cache.misses += misses
+                yield text
+
+# Yields the whole page for each of a list of years, rendered with a
+# RenderContext by a pool of threads, in order.
+def renderPages(context, years, workers=None):
+    workers = workers or os.cpu_count() or 1
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        yield from mapInOrder(pool, context.renderPage, ((year,) for year in years), workers * YEARS_AHEAD)
+
+# Yields each of a list of (month, year) rendered with a RenderContext by a
+# pool of threads, in order.
+def renderMonths(context, months, workers=None):
+    workers = workers or os.cpu_count() or 1
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        yield from mapInOrder(pool, context.renderMonth, months, workers * YEARS_AHEAD * context.getMonthCount())
+
+# Writes every year from fromYear to toYear to sink, and returns a tuple of
+# (number of years, seconds taken, years per second).
+def exportYears(calendar, fromYear, toYear, sink, html=False, images=None, workers=None, events=None, cache=None,
+                threads=False):
+    start = time.perf_counter()
+    render.writeFragments(renderYears(calendar, fromYear, toYear, html, images, workers, events, cache, threads), sink)
+    elapsed = time.perf_counter() - start
+
+    years = toYear - fromYear + 1
+    return (years, elapsed, years / elapsed if elapsed > 0 else 0.0)
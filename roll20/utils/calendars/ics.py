@@ -0,0 +1,275 @@
+# -*- coding: UTF-8 -*-
+#
+# Exports in-world dates as an iCalendar (.ics) file, so that they can be
+# loaded into an ordinary calendar app. Each in-world day is put on the real
+# world day it is lined up with by calendars.convert.
+#
+# The events can be named moons, the calendar's holidays, events from a
+# timeline file, and recurring events described by rules such as:
+#
+#   every Oathday
+#   every full moon
+#   first day of month 3
+#   15th day of every month
+#   last day of Kuthona
+#
+# Every source of events is a generator which works out occurrences as they
+# are needed, and the sources are merged in date order and written out as
+# they come, so exports covering decades use no more memory than one year.
+#
+# Usage:
+#   python3 -m calendars.ics --from-year 4707 --to-year 4720 --recur "every Oathday: Market day" > campaign.ics
+#   python3 -m calendars.ics --calendar imperium --from-year 1105 --to-year 1110 > imperium.ics
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import argparse
+import datetime
+import hashlib
+import heapq
+import re
+import sys
+
+from . import convert
+from . import imperium
+from . import innersea
+from . import render
+from . import timeline
+
+SYSTEMS = { "innersea": innersea.SYSTEM, "imperium": imperium.SYSTEM }
+
+PRODUCT_ID = "-//Samuel Penn//RPG Calendars//EN"
+
+# Longest line allowed by RFC 5545, in octets, before it must be folded.
+LINE_LENGTH = 75
+
+# Yields the epoc days from first to last which fall on a day of the week
+# (1 - week length). Jumps a week at a time, and corrects for any holidays
+# outside the week that were jumped over.
+def weekdayDays(system, weekday, first, last):
+    weekLength = system.weekLength
+    epocDay = first
+    while epocDay <= last:
+        found = system.getEpocDayOfWeek(epocDay)
+        if (found == weekday):
+            yield epocDay
+            epocDay += weekLength
+        elif (found == 0):
+            epocDay += 1
+        else:
+            epocDay += (weekday - found) % weekLength
+
+# Yields the epoc days from first to last on which a moon phase (0 - 7)
+# starts, jumping straight from one to the next. Inner Sea only.
+def phaseDays(phase, first, last):
+    epocDay = innersea.getNextMoonPhase(first - 1, phase)
+    while epocDay <= last:
+        yield epocDay
+        epocDay = innersea.getNextMoonPhase(epocDay, phase)
+
+# Yields a day of the month, in either the given month or every month, for
+# each year from first to last. day may be "last" for the last day of the
+# month. Months without that day are skipped.
+def monthDays(system, day, month, first, last):
+    year = system.getYear(first)
+    while system.getYearStart(year) <= last:
+        for m in ([ month ] if month else range(1, len(system.monthDays) + 1)):
+            days = system.getMonthDays(m, year)
+            d = days if day == "last" else day
+            if (d <= days):
+                epocDay = system.getEpocDay(d, m, year)
+                if (first <= epocDay <= last):
+                    yield epocDay
+        year += 1
+
+# Yields (epoc day, name) for each of the calendar's holidays.
+def holidayDays(system, first, last):
+    year = system.getYear(first)
+    while system.getYearStart(year) <= last:
+        for number, (dayInYear, name) in enumerate(system.holidays, 1):
+            epocDay = system.getEpocDay(number, 0, year)
+            if (first <= epocDay <= last):
+                yield (epocDay, name)
+        year += 1
+
+# Yields (epoc day, name) for each named moon. Inner Sea only.
+def namedMoonDays(first, last):
+    for year in range(innersea.getYear(first), innersea.getYear(last) + 1):
+        for epocDay, name in innersea.getNamedMoonsOfYear(year):
+            if (first <= epocDay <= last):
+                yield (epocDay, name + " Moon")
+
+ORDINAL = re.compile(r"^(first|last|(\d+)(st|nd|rd|th)?)$")
+EVERY = re.compile(r"^every (.+)$", re.IGNORECASE)
+DAY_OF_MONTH = re.compile(r"^(\S+) day of (?:(every month)|month (\d+)|(\w+))$", re.IGNORECASE)
+
+# Turns a rule such as "every Oathday" or "first day of month 3" into a
+# function of (first, last) which yields the epoc days it happens on.
+def parseRule(calendar, rule):
+    system = SYSTEMS[calendar]
+    text = " ".join(rule.split()).lower()
+
+    match = EVERY.match(text)
+    if (match):
+        what = match.group(1)
+        week = [ w.lower() for w in system.week ]
+        if (what in week):
+            return lambda first, last: weekdayDays(system, week.index(what) + 1, first, last)
+        phases = [ p.lower() for p in innersea.MOON_PHASES ]
+        if (calendar == "innersea" and what in phases):
+            return lambda first, last: phaseDays(phases.index(what), first, last)
+        if (what == "month"):
+            return lambda first, last: monthDays(system, 1, None, first, last)
+        raise ValueError("Don't know how to repeat every '" + what + "'")
+
+    match = DAY_OF_MONTH.match(text)
+    if (match):
+        ordinal = ORDINAL.match(match.group(1))
+        if (not ordinal):
+            raise ValueError("Expected first, last or a number of day, not '" + match.group(1) + "'")
+        day = "last" if ordinal.group(1) == "last" else 1 if ordinal.group(1) == "first" else int(ordinal.group(2))
+        if (day != "last" and day < 1):
+            raise ValueError("There is no day " + str(day) + " of a month")
+        month = None
+        if (match.group(3)):
+            month = int(match.group(3))
+        elif (match.group(4)):
+            months = [ m.lower() for m in system.months ]
+            if (match.group(4) not in months):
+                raise ValueError("Unknown month '" + match.group(4) + "'")
+            month = months.index(match.group(4)) + 1
+        if (month is not None and not 1 <= month <= len(system.monthDays)):
+            raise ValueError("There is no month " + str(month))
+        return lambda first, last: monthDays(system, day, month, first, last)
+
+    raise ValueError("Can't understand rule '" + rule + "'")
+
+# Yields (start, end, summary) for each occurrence of a rule.
+def ruleEvents(days, summary):
+    for epocDay in days:
+        yield (epocDay, epocDay, summary)
+
+# Yields (start, end, summary) for each timeline event overlapping first to
+# last.
+def timelineEvents(events, first, last):
+    for event in events.between(first, last):
+        yield (event.start, event.end, event.title)
+
+# Returns the real world date of an epoc day.
+def getGregorianDate(calendar, epocDay):
+    return datetime.date.fromordinal(epocDay + convert.OFFSETS[calendar])
+
+# Escapes text for an iCalendar property value.
+def escapeText(text):
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+# Returns a content line, folded so that no line is longer than 75 octets,
+# and ended with CRLF.
+def foldLine(line):
+    data = line.encode("utf-8")
+    if (len(data) <= LINE_LENGTH):
+        return line + "\r\n"
+    parts = []
+    current = ""
+    size = 0
+    limit = LINE_LENGTH
+    for char in line:
+        length = len(char.encode("utf-8"))
+        if (size + length > limit):
+            parts.append(current)
+            current = ""
+            size = 0
+            limit = LINE_LENGTH - 1
+        current += char
+        size += length
+    parts.append(current)
+    return "\r\n ".join(parts) + "\r\n"
+
+# Yields the text of an iCalendar file, a line at a time, for a stream of
+# (start, end, summary) events in epoc days.
+def calendarLines(calendar, events, stamp=None):
+    system = SYSTEMS[calendar]
+    if (stamp is None):
+        stamp = datetime.datetime.now(datetime.timezone.utc)
+    stampText = stamp.strftime("%Y%m%dT%H%M%SZ")
+
+    yield "BEGIN:VCALENDAR\r\n"
+    yield "VERSION:2.0\r\n"
+    yield "PRODID:" + PRODUCT_ID + "\r\n"
+    yield foldLine("X-WR-CALNAME:" + escapeText(system.name))
+    for start, end, summary in events:
+        year, month, day, weekday = system.getDate(start)
+        if (month):
+            description = "%d %s %d %s" % (day, system.months[month - 1], year, system.era)
+        else:
+            description = "%s %d %s" % (system.holidays[day - 1][1], year, system.era)
+        uid = hashlib.sha1(("%s %d %d %s" % (calendar, start, end, summary)).encode("utf-8")).hexdigest()
+
+        yield "BEGIN:VEVENT\r\n"
+        yield "UID:" + uid + "@calendars\r\n"
+        yield "DTSTAMP:" + stampText + "\r\n"
+        yield "DTSTART;VALUE=DATE:" + getGregorianDate(calendar, start).strftime("%Y%m%d") + "\r\n"
+        yield "DTEND;VALUE=DATE:" + getGregorianDate(calendar, end + 1).strftime("%Y%m%d") + "\r\n"
+        yield foldLine("SUMMARY:" + escapeText(summary))
+        yield foldLine("DESCRIPTION:" + escapeText(description))
+        yield "END:VEVENT\r\n"
+    yield "END:VCALENDAR\r\n"
+
+# Merges any number of event streams into one, in order of start day.
+def mergeEvents(sources):
+    return heapq.merge(*sources, key=lambda event: event[0])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export in-world dates as an iCalendar file.")
+    parser.add_argument("--calendar", choices=sorted(SYSTEMS), default="innersea")
+    parser.add_argument("--from-year", dest="fromYear", type=int, required=True, metavar="YEAR")
+    parser.add_argument("--to-year", dest="toYear", type=int, required=True, metavar="YEAR")
+    parser.add_argument("--no-moons", dest="moons", action="store_false", default=True,
+                        help="Leave out the named moons.")
+    parser.add_argument("--no-holidays", dest="holidays", action="store_false", default=True,
+                        help="Leave out the calendar's holidays.")
+    parser.add_argument("-e", "--events", metavar="FILE", help="File of events, as for the calendar scripts.")
+    parser.add_argument("--recur", action="append", default=[], metavar="'RULE: SUMMARY'",
+                        help="A recurring event, e.g. 'every Oathday: Market day'. May be repeated.")
+    parser.add_argument("-o", "--output", metavar="FILE", help="File to write to, instead of stdout.")
+    args = parser.parse_args(argv)
+
+    system = SYSTEMS[args.calendar]
+    first = system.getYearStart(args.fromYear)
+    last = system.getYearStart(args.toYear + 1) - 1
+    try:
+        getGregorianDate(args.calendar, first)
+        getGregorianDate(args.calendar, last + 1)
+    except (ValueError, OverflowError):
+        parser.error("Those years are outside the range of real world dates that can be exported")
+
+    sources = []
+    try:
+        for recur in args.recur:
+            rule, _, summary = recur.partition(":")
+            days = parseRule(args.calendar, rule)(first, last)
+            sources.append(ruleEvents(days, summary.strip() or rule.strip()))
+        if (args.events):
+            sources.append(timelineEvents(timeline.loadTimeline(system, args.events), first, last))
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if (args.moons and args.calendar == "innersea"):
+        sources.append((d, d, name) for d, name in namedMoonDays(first, last))
+    if (args.holidays):
+        sources.append((d, d, name) for d, name in holidayDays(system, first, last))
+
+    sink = sys.stdout if args.output is None else open(args.output, "w", encoding="utf-8", newline="")
+    try:
+        render.writeFragments(calendarLines(args.calendar, mergeEvents(sources)), sink)
+    finally:
+        if (sink is not sys.stdout):
+            sink.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
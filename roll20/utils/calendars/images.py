@@ -0,0 +1,163 @@
+# -*- coding: UTF-8 -*-
+#
+# Prepares the month images for illustrated HTML calendars. The originals are
+# often far bigger than a printed page needs, so they can be resized and
+# converted (to WebP by default) by a pool of worker processes. Results are
+# kept in a cache directory, named by a hash of the original and the
+# settings, with a manifest of each original's modification time and size
+# so that unchanged originals aren't even read again. Images can also be
+# inlined into the HTML as data URIs, so that a page is a single file.
+#
+# Resizing needs Pillow, which is optional and isn't installed along with
+# anything else here (pip install Pillow). Without it, everything else still
+# works, and asking for resizing fails with an ImageError saying why.
+# Inlining the originals doesn't need it.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import base64
+import concurrent.futures
+import functools
+import hashlib
+import json
+import os
+import tempfile
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+FORMATS = { "webp": ("WEBP", "image/webp"),
+            "jpeg": ("JPEG", "image/jpeg"),
+            "png": ("PNG", "image/png") }
+
+DEFAULT_WIDTH = 1200
+DEFAULT_QUALITY = 80
+MANIFEST = "manifest.json"
+
+# Raised when images can't be prepared.
+class ImageError(Exception):
+    pass
+
+# Returns the SHA-256 of a file's contents.
+def hashFile(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Resizes an image to no more than width pixels across, and saves it in the
+# given format. Runs in a worker process. The image is written under a
+# temporary name and renamed, so a half written image is never used.
+def convertImage(source, target, width, imageFormat, quality):
+    with Image.open(source) as image:
+        if (image.width > width):
+            image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+        if (imageFormat == "jpeg" and image.mode not in ("RGB", "L")):
+            image = image.convert("RGB")
+        handle, tempPath = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+        with os.fdopen(handle, "wb") as f:
+            image.save(f, format=FORMATS[imageFormat][0], quality=quality)
+    os.replace(tempPath, target)
+    return target
+
+# Returns a data URI holding the contents of an image file. Cached, since
+# the same images are used for every year, but by the file's modification
+# time and size as well as its path, so a changed file is read again.
+def getDataUri(path, mimeType):
+    stat = os.stat(path)
+    return readDataUri(path, mimeType, stat.st_mtime_ns, stat.st_size)
+
+@functools.lru_cache(maxsize=32)
+def readDataUri(path, mimeType, mtime, size):
+    with open(path, "rb") as f:
+        return "data:" + mimeType + ";base64," + base64.b64encode(f.read()).decode("ascii")
+
+# The images to use for each month, passed to the renderers in place of an
+# image directory. Holds paths rather than image data, so it is cheap to send
+# to worker processes, and only reads the files when they are inlined.
+class ImageSet(object):
+    def __init__(self, paths, mimeType, inline=False):
+        self.paths = dict(paths)
+        self.mimeType = mimeType
+        self.inline = inline
+
+    # Returns what goes in the src attribute of the month's img tag.
+    def getSource(self, month):
+        if (self.inline):
+            return getDataUri(self.paths[month], self.mimeType)
+        return self.paths[month]
+
+    # Used as part of the key for cached months. When inlining, this includes
+    # each file's modification time and size, since the contents end up in the
+    # page.
+    def __repr__(self):
+        paths = sorted(self.paths.items())
+        if (self.inline):
+            paths = [ (m, p, os.stat(p).st_mtime, os.stat(p).st_size) for m, p in paths ]
+        return "ImageSet(%r, %r, %r)" % (paths, self.mimeType, self.inline)
+
+# Resizes and converts the images 1.jpg .. <count>.jpg in directory, using
+# a pool of workers, and returns an ImageSet of the results. Images which
+# have already been converted with the same settings are reused from
+# cacheDirectory.
+def prepareImages(directory, count, cacheDirectory, width=DEFAULT_WIDTH, imageFormat="webp",
+                  quality=DEFAULT_QUALITY, inline=False, workers=None):
+    if (Image is None):
+        raise ImageError("Resizing images needs Pillow, which is not installed")
+    if (imageFormat not in FORMATS):
+        raise ImageError("Unknown image format " + imageFormat)
+
+    os.makedirs(cacheDirectory, exist_ok=True)
+    manifestPath = os.path.join(cacheDirectory, MANIFEST)
+    try:
+        with open(manifestPath) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+
+    paths = {}
+    todo = []
+    for month in range(1, count + 1):
+        source = os.path.abspath(os.path.join(directory, str(month) + ".jpg"))
+        stat = os.stat(source)
+        entry = manifest.get(source)
+        if (entry is None or entry["mtime"] != stat.st_mtime or entry["size"] != stat.st_size):
+            # The file has been touched, so check whether its contents
+            # actually changed before converting it again.
+            entry = { "mtime": stat.st_mtime, "size": stat.st_size, "hash": hashFile(source) }
+            manifest[source] = entry
+
+        name = "%s-%d-%d.%s" % (entry["hash"][:20], width, quality, imageFormat)
+        paths[month] = os.path.join(cacheDirectory, name)
+        if (not os.path.exists(paths[month])):
+            todo.append((source, paths[month]))
+
+    if (workers is None):
+        workers = os.cpu_count() or 1
+    if (workers <= 1 or len(todo) <= 1):
+        for source, target in todo:
+            convertImage(source, target, width, imageFormat, quality)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(workers, len(todo))) as pool:
+            futures = [ pool.submit(convertImage, source, target, width, imageFormat, quality)
+                        for source, target in todo ]
+            for future in futures:
+                future.result()
+
+    with open(manifestPath, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
+    return ImageSet(paths, FORMATS[imageFormat][1], inline)
+
+# Returns an ImageSet which inlines the original images without converting
+# them, for when Pillow isn't available or the originals are small enough.
+def inlineImages(directory, count):
+    return ImageSet(((m, os.path.join(directory, str(m) + ".jpg")) for m in range(1, count + 1)),
+                    "image/jpeg", True)
@@ -0,0 +1,214 @@
+# -*- coding: UTF-8 -*-
+#
+# Parsing and formatting of Imperial dates, written the Traveller way as
+# ddd-yyyy, where ddd is the day of the year from 001 to 365. Day 001 is
+# Holiday, and the rest of the year is 13 months of four 7 day weeks, so
+# 002-1105 is the first Wonday of the year, in week 1 of month 1.
+#
+# Campaign logs and ship records can hold huge numbers of these, so dates are
+# found with a single precompiled pattern, and everything about a day of the
+# year is looked up in a table rather than worked out each time. Every
+# Imperial year is the same, so one table of 365 days covers them all.
+#
+# Usage:
+#   python3 -m calendars.imperialdates travel.log           # Every date found, described
+#   python3 -m calendars.imperialdates --count *.log        # Just count them
+#   python3 -m calendars.imperialdates --check
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import argparse
+import re
+import sys
+import time
+
+from . import imperium
+
+# A date anywhere in some text. The day must be exactly three digits, and the
+# date can't be part of a longer run of digits or words. Checking what comes
+# before the day after matching it, rather than before, lets the regex engine
+# skip straight to the digits, which makes scanning twice as fast.
+DATE = re.compile(r"(\d\d\d)(?<![\w-]...)-(-?\d{1,9})(?![\w-])")
+
+# A date on its own, allowing spaces around it.
+EXACT_DATE = re.compile(r"^\s*(\d{3})-(-?\d{1,9})\s*$")
+
+# Amount of a stream read at a time when scanning for dates.
+BLOCK_SIZE = 1 << 20
+
+# (month, day of month, week, day of week) for each day of the year, indexed
+# by the day of the year. Holiday is month, week and day of week 0. Index 0
+# isn't a day, and is None.
+def buildDayTable():
+    table = [ None ]
+    first = imperium.SYSTEM.getYearStart(1)
+    weekStart = imperium.SYSTEM.holidays[0][0] + 1
+    for dayInYear in range(1, imperium.YEAR_LENGTH + 1):
+        year, month, day, weekday = imperium.getDate(first + dayInYear - 1)
+        week = 0 if month == 0 else (dayInYear - weekStart) // 7 + 1
+        table.append((month, day, week, weekday))
+    return table
+
+DAY_TABLE = buildDayTable()
+
+# The ddd part of the date for each day of the year.
+DAY_TEXT = [ None ] + [ "%03d" % d for d in range(1, imperium.YEAR_LENGTH + 1) ]
+
+# Names of each day of the year, Holiday or its day of the week.
+DAY_NAME = [ None ] + [ imperium.SYSTEM.holidays[0][1] if month == 0 else imperium.WEEK[weekday - 1]
+                        for month, day, week, weekday in DAY_TABLE[1:] ]
+
+# Years checked by --check, either side of 0.
+CHECK_FIRST = -20
+CHECK_LAST = 1120
+
+# Raised for text which isn't an Imperial date.
+class DateError(ValueError):
+    pass
+
+# Parses a single ddd-yyyy date, and returns (day of year, year).
+def parseDate(text):
+    match = EXACT_DATE.match(text)
+    if (not match):
+        raise DateError("Expected a date as ddd-yyyy, not '" + text.strip() + "'")
+    dayInYear = int(match.group(1))
+    if (dayInYear < 1 or dayInYear > imperium.YEAR_LENGTH):
+        raise DateError("Day of the year must be 001 - " + str(imperium.YEAR_LENGTH) + ", not " + match.group(1))
+    return (dayInYear, int(match.group(2)))
+
+# Yields (offset, day of year, year) for each valid date in some text, in
+# order. If errors is a list, (offset, text) is added to it for each date
+# with a day of the year that doesn't exist, such as 000 or 366.
+def findDates(text, errors=None):
+    yearLength = imperium.YEAR_LENGTH
+    for match in DATE.finditer(text):
+        dayInYear = int(match.group(1))
+        if (0 < dayInYear <= yearLength):
+            yield (match.start(), dayInYear, int(match.group(2)))
+        elif (errors is not None):
+            errors.append((match.start(), match.group(0)))
+
+# Yields blocks of text from a stream, each ending at the end of a line (apart
+# from the last), so that no date is split between two blocks.
+def readBlocks(stream, blockSize=BLOCK_SIZE):
+    carry = ""
+    while True:
+        block = stream.read(blockSize)
+        if (not block):
+            break
+        end = block.rfind("\n") + 1
+        if (end == 0):
+            carry += block
+            continue
+        yield carry + block[:end]
+        carry = block[end:]
+    if (carry):
+        yield carry
+
+# Yields (day of year, year) for every valid date in a stream, and adds the
+# text of any invalid dates to errors if it is a list.
+def scanStream(stream, errors=None):
+    for block in readBlocks(stream):
+        blockErrors = None if errors is None else []
+        for offset, dayInYear, year in findDates(block, blockErrors):
+            yield (dayInYear, year)
+        if (blockErrors):
+            errors.extend(text for offset, text in blockErrors)
+
+# Returns (month, day of month, week, day of week) for a day of the year.
+def describeDay(dayInYear):
+    return DAY_TABLE[dayInYear]
+
+# Formats a day of the year and a year as ddd-yyyy.
+def formatDate(dayInYear, year):
+    return DAY_TEXT[dayInYear] + "-" + str(year)
+
+# Formats an epoc day as ddd-yyyy.
+def formatEpocDay(epocDay):
+    return formatDate(imperium.getDayInYear(epocDay), imperium.getYear(epocDay))
+
+# Returns the epoc day of a ddd-yyyy date.
+def parseEpocDay(text):
+    dayInYear, year = parseDate(text)
+    return imperium.SYSTEM.getEpocDayOfYear(dayInYear, year)
+
+# Describes a date, e.g. "123-1105 Thirday, week 18, month 5 day 10".
+def describeDate(dayInYear, year):
+    month, day, week, weekday = DAY_TABLE[dayInYear]
+    if (month == 0):
+        return formatDate(dayInYear, year) + " " + DAY_NAME[dayInYear]
+    return "%s %s, week %d, month %d day %d" % (formatDate(dayInYear, year), DAY_NAME[dayInYear], week, month, day)
+
+# Checks the tables, the parser and the formatter against the calendar
+# calculations for every day of a span of years, and returns a list of errors.
+def check(firstYear, lastYear):
+    errors = []
+    for epocDay in range(imperium.SYSTEM.getYearStart(firstYear), imperium.SYSTEM.getYearStart(lastYear + 1)):
+        year, month, day, weekday = imperium.getDate(epocDay)
+        dayInYear = imperium.getDayInYear(epocDay)
+        text = formatEpocDay(epocDay)
+        if (parseEpocDay(text) != epocDay):
+            errors.append(text + " parsed as epoc day " + str(parseEpocDay(text)) + ", expected " + str(epocDay))
+        found = DAY_TABLE[dayInYear]
+        if (found[0] != month or found[1] != day or found[3] != weekday):
+            errors.append(text + " looked up as " + str(found) + ", expected " + str((month, day, weekday)))
+        if (month and found[2] != (day - 1) // 7 + (month - 1) * 4 + 1):
+            errors.append(text + " is in week " + str(found[2]))
+        if (list(findDates("on " + text + ".")) != [ (3, dayInYear, year) ]):
+            errors.append(text + " wasn't found in text")
+    for bad in ("000-1105", "366-1105", "1234-1105", "12-1105", "x123-1105", "123-1105x", "-123-1105"):
+        if (list(findDates(bad))):
+            errors.append(bad + " was found as a date")
+    return errors
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find and describe Imperial ddd-yyyy dates in text.")
+    parser.add_argument("files", nargs="*", metavar="FILE", help="Files to scan, or - for stdin.")
+    parser.add_argument("--count", action="store_true", default=False,
+                        help="Only count the dates, and report the rate on stderr.")
+    parser.add_argument("--check", action="store_true", default=False,
+                        help="Check the parser and formatter against the calendar.")
+    args = parser.parse_args(argv)
+
+    if (args.check):
+        errors = check(CHECK_FIRST, CHECK_LAST)
+        for error in errors:
+            print(error)
+        print("Checked %d years, %d errors." % (CHECK_LAST - CHECK_FIRST + 1, len(errors)))
+        return 1 if errors else 0
+
+    errors = []
+    count = 0
+    size = 0
+    start = time.perf_counter()
+    for path in args.files or [ "-" ]:
+        stream = sys.stdin if path == "-" else open(path)
+        try:
+            for block in readBlocks(stream):
+                size += len(block)
+                if (args.count):
+                    count += sum(1 for date in findDates(block, errors))
+                else:
+                    lines = [ describeDate(d, y) + "\n" for o, d, y in findDates(block, errors) ]
+                    count += len(lines)
+                    sys.stdout.write("".join(lines))
+        finally:
+            if (stream is not sys.stdin):
+                stream.close()
+    elapsed = time.perf_counter() - start
+
+    for offset, text in errors:
+        sys.stderr.write("Invalid date " + text + "\n")
+    if (args.count):
+        print(count)
+        sys.stderr.write("Found %d dates in %.1f MB in %.2fs (%.1f MB/s)\n" %
+                         (count, size / 1e6, elapsed, size / 1e6 / max(elapsed, 1e-9)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
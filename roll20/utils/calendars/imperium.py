@@ -0,0 +1,62 @@
+# -*- coding: UTF-8 -*-
+#
+# Date calculations for the Imperium calendar. A year is 365 days, made up of
+# a holiday followed by 13 months of 28 days.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+from . import system
+
+# Calendar Constants
+MONTH_DAYS = [ 28 ] * 13
+YEAR_LENGTH = 365
+
+WEEK = [ "Wonday", "Tuday", "Thirday", "Forday", "Fiday", "Sixday", "Senday" ]
+
+# Day 001 of each year is Holiday, which is not part of any month or week, so
+# every year starts on a Wonday. Days are laid out as they always have been
+# for this calendar, which is more compact than the Inner Sea calendar.
+DEFINITION = { "name": "Imperium",
+               "era": "IC",
+               "months": None,
+               "monthDays": MONTH_DAYS,
+               "leapYear": None,
+               "week": WEEK,
+               "holidays": [ (1, "Holiday") ],
+               "epochWeekday": 1,
+               "dayLabel": "year",
+               "dokuWikiCell": ("| ", " ", "\\\\ "),
+               "htmlCell": ("<td> ", " ", "</td>\n") }
+
+SYSTEM = system.CalendarSystem(DEFINITION)
+
+# Returns (year, month, day, day of week) for an epoc day. Holiday is month 0
+# and has no day of the week.
+getDate = SYSTEM.getDate
+getYear = SYSTEM.getYear
+getDayInYear = SYSTEM.getDayInYear
+getMonthInYear = SYSTEM.getMonthInYear
+getDayInMonth = SYSTEM.getDayInMonth
+
+# Returns a number from 1 - 7, or 0 for Holiday.
+getEpocDayOfWeek = SYSTEM.getEpocDayOfWeek
+
+# Get the epoc day from a date. This is the number of days since the first
+# day of the year in 1 IC. Holiday of 1 IC is epoc day 1.
+getEpocDay = SYSTEM.getEpocDay
+
+# Returns a number from 1 - 7, or 0 for Holiday.
+def getDayOfWeek(day, month, year):
+    return getEpocDayOfWeek(getEpocDay(day, month, year))
+
+# Returns the name of the day for this date.
+def getNamedDayOfWeek(day, month, year):
+    dayOfWeek = getDayOfWeek(day, month, year)
+    if (dayOfWeek == 0):
+        return SYSTEM.holidays[day - 1][1]
+
+    return WEEK[dayOfWeek - 1]
@@ -0,0 +1,312 @@
+# -*- coding: UTF-8 -*-
+#
+# Date and moon phase calculations for the Inner Sea (Absalom Reckoning) calendar.
+# Assumes that 1 AR was on a Moonday, and that it was a full moon.
+# Years before 1 AR count back through 0 AR to negative years.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import functools
+
+from . import system
+
+# Calendar Constants
+MONTH_DAYS = [ 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31 ]
+LEAP_DAYS = [ 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31 ]
+YEAR_LENGTH = sum(MONTH_DAYS)
+LEAP_YEAR = 8
+MOON_PERIOD = 29.5
+
+MONTH_TEXT = [ "The middle of winter, and the first month of the year, named in honour of Abadar.",
+               "A late winter month named for Calistria, goddess of revenge.",
+               "An early spring month named after Pharasma, the goddess of birth and death.",
+               "A stormy spring month named for the god of the wind, Gozreh.",
+               "A mild spring month named for the goddess Desna.",
+               "The sun goddess Sarenrae gives her name to this sun-blessed summer month.",
+               "A summer month named in honour of Erastil.",
+               "Although he is no longer widely worshiped, this summer month is named for Aroden.",
+               "The beginning of autumn is named after the violent god Rovagug.",
+               "An autumn month named for Lamashtu, the goddess of monsters.",
+               "An autumn month named for Nethys, the two-faced god of magic.",
+               "The shortest day of the year comes during the winter month named for the god of darkness, Zon-Kuthon."
+               ]
+
+MOON_NAME = [ "Long", "Fated", "Rebirth", "Flood", "Blossom", "Sweet", "Lover's", "Swarm", "Harvest", "Hunter's", "Black", "Cold", "Thirteenth" ]
+
+HTML=False
+
+WEEK = [ "Moonday", "Toilday", "Wealday", "Oathday", "Fireday", "Starday", "Sunday" ]
+
+MONTH = [ "Abadius", "Calistril", "Pharast", "Gozran", "Desnus", "Sarenith", "Erastus", "Arodus", "Rova", "Lamashan", "Neth", "Kuthona" ]
+
+MOON_PHASES = [ "Full Moon", "Waning Gibbous", "Third Quarter", "Waning Crescent", "New Moon", "Waxing Crescent", "First Quarter", "Waxing Gibbous" ]
+MOON_UNICODE = [ "&#x1F315;", "&#x1F316", "&#x1F317", "&#x1F318", "&#x1F311", "&#x1F312", "&#x1F313", "&#x1F314" ]
+
+MOON_UNICODE = [ "🌕", "🌖", "🌗", "🌘", "🌑", "🌒", "🌓", "🌔" ]
+
+PHASE_LENGTH = [ 3, 4, 4, 4, 2, 4, 4, 4 ]
+BRIGHTNESS = [ 3, 2, 2, 1, 0, 1, 2, 2 ]
+
+# Day offset of the start of each month from the start of the year, for
+# normal and leap years. Index 12 is the length of the year.
+MONTH_OFFSETS = [ sum(MONTH_DAYS[:m]) for m in range(0, 13) ]
+LEAP_OFFSETS = [ sum(LEAP_DAYS[:m]) for m in range(0, 13) ]
+
+DEFINITION = { "name": "Inner Sea",
+               "era": "AR",
+               "months": MONTH,
+               "monthDays": MONTH_DAYS,
+               "leapDays": LEAP_DAYS,
+               "leapYear": LEAP_YEAR,
+               "week": WEEK,
+               "holidays": [],
+               "epochWeekday": 1,
+               "monthText": MONTH_TEXT }
+
+SYSTEM = system.CalendarSystem(DEFINITION)
+
+# Every eighth year is a leap year, so the calendar repeats every 2921 days.
+CYCLE_LENGTH = SYSTEM.cycleLength
+
+# (year in cycle, month, day in month, day in year, week day) for every day of
+# the 8 year leap cycle, indexed by the day within the cycle (0 - 2920).
+CYCLE_TABLE = SYSTEM.cycleTable
+
+# Returns (year, month, day, day of week) for an epoc day, in a single lookup
+# into the leap cycle table. Day of week is 1 - 7.
+getDate = SYSTEM.getDate
+getYear = SYSTEM.getYear
+getDayInYear = SYSTEM.getDayInYear
+getMonthInYear = SYSTEM.getMonthInYear
+getDayInMonth = SYSTEM.getDayInMonth
+
+# Get the epoc day from a date. This is the number of days since the first
+# day of the year in 1 AR. 1/1/1 is epoc day 1 (epoc day 0 does not exist).
+getEpocDay = SYSTEM.getEpocDay
+
+# Walks forward one day at a time from the start of firstYear to the end of
+# lastYear, and checks that the table lookups agree with simply counting
+# through the calendar. Returns a list of error messages, which is empty if
+# everything matched.
+def checkDates(lastYear, firstYear=1):
+    errors = []
+    epocDay = SYSTEM.getYearStart(firstYear)
+    for year in range(firstYear, lastYear + 1):
+        cal = MONTH_DAYS
+        if ((year % 8) == 0):
+            cal = LEAP_DAYS
+        dayInYear = 1
+        for month in range(1, 13):
+            for day in range(1, cal[month - 1] + 1):
+                expected = (year, month, day, (epocDay - 1) % 7 + 1)
+                if (getDate(epocDay) != expected):
+                    errors.append("Epoc day " + str(epocDay) + " is " + str(getDate(epocDay)) +
+                                  ", expected " + str(expected))
+                elif (getEpocDay(day, month, year) != epocDay):
+                    errors.append("Date " + str(expected) + " gives epoc day " +
+                                  str(getEpocDay(day, month, year)) + ", expected " + str(epocDay))
+                elif (getDayInYear(epocDay) != dayInYear):
+                    errors.append("Epoc day " + str(epocDay) + " is day " + str(getDayInYear(epocDay)) +
+                                  " of the year, expected " + str(dayInYear))
+                epocDay += 1
+                dayInYear += 1
+    return errors
+
+# Returns a number from 1 - 7.
+def getDayOfWeek(day, month, year):
+    epocDay = getEpocDay(day, month, year)
+    dayOfWeek = (epocDay - 1) % len(WEEK) + 1
+
+    return dayOfWeek
+
+def getEpocDayOfWeek(epocDay):
+    return (epocDay - 1) % len(WEEK) + 1
+
+# Returns the name of the day for this date.
+def getNamedDayOfWeek(day, month, year):
+    dayOfWeek = getDayOfWeek(day, month, year)
+
+    return WEEK[dayOfWeek - 1]
+
+# Two lunar months make a whole number of days.
+LUNAR_CYCLE = int(MOON_PERIOD * 2)
+
+# Phase of the Moon (0-7) for each day into the lunar month, from day 0 to
+# day 30, so this has 31 entries. A lunar month is 29 or 30 days, so only
+# days 0 - 29 are ever looked up, and day 30 just repeats the last phase.
+def buildMoonDayTable():
+    table = [ 0 ]
+    for phase in range(0, len(PHASE_LENGTH)):
+        table += [ phase ] * PHASE_LENGTH[phase]
+    table.append(table[-1])
+    return table
+
+MOON_DAY_PHASE = buildMoonDayTable()
+
+# Phase of the Moon for each day of the two month lunar cycle, indexed by
+# epocDay % LUNAR_CYCLE. The first lunar month starts on a whole day and lasts
+# 30 days, the second starts half way through a day so only has 29.
+def buildMoonCycleTable():
+    table = []
+    for cycleDay in range(0, LUNAR_CYCLE):
+        if (cycleDay < LUNAR_CYCLE - int(MOON_PERIOD)):
+            table.append(MOON_DAY_PHASE[cycleDay])
+        else:
+            table.append(MOON_DAY_PHASE[cycleDay - int(MOON_PERIOD)])
+    return table
+
+MOON_CYCLE_PHASE = buildMoonCycleTable()
+
+# For each phase, the number of days from each day of the lunar cycle until
+# the next day on which that phase starts. Used to jump straight to the next
+# Full Moon, New Moon etc. without stepping through the days.
+def buildNextPhaseTable():
+    table = []
+    for phase in range(0, len(PHASE_LENGTH)):
+        starts = [ d for d in range(0, LUNAR_CYCLE)
+                   if MOON_CYCLE_PHASE[d] == phase and MOON_CYCLE_PHASE[d - 1] != phase ]
+        starts.append(starts[0] + LUNAR_CYCLE)
+        table.append([ min(s for s in starts if s > d) - d for d in range(0, LUNAR_CYCLE) ])
+    return table
+
+# As above, but the number of days back to the previous start of each phase.
+def buildPreviousPhaseTable():
+    table = []
+    for phase in range(0, len(PHASE_LENGTH)):
+        starts = [ d for d in range(0, LUNAR_CYCLE)
+                   if MOON_CYCLE_PHASE[d] == phase and MOON_CYCLE_PHASE[d - 1] != phase ]
+        starts.insert(0, starts[-1] - LUNAR_CYCLE)
+        table.append([ d - max(s for s in starts if s < d) for d in range(0, LUNAR_CYCLE) ])
+    return table
+
+NEXT_PHASE = buildNextPhaseTable()
+PREVIOUS_PHASE = buildPreviousPhaseTable()
+
+# Returns the index of the phase of the Moon on an epoc day, 0-7.
+def getEpocMoonPhaseIndex(epocDay):
+    return MOON_CYCLE_PHASE[epocDay % LUNAR_CYCLE]
+
+# Returns the name of this phase of the Moon.
+def getMoonPhase(day, month, year):
+    return MOON_PHASES[MOON_CYCLE_PHASE[getEpocDay(day, month, year) % LUNAR_CYCLE]]
+
+# Returns the index of this phase of the Moon, 0-7. 0 = Full Moon, 4 = New Moon.
+def getMoonPhaseIndex(day, month, year):
+    return MOON_CYCLE_PHASE[getEpocDay(day, month, year) % LUNAR_CYCLE]
+
+# Returns the epoc day on which the given phase (0-7) next starts, after the
+# given epoc day. getNextMoonPhase(epocDay, 0) is the next Full Moon.
+def getNextMoonPhase(epocDay, phase):
+    return epocDay + NEXT_PHASE[phase][epocDay % LUNAR_CYCLE]
+
+# Returns the epoc day on which the given phase (0-7) last started, before the
+# given epoc day. getPreviousMoonPhase(epocDay, 4) is the previous New Moon.
+def getPreviousMoonPhase(epocDay, phase):
+    return epocDay - PREVIOUS_PHASE[phase][epocDay % LUNAR_CYCLE]
+
+# Days of the lunar cycle on which a named Full Moon falls. Since a 'full moon'
+# spans multiple days, we take the second day of Full Moon as the actual day.
+def buildNamedMoonTable():
+    table = []
+    for cycleDay in range(0, LUNAR_CYCLE):
+        if (MOON_CYCLE_PHASE[cycleDay] == 0 and MOON_CYCLE_PHASE[cycleDay - 1] == 0 and
+                MOON_CYCLE_PHASE[cycleDay - 2] != 0):
+            table.append(cycleDay)
+    return table
+
+NAMED_MOON_DAYS = buildNamedMoonTable()
+
+# Number of years of named moons to keep cached.
+MOON_CACHE_SIZE = 256
+
+# Returns the epoc days of every named Full Moon between the two epoc days
+# inclusive, found directly from the lunar cycle rather than day by day.
+def getFullMoonDays(firstDay, lastDay):
+    days = []
+    for cycle in range(firstDay // LUNAR_CYCLE, lastDay // LUNAR_CYCLE + 1):
+        for cycleDay in NAMED_MOON_DAYS:
+            day = cycle * LUNAR_CYCLE + cycleDay
+            if (firstDay <= day <= lastDay):
+                days.append(day)
+    return days
+
+# Tuple of (epoc day, moon name) for each named Full Moon of the year, in order.
+# The first full moon of the year is the Long Moon, and in years with 13 full
+# moons the last is the Thirteenth Moon.
+@functools.lru_cache(maxsize=MOON_CACHE_SIZE)
+def getNamedMoonsOfYear(year):
+    days = getFullMoonDays(getEpocDay(1, 1, year), getEpocDay(31, 12, year))
+
+    return tuple(zip(days, MOON_NAME))
+
+# Get a dictionary containing all the named Full moons of the year. Indexed by
+# the epoc day, with the moon name as the value.
+def getMoonsOfYear(year):
+    return dict(getNamedMoonsOfYear(year))
+
+# Returns a list of (epoc day, moon name) for every named Full Moon between
+# the two epoc days inclusive.
+def getNamedMoons(firstDay, lastDay):
+    moons = []
+    for year in range(getYear(firstDay), getYear(lastDay) + 1):
+        for day, name in getNamedMoonsOfYear(year):
+            if (firstDay <= day <= lastDay):
+                moons.append((day, name))
+    return moons
+
+# Everything needed to lay out the months of a year, worked out once per year
+# and shared by every month that is rendered.
+class YearLayout(object):
+    __slots__ = ("year", "isLeapYear", "monthDays", "monthOffsets", "firstDay", "firstWeekday", "phases", "moons")
+
+    def __init__(self, year):
+        self.year = year
+        self.isLeapYear = (year % 8) == 0
+        self.monthDays = LEAP_DAYS if self.isLeapYear else MONTH_DAYS
+        self.monthOffsets = LEAP_OFFSETS if self.isLeapYear else MONTH_OFFSETS
+        self.firstDay = getEpocDay(1, 1, year)
+        self.firstWeekday = getEpocDayOfWeek(self.firstDay)
+
+        # Moon phase for each day of the year, by day in year - 1.
+        start = self.firstDay % LUNAR_CYCLE
+        cycle = bytes(MOON_CYCLE_PHASE)
+        repeats = self.monthOffsets[12] // LUNAR_CYCLE + 2
+        self.phases = (cycle[start:] + cycle * repeats)[:self.monthOffsets[12]]
+
+        # Named moons, keyed by epoc day.
+        self.moons = dict(getNamedMoonsOfYear(year))
+
+    # Epoc day of the first day of the month.
+    def getMonthStart(self, month):
+        return self.firstDay + self.monthOffsets[month - 1]
+
+    # Day of the week (1 - 7) of the first day of the month.
+    def getMonthWeekday(self, month):
+        return (self.firstWeekday - 1 + self.monthOffsets[month - 1]) % 7 + 1
+
+    # Moon phase index of a day of the month.
+    def getPhase(self, month, day):
+        return self.phases[self.monthOffsets[month - 1] + day - 1]
+
+# Returns the YearLayout for a year, caching recent years.
+@functools.lru_cache(maxsize=MOON_CACHE_SIZE)
+def getYearLayout(year):
+    return YearLayout(year)
+
+# Returns a dictionary describing one day, for turning into JSON. The year's
+# named moons are only looked up on days of the lunar cycle that can have one.
+def getDayData(epocDay):
+    year, month, day, weekday = getDate(epocDay)
+    phase = getEpocMoonPhaseIndex(epocDay)
+    moon = None
+    if (epocDay % LUNAR_CYCLE in NAMED_MOON_DAYS):
+        moon = getMoonsOfYear(year).get(epocDay)
+
+    return { "year": year, "month": month, "monthName": MONTH[month - 1], "day": day,
+             "epocDay": epocDay, "weekday": weekday, "weekdayName": WEEK[weekday - 1],
+             "phase": phase, "phaseName": MOON_PHASES[phase],
+             "moon": moon }
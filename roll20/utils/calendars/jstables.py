@@ -0,0 +1,330 @@
+# -*- coding: UTF-8 -*-
+#
+# Builds small lookup tables of the Inner Sea calendar for Roll20 API scripts,
+# which run in a JavaScript sandbox and can't use this package. The tables are
+# written out as a JavaScript file which defines InnerSeaCalendar, with
+# getDate() and getEpocDay() functions that need only a handful of table
+# lookups for any day.
+#
+# Most of the calendar repeats, so only a few tables are needed:
+#
+#   yearStarts  - Start of each year of the 8 year leap cycle.
+#   monthStarts - Start of each month, in ordinary and leap years.
+#   phases      - Moon phase of each day of the 59 day lunar cycle, packed
+#                 two to a base64 character.
+#   years       - For each year of the span, how far into the year its first
+#                 named moon is, one base64 character per year.
+#
+# Named moons are the only thing which needs a table per year, so a century
+# of tables is around 100 bytes on top of the fixed tables.
+#
+# The checker reads the tables back out of a file, and compares every day of
+# the span against the Python calculations, both with a decoder that does the
+# same lookups as the JavaScript, and by running the JavaScript itself if
+# node is installed.
+#
+# Usage:
+#   python3 -m calendars.jstables build InnerSeaCalendar.js --from-year 4700 --to-year 4800
+#   python3 -m calendars.jstables check InnerSeaCalendar.js
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+from . import innersea
+
+ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+
+# The line of the JavaScript that holds the tables, which the checker looks for.
+TABLES_PREFIX = "InnerSeaCalendar.TABLES = "
+
+SCRIPT = """/**
+ * Inner Sea calendar lookup tables, for years %(firstYear)d to %(lastYear)d AR.
+ *
+ * Generated by calendars.jstables from the Python calendar, and checked
+ * against it. Don't edit this file, build a new one instead.
+ *
+ * InnerSeaCalendar.getDate(epocDay) returns an object with the year, month,
+ * day, weekday, phase and moon of an epoc day, or null if it is outside the
+ * years covered. InnerSeaCalendar.getEpocDay(year, month, day) goes the
+ * other way.
+ */
+
+var InnerSeaCalendar = InnerSeaCalendar || {};
+
+%(prefix)s%(tables)s;
+
+InnerSeaCalendar.mod = function(a, b) {
+    return ((a %% b) + b) %% b;
+};
+
+InnerSeaCalendar.getPhase = function(epocDay) {
+    let t = InnerSeaCalendar.TABLES;
+    let lunarDay = InnerSeaCalendar.mod(epocDay, t.lunarCycle);
+    return (t.alphabet.indexOf(t.phases.charAt(lunarDay >> 1)) >> ((lunarDay & 1) * 3)) & 7;
+};
+
+// Number of named moons from epoc day 0 up to a day on which one falls.
+InnerSeaCalendar.countNamedMoons = function(epocDay) {
+    let t = InnerSeaCalendar.TABLES;
+    let lunarDay = InnerSeaCalendar.mod(epocDay, t.lunarCycle);
+    return t.namedMoonDays.length * ((epocDay - lunarDay) / t.lunarCycle) + t.namedMoonDays.indexOf(lunarDay);
+};
+
+InnerSeaCalendar.getEpocDay = function(year, month, day) {
+    let t = InnerSeaCalendar.TABLES;
+    let cycle = Math.floor((year - t.firstCycleYear) / t.cycleYears);
+    let y = year - t.firstCycleYear - cycle * t.cycleYears;
+    return cycle * t.cycleDays + t.yearStarts[y] + t.monthStarts[t.leap[y]][month - 1] + day;
+};
+
+InnerSeaCalendar.getDate = function(epocDay) {
+    let t = InnerSeaCalendar.TABLES;
+    let cycle = Math.floor((epocDay - 1) / t.cycleDays);
+    let dayInCycle = epocDay - 1 - cycle * t.cycleDays;
+    let y = Math.floor(dayInCycle / 365);
+    if (dayInCycle < t.yearStarts[y]) {
+        y--;
+    }
+    let year = cycle * t.cycleYears + t.firstCycleYear + y;
+    if (year < t.firstYear || year > t.lastYear) {
+        return null;
+    }
+    let dayInYear = dayInCycle - t.yearStarts[y];
+    let starts = t.monthStarts[t.leap[y]];
+    let month = Math.floor(dayInYear / 31);
+    while (dayInYear >= starts[month + 1]) {
+        month++;
+    }
+    let weekday = InnerSeaCalendar.mod(epocDay + t.weekOffset, 7) + 1;
+    let phase = InnerSeaCalendar.getPhase(epocDay);
+    let moon = null;
+    if (t.namedMoonDays.indexOf(InnerSeaCalendar.mod(epocDay, t.lunarCycle)) >= 0) {
+        let first = epocDay - dayInYear + t.alphabet.indexOf(t.years.charAt(year - t.firstYear));
+        moon = t.moonNames[InnerSeaCalendar.countNamedMoons(epocDay) - InnerSeaCalendar.countNamedMoons(first)];
+    }
+    return { "year": year, "month": month + 1, "monthName": t.monthNames[month],
+             "day": dayInYear - starts[month] + 1, "epocDay": epocDay,
+             "weekday": weekday, "weekdayName": t.weekNames[weekday - 1],
+             "phase": phase, "phaseName": t.phaseNames[phase], "moon": moon };
+};
+"""
+
+# Harness run by node to check a script, which prints the date of every
+# step'th day of the span as a line of JSON.
+HARNESS = """
+let t = InnerSeaCalendar.TABLES;
+let first = InnerSeaCalendar.getEpocDay(t.firstYear, 1, 1);
+let last = InnerSeaCalendar.getEpocDay(t.lastYear, 12, 31);
+let lines = [];
+for (let d = first; d <= last; d += %d) {
+    let date = InnerSeaCalendar.getDate(d);
+    lines.push(JSON.stringify([ date, InnerSeaCalendar.getEpocDay(date.year, date.month, date.day) ]));
+}
+process.stdout.write(lines.join("\\n") + "\\n");
+"""
+
+# Raised when tables can't be built or read.
+class TableError(Exception):
+    pass
+
+# Packs a list of numbers from 0 - 7 two to a character.
+def packPhases(phases):
+    if (len(phases) % 2):
+        phases = phases + [ 0 ]
+    return "".join(ALPHABET[phases[i] | (phases[i + 1] << 3)] for i in range(0, len(phases), 2))
+
+# Returns the tables for the years firstYear to lastYear, as a dictionary.
+def buildTables(firstYear, lastYear):
+    if (lastYear < firstYear):
+        raise TableError("The first year must not be after the last")
+    system = innersea.SYSTEM
+    firstCycleYear = system.getYear(1)
+    cycleYears = system.leapYear
+
+    yearStarts = [ system.getYearStart(firstCycleYear + y) - 1 for y in range(0, cycleYears + 1) ]
+    monthStarts = []
+    for monthDays in (innersea.MONTH_DAYS, innersea.LEAP_DAYS):
+        monthStarts.append([ sum(monthDays[:m]) for m in range(0, len(monthDays) + 1) ])
+
+    years = []
+    for year in range(firstYear, lastYear + 1):
+        offset = innersea.getNamedMoonsOfYear(year)[0][0] - system.getYearStart(year)
+        if (offset >= len(ALPHABET)):
+            raise TableError("The first named moon of " + str(year) + " is too late in the year to pack")
+        years.append(ALPHABET[offset])
+
+    return { "firstYear": firstYear, "lastYear": lastYear,
+             "firstCycleYear": firstCycleYear, "cycleYears": cycleYears, "cycleDays": system.cycleLength,
+             "yearStarts": yearStarts, "monthStarts": monthStarts,
+             "leap": [ 1 if system.isLeapYear(firstCycleYear + y) else 0 for y in range(0, cycleYears) ],
+             "weekOffset": (innersea.getEpocDayOfWeek(0) - 1) % 7,
+             "lunarCycle": innersea.LUNAR_CYCLE, "phases": packPhases(innersea.MOON_CYCLE_PHASE),
+             "namedMoonDays": innersea.NAMED_MOON_DAYS, "years": "".join(years),
+             "alphabet": ALPHABET, "monthNames": innersea.MONTH, "weekNames": innersea.WEEK,
+             "phaseNames": innersea.MOON_PHASES, "moonNames": innersea.MOON_NAME }
+
+# Returns the JavaScript for a set of tables.
+def getScript(tables):
+    text = json.dumps(tables, separators=(",", ":"), ensure_ascii=False)
+    return SCRIPT % { "firstYear": tables["firstYear"], "lastYear": tables["lastYear"],
+                      "prefix": TABLES_PREFIX, "tables": text }
+
+# Writes a JavaScript file of the tables for firstYear to lastYear.
+def buildScript(path, firstYear, lastYear):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(getScript(buildTables(firstYear, lastYear)))
+
+# Reads the tables back out of a JavaScript file.
+def readTables(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if (line.startswith(TABLES_PREFIX)):
+                return json.loads(line[len(TABLES_PREFIX):].rstrip().rstrip(";"))
+    raise TableError(path + " doesn't hold Inner Sea calendar tables")
+
+# Looks up dates from the tables in exactly the same way as the JavaScript,
+# so that the tables can be checked without a JavaScript engine.
+class TableDecoder(object):
+    def __init__(self, tables):
+        self.t = tables
+
+    def getPhase(self, epocDay):
+        t = self.t
+        lunarDay = epocDay % t["lunarCycle"]
+        return (t["alphabet"].index(t["phases"][lunarDay >> 1]) >> ((lunarDay & 1) * 3)) & 7
+
+    def countNamedMoons(self, epocDay):
+        t = self.t
+        lunarDay = epocDay % t["lunarCycle"]
+        return len(t["namedMoonDays"]) * ((epocDay - lunarDay) // t["lunarCycle"]) + t["namedMoonDays"].index(lunarDay)
+
+    def getEpocDay(self, year, month, day):
+        t = self.t
+        cycle, y = divmod(year - t["firstCycleYear"], t["cycleYears"])
+        return cycle * t["cycleDays"] + t["yearStarts"][y] + t["monthStarts"][t["leap"][y]][month - 1] + day
+
+    # Returns the same dictionary as the JavaScript's getDate().
+    def getDate(self, epocDay):
+        t = self.t
+        cycle, dayInCycle = divmod(epocDay - 1, t["cycleDays"])
+        y = dayInCycle // 365
+        if (dayInCycle < t["yearStarts"][y]):
+            y -= 1
+        year = cycle * t["cycleYears"] + t["firstCycleYear"] + y
+        if (year < t["firstYear"] or year > t["lastYear"]):
+            return None
+        dayInYear = dayInCycle - t["yearStarts"][y]
+        starts = t["monthStarts"][t["leap"][y]]
+        month = dayInYear // 31
+        while dayInYear >= starts[month + 1]:
+            month += 1
+        weekday = (epocDay + t["weekOffset"]) % 7 + 1
+        phase = self.getPhase(epocDay)
+        moon = None
+        if (epocDay % t["lunarCycle"] in t["namedMoonDays"]):
+            first = epocDay - dayInYear + t["alphabet"].index(t["years"][year - t["firstYear"]])
+            moon = t["moonNames"][self.countNamedMoons(epocDay) - self.countNamedMoons(first)]
+        return { "year": year, "month": month + 1, "monthName": t["monthNames"][month],
+                 "day": dayInYear - starts[month] + 1, "epocDay": epocDay,
+                 "weekday": weekday, "weekdayName": t["weekNames"][weekday - 1],
+                 "phase": phase, "phaseName": t["phaseNames"][phase], "moon": moon }
+
+# Checks a date looked up from the tables against the Python calculations,
+# and returns an error message, or None if it is right.
+def checkDate(epocDay, date, epocDayBack):
+    expected = innersea.getDayData(epocDay)
+    if (date != expected):
+        return "Epoc day %d: expected %s, tables give %s" % (epocDay, expected, date)
+    if (epocDayBack != epocDay):
+        return "Epoc day %d: tables turn its date back into epoc day %d" % (epocDay, epocDayBack)
+    return None
+
+# Checks every day of the tables' span with the Python decoder, and every
+# step'th day by running the JavaScript with node, if it is installed.
+# Returns (list of errors, whether node was used).
+def checkScript(path, step=1, node=None):
+    tables = readTables(path)
+    decoder = TableDecoder(tables)
+    errors = []
+
+    system = innersea.SYSTEM
+    first = system.getYearStart(tables["firstYear"])
+    last = system.getYearStart(tables["lastYear"] + 1) - 1
+    for epocDay in range(first, last + 1):
+        try:
+            date = decoder.getDate(epocDay)
+            error = checkDate(epocDay, date, decoder.getEpocDay(date["year"], date["month"], date["day"]))
+        except (IndexError, ValueError, TypeError) as e:
+            error = "Epoc day %d: tables can't be read (%s)" % (epocDay, e)
+        if (error):
+            errors.append(error)
+    for outside in (first - 1, last + 1):
+        if (decoder.getDate(outside) is not None):
+            errors.append("Epoc day %d is outside the tables, but was looked up" % outside)
+
+    if (node is None):
+        node = shutil.which("node") or shutil.which("nodejs")
+    if (node):
+        with open(path, encoding="utf-8") as f:
+            script = f.read() + HARNESS % step
+        result = subprocess.run([ node ], input=script, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                universal_newlines=True, check=False)
+        if (result.returncode != 0):
+            errors.append("node failed: " + result.stderr.strip())
+        else:
+            for line in result.stdout.splitlines():
+                date, epocDayBack = json.loads(line)
+                error = checkDate(date["epocDay"], date, epocDayBack)
+                if (error):
+                    errors.append("JavaScript: " + error)
+    return (errors, bool(node))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and check Inner Sea calendar tables for Roll20 scripts.")
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    build = commands.add_parser("build", help="Build a JavaScript file of tables.")
+    build.add_argument("file")
+    build.add_argument("--from-year", dest="fromYear", type=int, default=4700, metavar="YEAR")
+    build.add_argument("--to-year", dest="toYear", type=int, default=4800, metavar="YEAR")
+
+    check = commands.add_parser("check", help="Check a JavaScript file of tables against the calendar.")
+    check.add_argument("file")
+    check.add_argument("--step", type=int, default=1, help="Only run every STEP'th day through node.")
+    check.add_argument("--no-node", dest="node", action="store_false", default=True,
+                       help="Don't run the JavaScript, only check the tables from Python.")
+
+    args = parser.parse_args(argv)
+
+    try:
+        if (args.command == "build"):
+            buildScript(args.file, args.fromYear, args.toYear)
+        useNode = args.node if args.command == "check" else True
+        errors, ranNode = checkScript(args.file, args.step if args.command == "check" else 7,
+                                      None if useNode else False)
+        tables = readTables(args.file)
+    except (OSError, ValueError, TableError) as e:
+        print(e)
+        return 2
+
+    for error in errors[:20]:
+        print(error)
+    print("Checked %s: years %d to %d, %d bytes, %s, %d errors." %
+          (args.file, tables["firstYear"], tables["lastYear"], os.path.getsize(args.file),
+           "with node" if ranNode else "without node", len(errors)))
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+# -*- coding: UTF-8 -*-
+#
+# Load test for the calendar service. Opens a number of keep-alive connections
+# and sends requests for random days, months and years as fast as it can for
+# a fixed time, then reports the number of requests per second.
+#
+# Usage:
+#   python3 -m calendars.service &
+#   python3 -m calendars.loadtest [--connections 16] [--seconds 10]
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from .service import DEFAULT_PORT
+
+# Returns a random request target. Years are picked from a narrow range so
+# that, as with real use, most requests are for recently seen dates.
+def randomTarget(rng, firstYear, lastYear):
+    year = rng.randint(firstYear, lastYear)
+    month = rng.randint(1, 12)
+    kind = rng.random()
+    if (kind < 0.7):
+        return "/day/%d/%d/%d" % (year, month, rng.randint(1, 28))
+    elif (kind < 0.95):
+        return "/month/%d/%d?format=%s" % (year, month, rng.choice([ "json", "html", "dokuwiki" ]))
+    else:
+        return "/year/%d?format=html" % year
+
+# Sends requests down one connection until the deadline, and returns a tuple
+# of (requests, errors).
+async def client(host, port, deadline, seed, firstYear, lastYear):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    requests = 0
+    errors = 0
+    try:
+        while time.perf_counter() < deadline:
+            target = randomTarget(rng, firstYear, lastYear)
+            writer.write(("GET " + target + " HTTP/1.1\r\nHost: " + host + "\r\n\r\n").encode("latin-1"))
+            await writer.drain()
+
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if (line in (b"\r\n", b"")):
+                    break
+                if (line.lower().startswith(b"content-length:")):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+
+            requests += 1
+            if (status != 200):
+                errors += 1
+    finally:
+        writer.close()
+    return (requests, errors)
+
+async def run(host, port, connections, seconds, firstYear, lastYear):
+    start = time.perf_counter()
+    deadline = start + seconds
+    results = await asyncio.gather(*[ client(host, port, deadline, seed, firstYear, lastYear)
+                                      for seed in range(0, connections) ])
+    elapsed = time.perf_counter() - start
+    requests = sum(r[0] for r in results)
+    errors = sum(r[1] for r in results)
+    return (requests, errors, elapsed)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure requests per second against the calendar service.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address of the service.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port of the service.")
+    parser.add_argument("--connections", type=int, default=16, help="Number of concurrent connections.")
+    parser.add_argument("--seconds", type=float, default=10, help="How long to run for.")
+    parser.add_argument("--from-year", dest="fromYear", type=int, default=4700, help="First year to ask for.")
+    parser.add_argument("--to-year", dest="toYear", type=int, default=4720, help="Last year to ask for.")
+    args = parser.parse_args(argv)
+
+    requests, errors, elapsed = asyncio.run(run(args.host, args.port, args.connections, args.seconds,
+                                                args.fromYear, args.toYear))
+    print("%d requests in %.2fs, %.0f requests/s, %d errors" % (requests, elapsed, requests / elapsed, errors))
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
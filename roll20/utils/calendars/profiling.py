@@ -0,0 +1,231 @@
+# -*- coding: UTF-8 -*-
+#
+# Profiling of where the time goes when rendering calendars. While enabled,
+# the hot functions are swapped for wrappers that count calls and time them,
+# and the time is split between stages:
+#
+#   dates  - Date arithmetic, such as getEpocDay() and getDate().
+#   moons  - Moon phases and named moons.
+#   render - Building the DokuWiki or HTML text.
+#   output - Writing the text out.
+#   other  - Everything else, such as argument parsing.
+#
+# Time is only counted against the innermost stage, so a month's render time
+# doesn't include the dates and moons it looked up. Nothing is wrapped until
+# profiling is enabled, so there is no cost at all when it isn't.
+#
+#   from calendars import profiling
+#   with profiling.profiled() as profiler:
+#       ...
+#   print(profiler.getReport())
+#
+# Only this process is profiled, not the workers of a parallel export. Each
+# thread keeps its own stack of stages, so threads rendering at the same time
+# have their time charged to their own stages. Their times are added
+# together, so with several threads the stages can add up to more than the
+# total, and only the thread which started profiling is charged for time
+# outside every stage.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import collections
+import contextlib
+import functools
+import json
+import platform
+import sys
+import threading
+import time
+import types
+
+from . import imperium
+from . import innersea
+from . import render
+
+# (stage, object, attribute names) of the functions to wrap. These are the
+# ones that rendering a year of either calendar actually calls.
+HOT_FUNCTIONS = [ ("dates", innersea, [ "getEpocDay", "getEpocDayOfWeek" ]),
+                  ("dates", innersea.SYSTEM, [ "getEpocDay", "getEpocDayOfWeek" ]),
+                  ("dates", imperium.SYSTEM, [ "getEpocDay", "getEpocDayOfWeek", "getDayInYear" ]),
+                  ("moons", innersea, [ "getYearLayout", "getNamedMoonsOfYear", "getFullMoonDays" ]),
+                  ("moons", render, [ "getMoonExtras" ]),
+                  ("render", render, [ "innerSeaMonth", "imperiumMonth", "addEventExtras" ]),
+                  ("render", innersea.SYSTEM, [ "monthFragments" ]),
+                  ("render", imperium.SYSTEM, [ "monthFragments" ]) ]
+
+class Profiler(object):
+    def __init__(self):
+        self.seconds = collections.defaultdict(float)
+        self.calls = collections.Counter()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.started = time.perf_counter()
+        self.finished = None
+        self.patched = []
+        thread = self.getThread()
+        thread.mark = self.started
+        thread.other = True
+
+    # Returns this thread's stack of stages, and when it last changed.
+    def getThread(self):
+        thread = self.local
+        if (not hasattr(thread, "stack")):
+            thread.stack = []
+            thread.mark = time.perf_counter()
+            thread.other = False
+        return thread
+
+    # Adds time to a stage. Not charging time outside every stage to threads
+    # other than the first keeps their time waiting for work out.
+    def charge(self, thread, seconds):
+        if (thread.stack or thread.other):
+            with self.lock:
+                self.seconds[thread.stack[-1] if thread.stack else "other"] += seconds
+
+    def count(self, name):
+        with self.lock:
+            self.calls[name] += 1
+
+    # Starts timing a stage, charging the time so far to the stage it
+    # interrupts.
+    def enter(self, stage):
+        thread = self.getThread()
+        now = time.perf_counter()
+        self.charge(thread, now - thread.mark)
+        thread.stack.append(stage)
+        thread.mark = now
+
+    def leave(self):
+        thread = self.getThread()
+        now = time.perf_counter()
+        self.charge(thread, now - thread.mark)
+        thread.stack.pop()
+        thread.mark = now
+
+    # Returns a wrapper for a function which counts and times its calls.
+    # Renderers that return generators have them run to the end inside the
+    # wrapper so that their time is counted.
+    def wrap(self, stage, name, function):
+        materialise = (stage == "render")
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            self.count(name)
+            self.enter(stage)
+            try:
+                result = function(*args, **kwargs)
+                if (materialise and isinstance(result, types.GeneratorType)):
+                    result = iter(list(result))
+                return result
+            finally:
+                self.leave()
+
+        if (hasattr(function, "cache_clear")):
+            wrapper.cache_clear = function.cache_clear
+        return wrapper
+
+    # Replacement for render.writeFragments(), which charges producing the
+    # fragments to rendering, and collecting and writing them to output.
+    def writeFragments(self, fragments, sink, bufferSize=render.WRITE_BUFFER):
+        profiler = self
+
+        class CountingSink(object):
+            def write(self, text):
+                profiler.count("write")
+                return sink.write(text)
+
+        def timedFragments():
+            iterator = iter(fragments)
+            while True:
+                self.enter("render")
+                try:
+                    fragment = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    self.leave()
+                yield fragment
+
+        self.enter("output")
+        try:
+            self.originalWriteFragments(timedFragments(), CountingSink(), bufferSize)
+        finally:
+            self.leave()
+
+    # Swaps in the wrappers.
+    def install(self):
+        for stage, owner, names in HOT_FUNCTIONS:
+            prefix = owner.__name__.split(".")[-1] if hasattr(owner, "__name__") else owner.name.replace(" ", "")
+            for name in names:
+                original = getattr(owner, name)
+                self.patched.append((owner, name, owner.__dict__.get(name)))
+                setattr(owner, name, self.wrap(stage, prefix + "." + name, original))
+
+        self.originalWriteFragments = render.writeFragments
+        self.patched.append((render, "writeFragments", render.writeFragments))
+        render.writeFragments = self.writeFragments
+
+    # Puts back the original functions. Methods of calendar systems were
+    # wrapped by setting them on the instance, so are deleted again.
+    def uninstall(self):
+        for owner, name, original in reversed(self.patched):
+            if (original is None):
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+        self.patched = []
+        thread = self.getThread()
+        self.finished = time.perf_counter()
+        self.charge(thread, self.finished - thread.mark)
+        thread.mark = self.finished
+
+    # Returns the results as a dictionary, suitable for writing as JSON.
+    def getReport(self):
+        finished = self.finished or time.perf_counter()
+        return { "python": platform.python_version(),
+                 "total": finished - self.started,
+                 "stages": dict((stage, self.seconds.get(stage, 0.0))
+                                for stage in ("dates", "moons", "render", "output", "other")),
+                 "calls": dict(sorted(self.calls.items())) }
+
+    # Writes the report as JSON to a file, or to stderr if path is "-".
+    def writeReport(self, path):
+        text = json.dumps(self.getReport(), indent=2) + "\n"
+        if (path == "-"):
+            sys.stderr.write(text)
+        else:
+            with open(path, "w") as f:
+                f.write(text)
+
+PROFILER = None
+
+# Starts profiling, and returns the Profiler collecting the results.
+def enable():
+    global PROFILER
+    if (PROFILER is None):
+        PROFILER = Profiler()
+        PROFILER.install()
+    return PROFILER
+
+# Stops profiling, and returns the Profiler with the results, or None if it
+# wasn't running.
+def disable():
+    global PROFILER
+    profiler = PROFILER
+    if (profiler is not None):
+        profiler.uninstall()
+        PROFILER = None
+    return profiler
+
+# Profiles the body of a with statement.
+@contextlib.contextmanager
+def profiled():
+    profiler = enable()
+    try:
+        yield profiler
+    finally:
+        disable()
@@ -0,0 +1,113 @@
+# -*- coding: UTF-8 -*-
+#
+# Answers lots of Inner Sea date queries in one run, so that scripts which
+# need many days don't start a new interpreter for each one. Each line of
+# input is one query, either a date as "year month day" or "year-month-day",
+# or a single epoc day number. Each query gets one line of output, in the
+# same order, either as text:
+#
+#   Starday - Waning Gibbous
+#
+# or as a line of JSON, with the same fields as innersea.getDayData(). A query that
+# can't be understood gets an error line in its place, so the answers always
+# line up with the questions.
+#
+# Usage:
+#   inner_sea_calendar.py --batch dates.txt > answers.txt
+#   some_script | inner_sea_calendar.py --batch - --json --line-buffered
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import json
+
+from . import innersea
+from . import render
+from . import timeline
+
+QUERY_ERROR = "Expected <year> <month> <day>, <year>-<month>-<day> or an epoc day"
+
+# Returns the epoc day for a line of input, or raises ValueError.
+def parseQuery(line):
+    parts = line.split()
+    if (len(parts) == 3):
+        try:
+            year, month, day = [ int(p) for p in parts ]
+        except ValueError:
+            raise ValueError(QUERY_ERROR)
+    elif (len(parts) == 1):
+        match = timeline.DATE.match(parts[0])
+        if (not match):
+            try:
+                return int(parts[0])
+            except ValueError:
+                raise ValueError(QUERY_ERROR)
+        year, month, day = [ int(p) for p in match.groups() ]
+    else:
+        raise ValueError(QUERY_ERROR)
+
+    innersea.SYSTEM.checkDate(day, month, year)
+    return innersea.getEpocDay(day, month, year)
+
+# Template for a line of JSON output, with the same keys in the same order as
+# innersea.getDayData(). The names are encoded once, up front, so filling in
+# the template is several times faster than calling json.dumps() each time.
+JSON_LINE = ('{"year": %d, "month": %d, "monthName": %s, "day": %d, "epocDay": %d, "weekday": %d, '
+             '"weekdayName": %s, "phase": %d, "phaseName": %s, "moon": %s}\n')
+JSON_MONTHS = [ json.dumps(name) for name in innersea.MONTH ]
+JSON_WEEK = [ json.dumps(name) for name in innersea.WEEK ]
+JSON_PHASES = [ json.dumps(name) for name in innersea.MOON_PHASES ]
+JSON_MOONS = dict((name, json.dumps(name)) for name in innersea.MOON_NAME)
+
+# Returns the answer for an epoc day as a line of JSON.
+def getJsonLine(epocDay):
+    year, month, day, weekday = innersea.getDate(epocDay)
+    phase = innersea.MOON_CYCLE_PHASE[epocDay % innersea.LUNAR_CYCLE]
+    moon = "null"
+    if (epocDay % innersea.LUNAR_CYCLE in innersea.NAMED_MOON_DAYS):
+        name = innersea.getMoonsOfYear(year).get(epocDay)
+        if (name is not None):
+            moon = JSON_MOONS[name]
+    return JSON_LINE % (year, month, JSON_MONTHS[month - 1], day, epocDay, weekday, JSON_WEEK[weekday - 1],
+                        phase, JSON_PHASES[phase], moon)
+
+# Yields a line of output for each line of input. Blank lines and lines
+# starting with # are passed straight through, so as not to lose the place.
+def answerQueries(lines, asJson=False):
+    week = innersea.WEEK
+    phaseNames = innersea.MOON_PHASES
+    cyclePhase = innersea.MOON_CYCLE_PHASE
+    lunarCycle = innersea.LUNAR_CYCLE
+
+    for line in lines:
+        if (not line.strip() or line.lstrip().startswith("#")):
+            yield line if line.endswith("\n") else line + "\n"
+            continue
+        try:
+            epocDay = parseQuery(line)
+        except ValueError as e:
+            if (asJson):
+                yield json.dumps({ "error": str(e), "query": line.strip() }) + "\n"
+            else:
+                yield "Error: " + str(e) + "\n"
+            continue
+
+        if (asJson):
+            yield getJsonLine(epocDay)
+        else:
+            yield week[(epocDay - 1) % 7] + " - " + phaseNames[cyclePhase[epocDay % lunarCycle]] + "\n"
+
+# Answers every query from source, writing the results to sink. If
+# lineBuffered is set, each answer is flushed as soon as it is ready, for
+# when another program is waiting on each answer before asking the next
+# question. Otherwise the output is written in large blocks.
+def runQueries(source, sink, asJson=False, lineBuffered=False):
+    if (lineBuffered):
+        for answer in answerQueries(source, asJson):
+            sink.write(answer)
+            sink.flush()
+    else:
+        render.writeFragments(answerQueries(source, asJson), sink)
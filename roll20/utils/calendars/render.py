@@ -0,0 +1,280 @@
+# -*- coding: UTF-8 -*-
+#
+# Renders months of the Inner Sea and Imperium calendars as DokuWiki or HTML.
+# Everything is passed in explicitly, either as arguments or bundled up in a
+# RenderContext, and nothing is kept in globals, so any number of threads can
+# render different calendars, formats and images at once. Output is generated
+# as a stream of text fragments which can be written out as they are
+# produced, so memory use does not grow with the amount of output.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import html as htmlText
+import os
+
+from . import imperium
+from . import innersea
+
+# Yields a month of the Inner Sea calendar as a series of text fragments. If
+# html is set, outputs an HTML table, otherwise DokuWiki. images is the path
+# to a directory of month images to include in HTML output. events is an
+# optional timeline.Timeline of events to show on their days.
+def innerSeaMonth(month, year, html=False, images=None, events=None):
+    layout = innersea.getYearLayout(year)
+    extras = getMoonExtras(layout, month, html)
+    if (events):
+        extras = addEventExtras(extras, events, layout.getMonthStart(month), html)
+    return innersea.SYSTEM.monthFragments(month, year, html, images, extras)
+
+# Returns the moon phase, and the name of any named moon, for each day of the
+# month, to go in the calendar cells.
+def getMoonExtras(layout, month, html):
+    epocStartDay = layout.getMonthStart(month)
+    moonUnicode = innersea.MOON_UNICODE
+    extras = []
+    for day in range(1, layout.monthDays[month - 1] + 1):
+        phase = moonUnicode[layout.getPhase(month, day)]
+        if (not html):
+            extras.append(phase)
+        elif (epocStartDay + day - 1 in layout.moons):
+            extras.append("<span class='phase'>" + phase + "</span><span class='name'>" +
+                          layout.moons[epocStartDay + day - 1] + " Moon</span>")
+        else:
+            extras.append("<span class='phase'>" + phase + "</span>")
+    return extras
+
+# Adds the titles of the events on each day of a month to the extras for
+# the month. The timeline is searched once for the whole month.
+def addEventExtras(extras, events, epocStartDay, html):
+    days = events.byDay(epocStartDay, epocStartDay + len(extras) - 1)
+    extras = list(extras)
+    for d, dayEvents in enumerate(days):
+        for event in dayEvents:
+            if (html):
+                extras[d] += "<div class='event'>" + htmlText.escape(event.title) + "</div>"
+            else:
+                extras[d] += "\\\\ " + event.title.replace("|", "/")
+    return extras
+
+# Returns a month of the Inner Sea calendar as a single string.
+def innerSeaCalendar(month, year, html=False, images=None, events=None):
+    return "".join(innerSeaMonth(month, year, html, images, events))
+
+# Yields a month of the Imperium calendar, in the same formats as above.
+# Days are labelled by day of the year.
+def imperiumMonth(month, html=False, images=None, year=1, events=None):
+    extras = None
+    if (events):
+        system = imperium.SYSTEM
+        extras = addEventExtras([ "" ] * system.getMonthDays(month, year), events,
+                                system.getEpocDay(1, month, year), html)
+    return imperium.SYSTEM.monthFragments(month, year, html, images, extras)
+
+# Returns a month of the Imperium calendar as a single string.
+def imperiumCalendar(month, html=False, images=None, year=1, events=None):
+    return "".join(imperiumMonth(month, html, images, year, events))
+
+# Yields a month of either calendar. If a cache.FragmentCache is given, the
+# month is taken from it if it has been rendered before, otherwise it is
+# rendered and stored.
+def cachedMonth(calendar, month, year, html=False, images=None, events=None, cache=None):
+    if (calendar == "innersea"):
+        system = innersea.SYSTEM
+        fragments = lambda: innerSeaMonth(month, year, html, images, events)
+    else:
+        system = imperium.SYSTEM
+        fragments = lambda: imperiumMonth(month, html, images, year, events)
+    if (cache is None):
+        return fragments()
+
+    monthEvents = None
+    if (events):
+        epocStartDay = system.getEpocDay(1, month, year)
+        monthEvents = events.between(epocStartDay, epocStartDay + system.getMonthDays(month, year) - 1)
+    key = cache.getKey(calendar, year, month, html, images, monthEvents)
+    return [ cache.fetch(key, lambda: "".join(fragments())) ]
+
+CSS = [ "<style>\n",
+        "table, th, td {\n",
+        "    border: 1px solid black;\n",
+        "    border-collapse;\n",
+        "    font-size: large;\n",
+        "}\n",
+        "div.month {\n",
+        "    page-break-inside: avoid;\n",
+        "}\n",
+        "img {\n",
+        "  width: 100%;\n",
+        "}\n",
+        "h2 {\n",
+        "  margin-bottom: 0px\n",
+        "}\n",
+        "p {\n",
+        "  margin: 0px\n",
+        "}\n",
+        "td {\n",
+        "  width: %(cellWidth)s;\n",
+        "  height: 4.5em;\n",
+        "  vertical-align: top;\n",
+        "}\n",
+        "td span.phase {\n",
+        "  align: right;\n",
+        "  float: right;\n",
+        "}\n",
+        "td span.name {\n",
+        "  vertical-align: top;\n",
+        "  display: block;\n",
+        "  float: right;\n",
+        "  clear: right;\n",
+        "  font-size: small;\n",
+        "  font-style: italic;\n",
+        "}\n",
+        "</style>\n</head>\n<body>\n" ]
+
+# Yields the start of an HTML page, up to and including the opening body tag.
+# Each line of the style sheet is followed by a blank line, as it always has been.
+def header(title, cellWidth="8em"):
+    yield "<html>\n<head>\n<title>" + title + "</title>\n\n"
+    for line in CSS:
+        yield line.replace("%(cellWidth)s", cellWidth) + "\n"
+
+# Returns the start of an HTML page as a single string.
+def getHeader(title, cellWidth="8em"):
+    return "".join(header(title, cellWidth))
+
+# Returns the end of an HTML page.
+def getFooter():
+    return "</body>\n</html>\n\n"
+
+# Yields a whole page for one Inner Sea year, or for a single month of it if
+# month is given, exactly as output by inner_sea_calendar.py.
+def innerSeaPage(year, month=None, html=False, images=None, events=None, cache=None):
+    if (month):
+        if (html):
+            yield from header(innersea.MONTH[month - 1] + " " + str(year) + " AR")
+        yield from cachedMonth("innersea", month, year, html, images, events, cache)
+        yield "\n"
+    else:
+        if (html):
+            yield from header(str(year) + " AR")
+        else:
+            yield "====== " + str(year) + " AR ======\n\n"
+        for m in range(1, 13):
+            yield from cachedMonth("innersea", m, year, html, images, events, cache)
+            yield "\n"
+        yield "\n\n"
+
+    if (html):
+        yield getFooter()
+
+# Yields a whole page for one Imperium year, or for a single month of it if
+# month is given, exactly as output by imperium_calendar.py.
+def imperiumPage(year, month=None, html=False, images=None, events=None, cache=None):
+    if (month):
+        if (html):
+            yield from header("Month " + str(month) + " " + str(year) + " IC", "7em")
+        yield from cachedMonth("imperium", month, year, html, images, events, cache)
+        yield "\n"
+    else:
+        if (html):
+            yield from header(str(year) + " IC", "7em")
+            yield from imperium.SYSTEM.holidayFragments()
+        else:
+            yield "====== " + str(year) + " IC ======\n\n"
+        for m in range(1, len(imperium.MONTH_DAYS) + 1):
+            yield from cachedMonth("imperium", m, year, html, images, events, cache)
+            yield "\n"
+        yield "\n\n"
+
+    if (html):
+        yield getFooter()
+
+# Everything that decides how a calendar is rendered: which calendar, HTML or
+# DokuWiki, the images, the events and the cache. A context isn't changed once
+# it has been made, and rendering doesn't change anything it holds (timelines
+# are indexed as they are built, and the cache has a lock), so one can be
+# shared between threads, and different threads can use different contexts
+# at the same time.
+class RenderContext(object):
+    __slots__ = ("calendar", "system", "html", "images", "events", "cache")
+
+    def __init__(self, calendar="innersea", html=False, images=None, events=None, cache=None):
+        if (calendar not in PAGES):
+            raise ValueError("Unknown calendar '" + str(calendar) + "', expected one of " + ", ".join(sorted(PAGES)))
+        self.calendar = calendar
+        self.system = innersea.SYSTEM if calendar == "innersea" else imperium.SYSTEM
+        self.html = html
+        self.images = images
+        self.events = events
+        self.cache = cache
+
+    def __repr__(self):
+        return "RenderContext(%r, html=%r, images=%r)" % (self.calendar, self.html, self.images)
+
+    # Returns a copy of the context with some settings changed, e.g.
+    # context.replace(html=True).
+    def replace(self, **changes):
+        settings = dict(calendar=self.calendar, html=self.html, images=self.images,
+                        events=self.events, cache=self.cache)
+        settings.update(changes)
+        return RenderContext(**settings)
+
+    # Returns the number of months in a year of this calendar.
+    def getMonthCount(self):
+        return len(self.system.monthDays)
+
+    # Yields the fragments of one month.
+    def monthFragments(self, month, year):
+        return cachedMonth(self.calendar, month, year, self.html, self.images, self.events, self.cache)
+
+    # Yields the fragments of a page for a year, or one month of it, exactly
+    # as output by the calendar scripts.
+    def pageFragments(self, year, month=None):
+        return PAGES[self.calendar](year, month, self.html, self.images, self.events, self.cache)
+
+    def renderMonth(self, month, year):
+        return "".join(self.monthFragments(month, year))
+
+    def renderPage(self, year, month=None):
+        return "".join(self.pageFragments(year, month))
+
+PAGES = { "innersea": innerSeaPage, "imperium": imperiumPage }
+
+# Size of the buffer used by writeFragments(), in characters.
+WRITE_BUFFER = 65536
+
+# Writes fragments of text to any file-like object, collecting them up and
+# writing them in blocks of around bufferSize characters. Only the current
+# block is held in memory, however much is being written.
+def writeFragments(fragments, sink, bufferSize=WRITE_BUFFER):
+    block = []
+    size = 0
+    for fragment in fragments:
+        block.append(fragment)
+        size += len(fragment)
+        if (size >= bufferSize):
+            sink.write("".join(block))
+            block = []
+            size = 0
+    if (block):
+        sink.write("".join(block))
+
+# Checks that an image directory exists and contains 1.jpg .. <count>.jpg,
+# reading the directory once. Returns an error message, or None if everything
+# is there.
+def checkImages(path, count):
+    if (not os.path.exists(path)):
+        return "Path [" + path + "] does not exist.\n"
+    if (not os.path.isdir(path)):
+        return "Path [" + path + "] is not a directory.\n"
+
+    names = set(os.listdir(path))
+    for m in range(1, count + 1):
+        if (str(m) + ".jpg" not in names):
+            return "Directory [" + path + "] must contain " + str(count) + " images 1.jpg .. " + str(count) + ".jpg"
+
+    return None
@@ -0,0 +1,253 @@
+# -*- coding: UTF-8 -*-
+#
+# Searches for Inner Sea days matching a set of conditions, such as every
+# Starday with a Full Moon between 4700 and 4720 AR, or the next Fireday
+# with a New Moon.
+#
+# Rather than checking every day, the search uses the cycles the calendar is
+# built from. The day of the week repeats every 7 days and the moon every 59,
+# so together they repeat every 413 days, and a table of how far it is from
+# each day of that cycle to the next day that matches lets the search jump
+# straight from one candidate to the next. Months and leap years limit which
+# stretches of days are searched at all, and named moons are only looked up
+# for days which are already known to be the right phase.
+#
+# Results are generated lazily, in order, so a search can cover thousands of
+# years, or have no end at all, and only does the work for the results that
+# are used. The whole calendar, moons and all, repeats every 3304 years, so a
+# search with no end stops if that long goes by without a match, as there
+# will never be another one.
+#
+# Usage:
+#   python3 -m calendars.search --weekday Starday --phase "Full Moon" --from-year 4700 --to-year 4720
+#   python3 -m calendars.search --weekday Fireday --phase "New Moon" --after 4707-3-15 --limit 1
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import argparse
+import itertools
+import math
+import sys
+
+from . import innersea
+from . import timeline
+
+# Length of the combined week and lunar cycle.
+CYCLE = 7 * innersea.LUNAR_CYCLE
+
+# Number of days after which the leap cycle, the week and the moon all line
+# up again, so that every day matches exactly as the one this many days
+# before it did.
+REPEAT = math.lcm(innersea.CYCLE_LENGTH, CYCLE)
+
+# Returns the index (from first) of a name in a list, or the number itself if
+# it is already a number.
+def getIndex(value, names, first):
+    if (isinstance(value, int)):
+        return value
+    for i, name in enumerate(names):
+        if (name.lower() == str(value).lower()):
+            return i + first
+    raise ValueError("Unknown value '" + str(value) + "', expected one of " + ", ".join(names))
+
+class DateQuery(object):
+    # Each condition is a list of acceptable values, or None for any. Days of
+    # the week and months may be names or numbers (1 based), moon phases may
+    # be names or indexes (0 - 7). moons is a list of named moons, such as
+    # "Harvest", or True for any named moon. leapYear is True or False to only
+    # match days in leap years or in other years.
+    def __init__(self, weekdays=None, phases=None, moons=None, months=None, leapYear=None):
+        self.weekdays = None if weekdays is None else set(getIndex(w, innersea.WEEK, 1) for w in weekdays)
+        self.phases = None if phases is None else set(getIndex(p, innersea.MOON_PHASES, 0) for p in phases)
+        self.anyMoon = moons is not None
+        self.moonNames = None
+        if (moons is not None and moons is not True):
+            self.moonNames = set(innersea.MOON_NAME[getIndex(m, innersea.MOON_NAME, 0)] for m in moons)
+        self.months = None if months is None else sorted(set(getIndex(m, innersea.MONTH, 1) for m in months))
+        self.leapYear = leapYear
+
+        # For each day of the cycle, the number of days to the next day which
+        # is on a wanted day of the week and phase of the moon, or None if no
+        # day ever matches.
+        matching = [ r for r in range(0, CYCLE) if self.matchesCycle(r) ]
+        self.nextMatch = None
+        if (matching):
+            matching.append(matching[0] + CYCLE)
+            self.nextMatch = []
+            m = 0
+            for r in range(0, CYCLE):
+                while matching[m] < r:
+                    m += 1
+                self.nextMatch.append(matching[m] - r)
+
+    # Whether an epoc day congruent to cycleDay (mod CYCLE) matches the day
+    # of the week and moon conditions, which depend only on that.
+    def matchesCycle(self, cycleDay):
+        if (self.weekdays is not None and (cycleDay - 1) % 7 + 1 not in self.weekdays):
+            return False
+        lunarDay = cycleDay % innersea.LUNAR_CYCLE
+        if (self.phases is not None and innersea.MOON_CYCLE_PHASE[lunarDay] not in self.phases):
+            return False
+        if (self.anyMoon and lunarDay not in innersea.NAMED_MOON_DAYS):
+            return False
+        return True
+
+    # Checks a single day against every condition, the slow way.
+    def matches(self, epocDay):
+        year, month, day, weekday = innersea.getDate(epocDay)
+        if (self.weekdays is not None and weekday not in self.weekdays):
+            return False
+        if (self.phases is not None and innersea.getEpocMoonPhaseIndex(epocDay) not in self.phases):
+            return False
+        if (self.anyMoon):
+            name = innersea.getMoonsOfYear(year).get(epocDay)
+            if (name is None or (self.moonNames is not None and name not in self.moonNames)):
+                return False
+        if (self.months is not None and month not in self.months):
+            return False
+        if (self.leapYear is not None and innersea.SYSTEM.isLeapYear(year) != self.leapYear):
+            return False
+        return True
+
+    # Yields (first, last) epoc day ranges, in order, which are in the wanted
+    # months of the wanted years, and overlap first to last. last may be None
+    # to carry on for ever.
+    def getRanges(self, first, last):
+        if (self.months is None and self.leapYear is None):
+            yield (first, last)
+            return
+
+        year = innersea.getYear(first)
+        while last is None or innersea.getEpocDay(1, 1, year) <= last:
+            if (self.leapYear and not innersea.SYSTEM.isLeapYear(year)):
+                year += innersea.LEAP_YEAR - year % innersea.LEAP_YEAR
+                continue
+            if (self.leapYear is None or innersea.SYSTEM.isLeapYear(year) == self.leapYear):
+                if (self.months is None):
+                    spans = [ (innersea.getEpocDay(1, 1, year), innersea.getEpocDay(31, 12, year)) ]
+                else:
+                    spans = [ (innersea.getEpocDay(1, m, year),
+                               innersea.getEpocDay(innersea.SYSTEM.getMonthDays(m, year), m, year)) for m in self.months ]
+                for start, end in spans:
+                    start = max(start, first)
+                    if (last is not None):
+                        end = min(end, last)
+                    if (start <= end):
+                        yield (start, end)
+            year += 1
+
+    # Yields every matching epoc day from first to last inclusive, in order.
+    # If last is None, the search carries on until REPEAT days go by without
+    # a match, which means that nothing after them can match either.
+    def search(self, first, last=None):
+        if (self.nextMatch is None):
+            return
+        nextMatch = self.nextMatch
+        moonNames = self.moonNames
+        giveUp = first + REPEAT
+        for start, end in self.getRanges(first, last):
+            if (last is None and start >= giveUp):
+                return
+            epocDay = start
+            while True:
+                epocDay += nextMatch[epocDay % CYCLE]
+                if (end is not None and epocDay > end):
+                    break
+                if (last is None and epocDay >= giveUp):
+                    return
+                if (moonNames is None or innersea.getMoonsOfYear(innersea.getYear(epocDay)).get(epocDay) in moonNames):
+                    yield epocDay
+                    giveUp = epocDay + 1 + REPEAT
+                epocDay += 1
+
+    # Returns the first matching epoc day after the given one, or None if
+    # there are none.
+    def findNext(self, epocDay):
+        return next(self.search(epocDay + 1), None)
+
+    # Yields matching days, but from the start of fromYear to the end of
+    # toYear.
+    def searchYears(self, fromYear, toYear):
+        return self.search(innersea.getEpocDay(1, 1, fromYear), innersea.getEpocDay(31, 12, toYear))
+
+    # Compares the search against checking every day from first to last, and
+    # returns a list of errors.
+    def check(self, first, last):
+        found = list(self.search(first, last))
+        expected = [ d for d in range(first, last + 1) if self.matches(d) ]
+        if (found == expected):
+            return []
+        return [ "Search found " + str(len(found)) + " days, checking every day found " + str(len(expected)) ]
+
+# Describes a day, e.g. "4707-3-5 Starday, Full Moon (Long Moon)".
+def describeDay(epocDay):
+    year, month, day, weekday = innersea.getDate(epocDay)
+    text = "%d-%d-%d %s, %s" % (year, month, day, innersea.WEEK[weekday - 1],
+                                innersea.MOON_PHASES[innersea.getEpocMoonPhaseIndex(epocDay)])
+    moon = innersea.getMoonsOfYear(year).get(epocDay)
+    if (moon):
+        text += " (" + moon + " Moon)"
+    return text
+
+# Parses a year-month-day date into an epoc day.
+def parseDate(text):
+    return timeline.parseDate(innersea.SYSTEM, text)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search for Inner Sea days by weekday, moon, month and leap year.")
+    parser.add_argument("--weekday", action="append", help="Day of the week, by name or 1 - 7. May be repeated.")
+    parser.add_argument("--phase", action="append", help="Moon phase, by name or 0 - 7. May be repeated.")
+    parser.add_argument("--moon", action="append",
+                        help="Named moon, e.g. Harvest, or 'any' for any named moon. May be repeated.")
+    parser.add_argument("--month", action="append", help="Month, by name or 1 - 12. May be repeated.")
+    leap = parser.add_mutually_exclusive_group()
+    leap.add_argument("--leap-year", dest="leapYear", action="store_const", const=True, help="Only leap years.")
+    leap.add_argument("--not-leap-year", dest="leapYear", action="store_const", const=False, help="No leap years.")
+    parser.add_argument("--from-year", dest="fromYear", type=int, metavar="YEAR")
+    parser.add_argument("--to-year", dest="toYear", type=int, metavar="YEAR")
+    parser.add_argument("--after", metavar="DATE", help="Search from the day after year-month-day, with no end.")
+    parser.add_argument("--limit", type=int, help="Stop after this many results.")
+    parser.add_argument("--check", action="store_true", default=False,
+                        help="Check the results against testing every day of the range.")
+    args = parser.parse_args(argv)
+
+    def numbers(values):
+        if (values is None):
+            return None
+        return [ int(v) if v.isdigit() else v for v in values ]
+
+    moons = args.moon
+    if (moons is not None and "any" in [ m.lower() for m in moons ]):
+        moons = True
+
+    try:
+        query = DateQuery(numbers(args.weekday), numbers(args.phase), moons, numbers(args.month), args.leapYear)
+        if (args.after):
+            first, last = parseDate(args.after) + 1, None
+        elif (args.fromYear is not None and args.toYear is not None):
+            first, last = innersea.getEpocDay(1, 1, args.fromYear), innersea.getEpocDay(31, 12, args.toYear)
+        else:
+            parser.error("Give either --from-year and --to-year, or --after")
+    except ValueError as e:
+        parser.error(str(e))
+
+    if (args.check):
+        if (last is None):
+            parser.error("--check needs --from-year and --to-year")
+        errors = query.check(first, last)
+        for error in errors:
+            print(error)
+        print("Checked %d days, %d errors." % (last - first + 1, len(errors)))
+        return 1 if errors else 0
+
+    for epocDay in itertools.islice(query.search(first, last), args.limit):
+        print(describeDay(epocDay))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
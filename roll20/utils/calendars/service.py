@@ -0,0 +1,199 @@
+# -*- coding: UTF-8 -*-
+#
+# A small local HTTP service for Inner Sea calendar data, so that other tools
+# can ask for days, months and years without starting a new interpreter for
+# every lookup. Uses asyncio and nothing outside the standard library.
+#
+#   GET /day/<year>/<month>/<day>              JSON for a single day
+#   GET /month/<year>/<month>[?format=...]     One month
+#   GET /year/<year>[?format=...]              A whole year
+#
+# format is one of json (the default), html or dokuwiki. Responses are kept in
+# an LRU cache, and carry an ETag so that clients can send If-None-Match and
+# get back a 304 if nothing has changed.
+#
+# Usage:
+#   python3 -m calendars.service [--host 127.0.0.1] [--port 8020]
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import argparse
+import asyncio
+import collections
+import hashlib
+import json
+import sys
+import urllib.parse
+
+from . import innersea
+from . import render
+
+DEFAULT_PORT = 8020
+CACHE_SIZE = 1024
+
+STATUS_TEXT = { 200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+                405: "Method Not Allowed" }
+
+CONTENT_TYPES = { "json": "application/json; charset=utf-8",
+                  "html": "text/html; charset=utf-8",
+                  "dokuwiki": "text/plain; charset=utf-8" }
+
+# Raised for a request that can't be answered, with the HTTP status to send.
+class RequestError(Exception):
+    def __init__(self, status, message):
+        Exception.__init__(self, message)
+        self.status = status
+
+getDayData = innersea.getDayData
+
+# Checks that a year, month and day make a real date.
+def checkDate(year, month=1, day=1):
+    try:
+        innersea.SYSTEM.checkDate(day, month, year)
+    except ValueError as e:
+        raise RequestError(404, str(e))
+
+# Works out the response body and content type for a path and query string.
+def buildResponse(path, query):
+    parts = [ p for p in path.split("/") if p ]
+    outputFormat = query.get("format", [ "json" ])[0]
+    if (outputFormat not in CONTENT_TYPES):
+        raise RequestError(400, "Unknown format " + outputFormat)
+
+    try:
+        numbers = [ int(p) for p in parts[1:] ]
+    except ValueError:
+        raise RequestError(404, "Dates must be numeric")
+
+    if (len(parts) == 4 and parts[0] == "day"):
+        year, month, day = numbers
+        checkDate(year, month, day)
+        body = json.dumps(getDayData(innersea.getEpocDay(day, month, year)))
+        outputFormat = "json"
+    elif (len(parts) == 3 and parts[0] == "month"):
+        year, month = numbers
+        checkDate(year, month)
+        if (outputFormat == "json"):
+            start = innersea.getEpocDay(1, month, year)
+            days = innersea.getYearLayout(year).monthDays[month - 1]
+            body = json.dumps([ getDayData(d) for d in range(start, start + days) ])
+        else:
+            body = render.innerSeaCalendar(month, year, outputFormat == "html")
+    elif (len(parts) == 2 and parts[0] == "year"):
+        year = numbers[0]
+        checkDate(year)
+        if (outputFormat == "json"):
+            body = json.dumps([ getDayData(d) for d in range(innersea.getEpocDay(1, 1, year),
+                                                             innersea.getEpocDay(31, 12, year) + 1) ])
+        else:
+            body = "".join(render.innerSeaCalendar(m, year, outputFormat == "html") for m in range(1, 13))
+    else:
+        raise RequestError(404, "Unknown path " + path)
+
+    return (body.encode("utf-8"), CONTENT_TYPES[outputFormat])
+
+class CalendarService(object):
+    def __init__(self, cacheSize=CACHE_SIZE):
+        self.cacheSize = cacheSize
+        self.cache = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    # Returns (body, content type, etag) for a request target, from the cache
+    # if possible.
+    def lookup(self, target):
+        if (target in self.cache):
+            self.cache.move_to_end(target)
+            self.hits += 1
+            return self.cache[target]
+
+        self.misses += 1
+        url = urllib.parse.urlsplit(target)
+        body, contentType = buildResponse(url.path, urllib.parse.parse_qs(url.query))
+        entry = (body, contentType, '"' + hashlib.sha1(body).hexdigest() + '"')
+
+        self.cache[target] = entry
+        if (len(self.cache) > self.cacheSize):
+            self.cache.popitem(last=False)
+        return entry
+
+    # Returns the status, headers and body to send back for a request.
+    def respond(self, method, target, headers):
+        if (method not in ("GET", "HEAD")):
+            return (405, { "Content-Type": "text/plain" }, b"Only GET is supported\n")
+        try:
+            body, contentType, etag = self.lookup(target)
+        except RequestError as e:
+            return (e.status, { "Content-Type": "text/plain" }, (str(e) + "\n").encode("utf-8"))
+
+        if (etag in [ t.strip() for t in headers.get("if-none-match", "").split(",") ]):
+            return (304, { "ETag": etag }, b"")
+        return (200, { "Content-Type": contentType, "ETag": etag }, body)
+
+    # Handles one connection, which may carry any number of keep-alive requests.
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                requestLine = await reader.readline()
+                if (not requestLine):
+                    break
+                try:
+                    method, target, version = requestLine.decode("latin-1").split()
+                except ValueError:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if (line in (b"\r\n", b"\n", b"")):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                status, responseHeaders, body = self.respond(method, target, headers)
+                keepAlive = (version == "HTTP/1.1" and headers.get("connection", "").lower() != "close")
+
+                head = "HTTP/1.1 %d %s\r\n" % (status, STATUS_TEXT[status])
+                for name, value in responseHeaders.items():
+                    head += name + ": " + value + "\r\n"
+                head += "Content-Length: %d\r\n" % len(body)
+                head += "Connection: %s\r\n\r\n" % ("keep-alive" if keepAlive else "close")
+                if (method == "HEAD"):
+                    body = b""
+                writer.write(head.encode("latin-1") + body)
+                await writer.drain()
+
+                if (not keepAlive):
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+async def serve(host, port, cacheSize=CACHE_SIZE):
+    service = CalendarService(cacheSize)
+    server = await asyncio.start_server(service.handle, host, port)
+    async with server:
+        await server.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve Inner Sea calendar data over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on.")
+    parser.add_argument("--cache-size", dest="cacheSize", type=int, default=CACHE_SIZE,
+                        help="Number of responses to keep cached.")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.cacheSize))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
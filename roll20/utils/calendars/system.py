@@ -0,0 +1,293 @@
+# -*- coding: UTF-8 -*-
+#
+# Table driven calendar engine. A calendar is described by a small definition
+# (month lengths, leap years, week days, holidays and where the week starts),
+# which is compiled into a lookup table covering one full leap cycle. Every
+# calendar then gets the same constant time date conversions and is rendered
+# by the same code.
+#
+# A definition is a dictionary with:
+#
+#   name         - Name of the calendar.
+#   era          - Suffix for years, e.g. "AR".
+#   months       - Month names, or None to just number them.
+#   monthDays    - Days in each month in a normal year.
+#   leapDays     - Days in each month in a leap year. Defaults to monthDays.
+#   leapYear     - Every year divisible by this is a leap year. None for none.
+#   week         - Names of the days of the week.
+#   holidays     - List of (day in year, name) for days which come between
+#                  months and are not part of the week.
+#   epochWeekday - Day of the week (1 based) of the first week day of year 1.
+#   monthText    - Optional description of each month.
+#   dayLabel     - "month" to label days by day of month, "year" to label them
+#                  by three digit day of year.
+#   dokuWikiCell - Optional (before, between, after) text around a day's label
+#                  and its extras in a DokuWiki cell.
+#   htmlCell     - The same for an HTML cell.
+#
+# Dates are (day, month, year), and epoc day 1 is the first day of year 1.
+# Holidays have month 0, with day being the holiday's number (1 based), and
+# have no day of the week (0).
+#
+# Everything is done with integers, using divmod, which rounds down, to find
+# the leap cycle. Years before 1 work the same way, counting back through
+# year 0 and then negative years, and a date millions of years away costs no
+# more than one nearby.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+class CalendarSystem(object):
+    def __init__(self, definition):
+        self.name = definition["name"]
+        self.era = definition["era"]
+        self.monthDays = list(definition["monthDays"])
+        self.leapDays = list(definition.get("leapDays") or self.monthDays)
+        self.months = definition.get("months") or [ "Month " + str(m) for m in range(1, len(self.monthDays) + 1) ]
+        self.namedMonths = definition.get("months") is not None
+        self.leapYear = definition.get("leapYear") or 1
+        self.week = list(definition["week"])
+        self.weekLength = len(self.week)
+        self.holidays = sorted(definition.get("holidays", []))
+        self.epochWeekday = definition.get("epochWeekday", 1)
+        self.monthText = definition.get("monthText")
+        self.dayLabel = definition.get("dayLabel", "month")
+        self.dokuWikiCell = tuple(definition.get("dokuWikiCell", ("|  ", " ", "\\\\ \\\\ ")))
+        self.htmlCell = tuple(definition.get("htmlCell", ("<td>", "", "</td>\n")))
+
+        self.yearLength = sum(self.monthDays) + len(self.holidays)
+        self.leapYearLength = sum(self.leapDays) + len(self.holidays)
+        self.cycleLength = self.yearLength * (self.leapYear - 1) + self.leapYearLength
+
+        # Day in year (0 based) of the start of each month, for normal and
+        # leap years. Index 0 is unused, so that months are numbered from 1.
+        self.monthOffsets = self.buildMonthOffsets(self.monthDays)
+        self.leapOffsets = self.buildMonthOffsets(self.leapDays)
+
+        # (day in cycle of the start of the year, month offsets) for each year
+        # of the leap cycle, so that a date can be converted with one lookup.
+        self.cycleYears = [ (y * self.yearLength, self.leapOffsets if y == self.leapYear - 1 else self.monthOffsets)
+                            for y in range(0, self.leapYear) ]
+
+        self.buildCycleTable()
+
+    # Returns the offset of the start of each month within the year, allowing
+    # for the holidays. The last entry is the length of the year.
+    def buildMonthOffsets(self, monthDays):
+        offsets = [ 0 ]
+        dayInYear = 0
+        for days in monthDays:
+            while any(h[0] == dayInYear + 1 for h in self.holidays):
+                dayInYear += 1
+            offsets.append(dayInYear)
+            dayInYear += days
+        offsets.append(dayInYear + sum(1 for h in self.holidays if h[0] > dayInYear))
+        return offsets
+
+    # Builds a table of (year in cycle, month, day, day in year, week day
+    # number) for every day of the leap cycle. The week day number counts days
+    # which are part of the week from the start of the cycle, or is -1 for
+    # holidays.
+    def buildCycleTable(self):
+        table = []
+        weekDay = 0
+        for yearInCycle in range(1, self.leapYear + 1):
+            cal = self.leapDays if (yearInCycle == self.leapYear) else self.monthDays
+            holidays = dict((h[0], n + 1) for n, h in enumerate(self.holidays))
+            month = 1
+            day = 0
+            for dayInYear in range(1, sum(cal) + len(self.holidays) + 1):
+                if (dayInYear in holidays):
+                    table.append((yearInCycle, 0, holidays[dayInYear], dayInYear, -1))
+                    continue
+                day += 1
+                if (day > cal[month - 1]):
+                    month += 1
+                    day = 1
+                table.append((yearInCycle, month, day, dayInYear, weekDay))
+                weekDay += 1
+
+        self.cycleTable = table
+        self.weekDaysPerCycle = weekDay
+
+    def isLeapYear(self, year):
+        return self.leapYear > 1 and (year % self.leapYear) == 0
+
+    # Returns (year, month, day, day of week) for an epoc day.
+    def getDate(self, epocDay):
+        cycle, cycleDay = divmod(epocDay - 1, self.cycleLength)
+        yearInCycle, month, day, dayInYear, weekDay = self.cycleTable[cycleDay]
+        if (weekDay < 0):
+            return (cycle * self.leapYear + yearInCycle, month, day, 0)
+
+        weekday = (cycle * self.weekDaysPerCycle + weekDay + self.epochWeekday - 1) % self.weekLength + 1
+        return (cycle * self.leapYear + yearInCycle, month, day, weekday)
+
+    def getYear(self, epocDay):
+        cycle, cycleDay = divmod(epocDay - 1, self.cycleLength)
+        return cycle * self.leapYear + self.cycleTable[cycleDay][0]
+
+    def getMonthInYear(self, epocDay):
+        return self.cycleTable[(epocDay - 1) % self.cycleLength][1]
+
+    def getDayInMonth(self, epocDay):
+        return self.cycleTable[(epocDay - 1) % self.cycleLength][2]
+
+    def getDayInYear(self, epocDay):
+        return self.cycleTable[(epocDay - 1) % self.cycleLength][3]
+
+    # Returns the day of the week, from 1, or 0 for a holiday outside the week.
+    def getEpocDayOfWeek(self, epocDay):
+        cycle, cycleDay = divmod(epocDay - 1, self.cycleLength)
+        weekDay = self.cycleTable[cycleDay][4]
+        if (weekDay < 0):
+            return 0
+        return (cycle * self.weekDaysPerCycle + weekDay + self.epochWeekday - 1) % self.weekLength + 1
+
+    # Returns the epoc day of the start of a year.
+    def getYearStart(self, year):
+        cycle, yearInCycle = divmod(year - 1, self.leapYear)
+        return cycle * self.cycleLength + yearInCycle * self.yearLength + 1
+
+    # Returns the epoc day of a date. Month 0 is for holidays.
+    def getEpocDay(self, day, month, year):
+        if (month == 0):
+            return self.getYearStart(year) + self.holidays[day - 1][0] - 1
+        cycle, yearInCycle = divmod(year - 1, self.leapYear)
+        yearStart, offsets = self.cycleYears[yearInCycle]
+
+        return cycle * self.cycleLength + yearStart + offsets[month] + day
+
+    # Returns the epoc day of a day in the year (1 based).
+    def getEpocDayOfYear(self, dayInYear, year):
+        return self.getYearStart(year) + dayInYear - 1
+
+    def getMonthDays(self, month, year):
+        return (self.leapDays if self.isLeapYear(year) else self.monthDays)[month - 1]
+
+    # Raises ValueError, saying what is wrong, if a day, month and year aren't
+    # a real date. Month 0 is for holidays.
+    def checkDate(self, day, month, year):
+        if (month == 0 and self.holidays):
+            if (day < 1 or day > len(self.holidays)):
+                raise ValueError("Holiday must be 1 - " + str(len(self.holidays)))
+            return
+        if (month < 1 or month > len(self.monthDays)):
+            raise ValueError("Month must be 1 - " + str(len(self.monthDays)))
+        days = self.getMonthDays(month, year)
+        if (day < 1 or day > days):
+            raise ValueError("Day must be 1 - " + str(days))
+
+    # Yields a month of the calendar as HTML or DokuWiki text fragments. This is
+    # the one render path used by every calendar. images is either a directory
+    # holding 1.jpg, 2.jpg etc, or an images.ImageSet. extras is an optional list
+    # giving extra text to put in each day's cell, indexed by day - 1, which is
+    # how the Inner Sea calendar adds moon phases.
+    def monthFragments(self, month, year, html=False, images=None, extras=None):
+        epocStartDay = self.getEpocDay(1, month, year)
+        days = self.getMonthDays(month, year)
+
+        if (html):
+            if (self.namedMonths):
+                yield "<div class='month'><h2>" + self.months[month - 1] + " (" + str(month) + ") " + str(year) + " " + self.era + "</h2>\n"
+            else:
+                yield "<div class='month'><h2>" + self.months[month - 1] + "</h2>\n"
+            if (self.monthText):
+                yield "<p>" + self.monthText[month - 1] + "</p>"
+            if (images):
+                if (isinstance(images, str)):
+                    yield "<img src='" + images + "/" + str(month) + ".jpg'/>"
+                else:
+                    yield "<img src='" + images.getSource(month) + "'/>"
+            yield "<table>\n<tr>" + "".join("<th>" + name + "</th>" for name in self.week) + "</tr>\n"
+        else:
+            yield "===== " + (self.months[month - 1] if self.namedMonths else str(month)) + " =====\n"
+            yield "\n" + "".join("^  " + name + "  " for name in self.week) + "^\n"
+
+        if (self.dayLabel == "year"):
+            firstLabel = self.getDayInYear(epocStartDay)
+            labels = [ "%03d" % (firstLabel + d) for d in range(0, days) ]
+        else:
+            labels = [ str(d) for d in range(1, days + 1) ]
+        if (extras is None):
+            extras = [ "" ] * days
+
+        # Blank cells before the first of the month, so that each row of the
+        # table starts on the first day of the week.
+        blanks = self.getEpocDayOfWeek(epocStartDay) - 1
+        weekLength = self.weekLength
+
+        if (html):
+            before, between, after = self.htmlCell
+            for cell in range(0, blanks + days):
+                if cell % weekLength == 0:
+                    yield "<tr>\n"
+                if cell < blanks:
+                    yield "<td></td>\n"
+                else:
+                    yield before + labels[cell - blanks] + between + extras[cell - blanks] + after
+                if cell % weekLength == weekLength - 1:
+                    yield "</tr>\n"
+            yield "</table></div>\n"
+        else:
+            before, between, after = self.dokuWikiCell
+            for cell in range(0, blanks + days):
+                if cell < blanks:
+                    yield "| "
+                else:
+                    yield before + labels[cell - blanks] + between + extras[cell - blanks] + after
+                if cell % weekLength == weekLength - 1:
+                    yield "|\n"
+            if (blanks + days) % weekLength != 0:
+                yield "|\n"
+            yield "|" + " +++++++++++ |" * weekLength + "\n"
+
+    # Yields an HTML table listing the holidays of the year.
+    def holidayFragments(self):
+        for dayInYear, name in self.holidays:
+            yield "<table><tr><th>" + name + "</th></tr><tr><td>" + str(dayInYear) + "</td></tr></table>\n"
+
+# Checks a calendar system with count random dates between minYear and
+# maxYear, testing that each converts to an epoc day and back, that the next
+# day follows on from it, and that the start of each year agrees with simply
+# counting leap years. Returns a list of error messages. Only the tests use
+# this, so random is imported here rather than by every calendar.
+def checkRoundTrips(system, count, minYear, maxYear, seed=None):
+    import random
+
+    errors = []
+    rng = random.Random(seed)
+    extra = system.leapYearLength - system.yearLength
+    for i in range(0, count):
+        year = rng.randint(minYear, maxYear)
+        yearStart = system.getYearStart(year)
+        leapYears = (year - 1) // system.leapYear if system.leapYear > 1 else 0
+        if (yearStart != (year - 1) * system.yearLength + leapYears * extra + 1):
+            errors.append("Year " + str(year) + " starts on epoc day " + str(yearStart))
+            continue
+        yearLength = system.getYearStart(year + 1) - yearStart
+        if (yearLength != (system.leapYearLength if system.isLeapYear(year) else system.yearLength)):
+            errors.append("Year " + str(year) + " is " + str(yearLength) + " days long")
+            continue
+
+        epocDay = yearStart + rng.randint(0, yearLength - 1)
+        date = system.getDate(epocDay)
+        if (date[0] != year or system.getEpocDay(date[2], date[1], date[0]) != epocDay):
+            errors.append("Epoc day " + str(epocDay) + " is " + str(date) + ", which is epoc day " +
+                          str(system.getEpocDay(date[2], date[1], date[0])))
+            continue
+
+        # The next day is one further through the year, and one further
+        # through the week unless either day is a holiday.
+        following = system.getDate(epocDay + 1)
+        dayInYear = system.getDayInYear(epocDay)
+        nextDayInYear = system.getDayInYear(epocDay + 1)
+        if (not (nextDayInYear == dayInYear + 1 or (nextDayInYear == 1 and following[0] == year + 1))):
+            errors.append("Epoc day " + str(epocDay + 1) + " is " + str(following) + ", after " + str(date))
+        elif (date[3] and following[3] and following[3] != date[3] % system.weekLength + 1):
+            errors.append("Epoc day " + str(epocDay + 1) + " is day " + str(following[3]) +
+                          " of the week, after day " + str(date[3]))
+    return errors
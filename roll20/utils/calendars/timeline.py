@@ -0,0 +1,166 @@
+# -*- coding: UTF-8 -*-
+#
+# A timeline of campaign events (sessions, holidays, things happening in the
+# world), each running from a start epoc day to an end epoc day inclusive, in
+# whichever calendar the timeline is for.
+#
+# Events are kept sorted by start day, with a tree over them holding the
+# latest end day in each branch, so that finding every event that overlaps a
+# range of days takes O(log n) plus the number of events found. The renderers
+# ask for each month once, and spread the events over the days, rather than
+# searching for every day.
+#
+# Events can be loaded from a text file with one event per line:
+#
+#   4707-3-15 Session 12
+#   4707-3-20..4707-3-24 Midsummer fair
+#   # Comments and blank lines are ignored.
+#
+# Dates are year-month-day, and month 0 is for Imperium holidays. Years before
+# 1 are negative, e.g. -5293-1-1.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import bisect
+import re
+
+# year-month-day, where the year may be negative.
+DATE = re.compile(r"^(-?\d+)-(\d+)-(\d+)$")
+
+class Event(object):
+    __slots__ = ("start", "end", "title", "kind")
+
+    def __init__(self, start, end, title, kind="event"):
+        if (end < start):
+            raise ValueError("Event '" + title + "' ends before it starts")
+        self.start = start
+        self.end = end
+        self.title = title
+        self.kind = kind
+
+    def __repr__(self):
+        return "Event(%d, %d, %r, %r)" % (self.start, self.end, self.title, self.kind)
+
+    def __getstate__(self):
+        return (self.start, self.end, self.title, self.kind)
+
+    def __setstate__(self, state):
+        self.start, self.end, self.title, self.kind = state
+
+# The index is always kept up to date, so looking events up never changes a
+# timeline, and one timeline can be searched by many threads at once.
+class Timeline(object):
+    def __init__(self, events=()):
+        self.events = sorted(events, key=lambda e: (e.start, e.end))
+        self.index()
+
+    def __len__(self):
+        return len(self.events)
+
+    # Adds an event running from start to end (epoc days, inclusive). If end
+    # is not given, the event lasts a single day. This rebuilds the index, so
+    # lots of events should be given to Timeline() all at once instead.
+    def add(self, start, end=None, title="", kind="event"):
+        event = Event(start, start if end is None else end, title, kind)
+        key = (event.start, event.end)
+        position = bisect.bisect_right(self.starts, event.start)
+        while position > 0 and (self.events[position - 1].start, self.events[position - 1].end) > key:
+            position -= 1
+        self.events.insert(position, event)
+        self.index()
+        return event
+
+    # Builds the list of start days and the tree of end days over the sorted
+    # events. The tree is stored as an array, with the leaves in the second
+    # half and the root at 1, as for a heap.
+    def index(self):
+        self.starts = [ e.start for e in self.events ]
+
+        size = 1
+        while size < len(self.events):
+            size *= 2
+        maxEnds = [ None ] * (2 * size)
+        for i, event in enumerate(self.events):
+            maxEnds[size + i] = event.end
+        for i in range(size - 1, 0, -1):
+            left, right = maxEnds[2 * i], maxEnds[2 * i + 1]
+            maxEnds[i] = left if right is None or (left is not None and left > right) else right
+        self.maxEnds = maxEnds
+        self.size = size
+
+    # Returns every event which overlaps the days first to last, in order of
+    # start day.
+    def between(self, first, last):
+        found = []
+        count = bisect.bisect_right(self.starts, last)
+        if (count == 0):
+            return found
+
+        # Walk down the tree from the root, only into branches which hold
+        # events starting at or before last and ending at or after first.
+        maxEnds = self.maxEnds
+        size = self.size
+        stack = [ (1, 0, size) ]
+        while stack:
+            node, low, high = stack.pop()
+            if (low >= count or maxEnds[node] is None or maxEnds[node] < first):
+                continue
+            if (node >= size):
+                found.append(self.events[low])
+                continue
+            middle = (low + high) // 2
+            stack.append((2 * node + 1, middle, high))
+            stack.append((2 * node, low, middle))
+        return found
+
+    # Returns the events happening on a single day.
+    def on(self, epocDay):
+        return self.between(epocDay, epocDay)
+
+    # Returns a new timeline holding only the events which overlap the days
+    # first to last, e.g. to send one year's events to a worker process.
+    def subset(self, first, last):
+        return Timeline(self.between(first, last))
+
+    # Returns a list with the events for each day from first to last, indexed
+    # by day - first.
+    def byDay(self, first, last):
+        days = [ [] for d in range(first, last + 1) ]
+        for event in self.between(first, last):
+            for d in range(max(event.start, first), min(event.end, last) + 1):
+                days[d - first].append(event)
+        return days
+
+# Parses a year-month-day date into an epoc day using a CalendarSystem.
+def parseDate(system, text):
+    match = DATE.match(text)
+    if (not match):
+        raise ValueError("Bad date '" + text + "', expected year-month-day")
+    year, month, day = [ int(p) for p in match.groups() ]
+    try:
+        system.checkDate(day, month, year)
+    except ValueError as e:
+        raise ValueError("No such date '" + text + "' (" + str(e) + ")")
+    return system.getEpocDay(day, month, year)
+
+# Reads events from a text file, in the format described at the top, and
+# returns them as a Timeline.
+def loadTimeline(system, path):
+    events = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if (not line or line.startswith("#")):
+                continue
+            dates, _, title = line.partition(" ")
+            try:
+                first, _, last = dates.partition("..")
+                start = parseDate(system, first)
+                events.append(Event(start, parseDate(system, last) if last else start, title.strip()))
+            except ValueError as e:
+                raise ValueError(path + ":" + str(number) + ": " + str(e))
+    return Timeline(events)
@@ -1,8 +1,8 @@
-#!/usr/bin/python
+#!/usr/bin/python3
 #
 # Simple program to calculate the day of the week and moon phase given an Inner Sea date.
 # Assumes that 1 AR was on a Moonday, and that it was a full moon.
-# Does not work with dates before 1 AR.
+# Years before 1 count back through year 0 to negative years.
 #
 # Usage:
 # Print out a calendar (in DokuWiki) for the entire year:
@@ -48,231 +48,140 @@
 # either expressed or implied, of the FreeBSD Project.
 #
 
-import math
-import sys
 import argparse
 import os
+import sys
 
-# Calendar Constants
-MONTH_DAYS = 28
-YEAR_LENGTH = 365
-
-
-HTML=False
-
-WEEK = [ "Wonday", "Tuday", "Thirday", "Forday", "Fiday", "Sixday", "Senday" ]
-
-
-def getMonthInYear(epocDay):
-    cal = MONTH_DAYS
-    dayInYear = getDayInYear(epocDay)
-
-    month = 0
-    while dayInYear > cal[month]:
-        dayInYear -= cal[month]
-        month += 1
-
-    return month + 1
-
-def getDayInMonth(epocDay):
-    cal = MONTH_DAYS
-
-    dayInYear = getDayInYear(epocDay)
-
-    month = 0
-    while dayInYear > cal[month]:
-        dayInYear -= cal[month]
-        month += 1
-
-    return dayInYear
-
-
-# Get the epoc day from a date. This is the number of days since the first
-# day of the year in 1 AR. 1/1/1 is epoc day 1 (epoc day 0 does not exist).
-def getEpocDay(day, month, year):
-    cal = MONTH_DAYS
-
-    epocDay = (YEAR_LENGTH) * (year - 1)
-    epocDay += cal * (month - 1)
-    epocDay += day
-
-    return int(epocDay);
-
-# Returns a number from 1 - 7.
-def getDayOfWeek(day, month, year):
-    epocDay = getEpocDay(day, month, year)
-    dayOfWeek = (epocDay - 1) % len(WEEK) + 1
-
-    return dayOfWeek
-
-def getEpocDayOfWeek(epocDay):
-    return (epocDay - 1) % len(WEEK) + 1
-
-# Returns the name of the day for this date.
-def getNamedDayOfWeek(day, month, year):
-    dayOfWeek = getDayOfWeek(day, month, year)
-
-    return WEEK[dayOfWeek - 1]
-
-
-def calendar(month):
-    cal = MONTH_DAYS
-
-    if (HTML):
-        html = "<div class='month'><h2>Month " + str(month) + "</h2>\n"
-        if (args.images):
-            html += "<img src='" + args.images + "/" + str(month) + ".jpg'/>";
-    else:
-        html = "===== " + str(month) + " =====\n"
-
-    if (HTML):
-        html += "<table>\n<tr>"
-        for name in WEEK:
-            html += "<th>" + name + "</th>"
-        html += "</tr>\n"
-    else:
-        html += "\n"
-        for name in WEEK:
-            html += "^  " + name + "  "
-        html += "^\n"
-
-    startOfMonth = 2 + (month - 1) * 28
-    today = startOfMonth
-    
-    if (HTML):
-        while today < (startOfMonth + 28):
-
-            html += ("<td> {day:03d} ".format( day = today) + "</td>\n")
-
-            if (today - 1) % 7 == 0:
-                html += "</tr>\n"
-
-            today += 1
-    else:
-        while today < (startOfMonth + 28):
-            html += ("| {day:03d} \\\\ ".format( day = today))
-
-            if (today - 1) % 7 == 0:
-                html += "|\n"
-
-            today += 1
-
-        html += "|"
-
-    if (HTML):
-        print("</table></div>\n")
+from calendars import imperium
+from calendars import cache
+from calendars import export
+from calendars import images
+from calendars import profiling
+from calendars import render
+from calendars import timeline
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Output Imperium calendar with days. " +
+                    "Uses DokuWiki format unless HTML is specified.",
+        epilog="If only a year is specified, outputs the whole year. " +
+               "If a year and month is given, outputs the whole month. " +
+               "If a year, month and day is given, only outputs a single day.")
+    parser.add_argument("-H", "--html", dest="html", action="store_true", default=False, help="Output as HTML.")
+    parser.add_argument("-i", "--images", dest="images", help="Path to image folder.")
+    parser.add_argument("--image-width", dest="imageWidth", type=int, metavar="PIXELS",
+                        help="Resize images to this width. Needs Pillow.")
+    parser.add_argument("--image-format", dest="imageFormat", choices=sorted(images.FORMATS),
+                        help="Convert images to this format (default webp). Needs Pillow.")
+    parser.add_argument("--image-cache", dest="imageCache", metavar="DIR",
+                        help="Where to keep resized images. Defaults to 'prepared' in the image folder.")
+    parser.add_argument("--inline-images", dest="inlineImages", action="store_true", default=False,
+                        help="Put the images in the HTML as data URIs.")
+    parser.add_argument("--from-year", dest="fromYear", type=int, metavar="YEAR",
+                        help="Output every year from YEAR to --to-year, rendered in parallel.")
+    parser.add_argument("--to-year", dest="toYear", type=int, metavar="YEAR", help="Last year to output.")
+    parser.add_argument("-j", "--jobs", dest="jobs", type=int,
+                        help="Number of worker processes for --from-year. Defaults to one per CPU.")
+    parser.add_argument("--threads", dest="threads", action="store_true", default=False,
+                        help="Render --from-year with a pool of threads in this process, rather than worker processes.")
+    parser.add_argument("-e", "--events", dest="events", metavar="FILE",
+                        help="File of events to show on the calendar, one per line as <year>-<month>-<day>[..<year>-<month>-<day>] <title>.")
+    parser.add_argument("--cache", dest="cache", metavar="DIR",
+                        help="Directory to cache rendered months in, so that only changed months are rendered.")
+    parser.add_argument("--cache-size", dest="cacheSize", type=int, default=cache.MAX_BYTES // (1024 * 1024),
+                        metavar="MB", help="Largest size the cache may grow to. Each worker process keeps to this separately.")
+    parser.add_argument("--profile", dest="profile", metavar="FILE",
+                        help="Write a JSON report of where the time went to FILE, or - for stderr.")
+    parser.add_argument("dates", metavar="Date to display", type=int, nargs='*', help="<year> [<month> [<day>]]")
+
+    args = parser.parse_args(argv)
+
+    # Only this process can be profiled, so ranges are rendered here rather
+    # than by workers unless -j is given.
+    if (args.profile):
+        if (args.jobs is None):
+            args.jobs = 1
+        profiler = profiling.enable()
+        try:
+            return run(parser, args)
+        finally:
+            profiling.disable()
+            profiler.writeReport(args.profile)
+    return run(parser, args)
+
+# Does whatever the command line arguments ask for.
+def run(parser, args):
+    if ((args.fromYear is None) != (args.toYear is None)):
+        parser.error("--from-year and --to-year must be given together")
+    if (args.fromYear is None and (len(args.dates) == 0 or len(args.dates) > 3)):
+        parser.error("Expected <year> [<month> [<day>]]")
+
+    # A single day may be the Holiday, month 0, but a month must be a real one.
+    if (args.fromYear is None and len(args.dates) > 1):
+        try:
+            if (len(args.dates) == 2 and args.dates[1] == 0):
+                raise ValueError("Month must be 1 - " + str(len(imperium.MONTH_DAYS)))
+            imperium.SYSTEM.checkDate(args.dates[2] if len(args.dates) == 3 else 1, args.dates[1], args.dates[0])
+        except ValueError as e:
+            parser.error(str(e))
+
+    # If an image directory is specified, validate that it exists and contains
+    # images, then resize or inline them if asked to.
+    if (args.images):
+        error = render.checkImages(args.images, 13)
+        if (error):
+            print(error)
+            return 2
+        if (args.imageWidth or args.imageFormat):
+            try:
+                args.images = images.prepareImages(args.images, 13,
+                                                   args.imageCache or os.path.join(args.images, "prepared"),
+                                                   args.imageWidth or images.DEFAULT_WIDTH,
+                                                   args.imageFormat or "webp", inline=args.inlineImages,
+                                                   workers=args.jobs)
+            except (OSError, images.ImageError) as e:
+                print(e)
+                return 2
+        elif (args.inlineImages):
+            args.images = images.inlineImages(args.images, 13)
+
+    events = None
+    if (args.events):
+        try:
+            events = timeline.loadTimeline(imperium.SYSTEM, args.events)
+        except (OSError, ValueError) as e:
+            print(e)
+            return 2
+
+    fragmentCache = None
+    if (args.cache):
+        fragmentCache = cache.FragmentCache(args.cache, args.cacheSize * 1024 * 1024)
+
+    if (args.fromYear is not None):
+        years, elapsed, rate = export.exportYears("imperium", args.fromYear, args.toYear, sys.stdout,
+                                                  args.html, args.images, args.jobs, events, fragmentCache,
+                                                  args.threads)
+        sys.stderr.write("Rendered %d years in %.2fs (%.1f years/s)\n" % (years, elapsed, rate))
+    elif (len(args.dates) == 3):
+        argDay = int(args.dates[2])
+        argMonth = int(args.dates[1])
+        argYear = int(args.dates[0])
+
+        print( imperium.getNamedDayOfWeek(argDay, argMonth, argYear) )
     else:
-        for d in range(0, 7):
-            html += " +++++++++++ |"
-        html += "\n"
-
-    return html
-
-def outputCSS(title):
-    print("<html>\n<head>\n<title>" + title + "</title>\n")
-    print("<style>\n")
-    print("table, th, td {\n")
-    print("    border: 1px solid black;\n")
-    print("    border-collapse;\n")
-    print("    font-size: large;\n")
-    print("}\n")
-    print("div.month {\n")
-    print("    page-break-inside: avoid;\n")
-    print("}\n")
-    print("img {\n")
-    print("  width: 100%;\n")
-    print("}\n")
-    print("h2 {\n")
-    print("  margin-bottom: 0px\n");
-    print("}\n");
-    print("p {\n")
-    print("  margin: 0px\n");
-    print("}\n");
-    print("td {\n")
-    print("  width: 7em;\n")
-    print("  height: 4.5em;\n")
-    print("  vertical-align: top;\n")
-    print("}\n")
-    print("td span.phase {\n")
-    print("  align: right;\n")
-    print("  float: right;\n")
-    print("}\n")
-    print("td span.name {\n")
-    print("  vertical-align: top;\n")
-    print("  display: block;\n")
-    print("  float: right;\n")
-    print("  clear: right;\n")
-    print("  font-size: small;\n")
-    print("  font-style: italic;\n")
-    print("}\n")
-    print("</style>\n</head>\n<body>\n")
+        year = int(args.dates[0])
+        month = None
+        if (len(args.dates) == 2):
+            month = int(args.dates[1])
 
-def outputEnd():
-    print("</body>\n</html>\n")
-
-
-parser = argparse.ArgumentParser(
-    description="Output Inner Sea calendar with days and moon phases. " +
-                "Uses DokuWiki format unless HTML is specified.",
-    epilog="If only a year is specified, outputs the whole year. " +
-           "If a year and month is given, outputs the whole month. " +
-           "If a year, month and day is given, only outputs a single day.")
-parser.add_argument("-H", "--html", dest="html", action="store_true", default=False, help="Output as HTML.")
-parser.add_argument("-i", "--images", dest="images", help="Path to image folder.")
-parser.add_argument("dates", metavar="Date to display", type=int, nargs='+', help="<year> [<month> [<day>]]")
-
-args = parser.parse_args()
-
-HTML=args.html
-
-# If an image directory is specified, validate that it exists and contains
-# images.
-if (args.images):
-    if (not os.path.exists(args.images)):
-        print("Path [" + args.images + "] does not exist.\n");
-        exit(2)
-    if (not os.path.isdir(args.images)):
-        print("Path [" + args.images + "] is not a directory.\n");
-        exit(2)
-    
-    for m in range(1, 13):
-        if (not os.path.exists(args.images + "/" + str(m) + ".jpg")):
-            print("Directory [" + args.images + "] must contain 12 images 1.jpg .. 12.jpg")
-            exit(2)
-
-if (len(args.dates) == 3):
-    argDay = int(args.dates[2])
-    argMonth = int(args.dates[1])
-    argYear = int(args.dates[0])
-
-    print( getNamedDayOfWeek(argDay, argMonth, argYear) )
-elif (len(args.dates) == 2):
-    argMonth = int(args.dates[1])
-    argYear = int(args.dates[0])
-
-    if (HTML):
-        outputCSS(MONTH[argMonth - 1] + " " + str(argYear) + " IC")
-
-    print( calendar(argMonth) )
-
-    if (HTML):
-        outputEnd()
-elif (len(args.dates) == 1):
-    argYear = int(args.dates[0])
-
-    if (HTML):
-        outputCSS(str(argYear) + " IC")
-
-        print("<table><tr><th>Holiday</th></tr><tr><td>1</td></tr></table>");
-    else:
-        print( "====== " + str(argYear) + " IC ======\n" )
+        render.writeFragments(render.imperiumPage(year, month, args.html, args.images, events, fragmentCache), sys.stdout)
 
+    if (fragmentCache):
+        sys.stderr.write(fragmentCache.getSummary() + "\n")
 
-    for month in range(1, 14):
-        print( calendar(month) )
-        
+    return 0
 
-    print( "\n" )
 
-    if (HTML):
-        outputEnd()
+if __name__ == "__main__":
+    sys.exit(main())
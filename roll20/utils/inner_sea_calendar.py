@@ -1,9 +1,10 @@
-#!/usr/bin/python
+#!/usr/bin/python3
 # -*- coding: UTF-8 -*-
 #
 # Simple program to calculate the day of the week and moon phase given an Inner Sea date.
 # Assumes that 1 AR was on a Moonday, and that it was a full moon.
-# Does not work with dates before 1 AR.
+# Years before 1 AR count back through 0 AR to negative years, so Earthfall
+# is -5293 AR.
 #
 # Usage:
 # Print out a calendar (in DokuWiki) for the entire year:
@@ -15,12 +16,18 @@
 # Simply report the week day and moon phase for a specific day:
 #   inner_sea_calendar.py <year> <month> <day>
 #
+# Answer lots of dates at once, one per line of a file (or - for stdin):
+#   inner_sea_calendar.py --batch <file> [--json]
+#
 # If first parameter is --html, then outputs in HTML format rather than Dokuwiki syntax.
 # If so, then uses unicode characters for the Moon phases.
 #
 # If there is an --images parameter, then reads the directory for images files to user
 # to produce a picture for each month, one month per page.
 #
+# The calculations themselves are in the calendars package, which can be imported
+# without running any of this.
+#
 # Copyright (c) 2017, Samuel Penn
 # All rights reserved.
 #
@@ -49,365 +56,169 @@
 # either expressed or implied, of the FreeBSD Project.
 #
 
-import math
-import sys
 import argparse
 import os
+import sys
 
-# Calendar Constants
-MONTH_DAYS = [ 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31 ]
-LEAP_DAYS = [ 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31 ]
-YEAR_LENGTH = sum(MONTH_DAYS)
-LEAP_YEAR = 8
-MOON_PERIOD = 29.5
-
-MONTH_TEXT = [ "The middle of winter, and the first month of the year, named in honour of Abadar.",
-               "A late winter month named for Calistria, goddess of revenge.",
-               "An early spring month named after Pharasma, the goddess of birth and death.",
-               "A stormy spring month named for the god of the wind, Gozreh.",
-               "A mild spring month named for the goddess Desna.",
-               "The sun goddess Sarenrae gives her name to this sun-blessed summer month.",
-               "A summer month named in honour of Erastil.",
-               "Although he is no longer widely worshiped, this summer month is named for Aroden.",
-               "The beginning of autumn is named after the violent god Rovagug.",
-               "An autumn month named for Lamashtu, the goddess of monsters.",
-               "An autumn month named for Nethys, the two-faced god of magic.",
-               "The shortest day of the year comes during the winter month named for the god of darkness, Zon-Kuthon."
-               ]
-
-MOON_NAME = [ "Long", "Fated", "Rebirth", "Flood", "Blossom", "Sweet", "Lover's", "Swarm", "Harvest", "Hunter's", "Black", "Cold", "Thirteenth" ]
-
-HTML=False
-
-WEEK = [ "Moonday", "Toilday", "Wealday", "Oathday", "Fireday", "Starday", "Sunday" ]
-
-MONTH = [ "Abadius", "Calistril", "Pharast", "Gozran", "Desnus", "Sarenith", "Erastus", "Arodus", "Rova", "Lamashan", "Neth", "Kuthona" ]
-
-MOON_PHASES = [ "Full Moon", "Waning Gibbous", "Third Quarter", "Waning Crescent", "New Moon", "Waxing Crescent", "First Quarter", "Waxing Gibbous" ]
-MOON_UNICODE = [ "&#x1F315;", "&#x1F316", "&#x1F317", "&#x1F318", "&#x1F311", "&#x1F312", "&#x1F313", "&#x1F314" ]
-
-MOON_UNICODE = [ "🌕", "🌖", "🌗", "🌘", "🌑", "🌒", "🌓", "🌔" ]
-
-PHASE_LENGTH = [ 3, 4, 4, 4, 2, 4, 4, 4 ]
-BRIGHTNESS = [ 3, 2, 2, 1, 0, 1, 2, 2 ]
-
-def getYear(epocDay):
-    yearLength = (YEAR_LENGTH + ( 1.0 / LEAP_YEAR))
-
-    year = math.ceil(epocDay / yearLength)
-
-    return int(year);
-
-def getDayInYear(epocDay):
-    year = getYear(epocDay)
-
-    yearLength = (YEAR_LENGTH + ( 1.0 / LEAP_YEAR))
-    dayInYear = int(epocDay - (year-1) * yearLength) + 1
-
-    return dayInYear;
-
-def getMonthInYear(epocDay):
-    cal = MONTH_DAYS
-    isLeapYear = (getYear(epocDay) % 8) == 0
-    if (isLeapYear):
-        cal = LEAP_DAYS
-
-    dayInYear = getDayInYear(epocDay)
-
-    month = 0
-    while dayInYear > cal[month]:
-        dayInYear -= cal[month]
-        month += 1
-
-    return month + 1
-
-def getDayInMonth(epocDay):
-    cal = MONTH_DAYS
-    isLeapYear = (getYear(epocDay) % 8) == 0
-    if (isLeapYear):
-        cal = LEAP_DAYS
-
-    dayInYear = getDayInYear(epocDay)
-
-    month = 0
-    while dayInYear > cal[month]:
-        dayInYear -= cal[month]
-        month += 1
-
-    return dayInYear
-
-
-# Get the epoc day from a date. This is the number of days since the first
-# day of the year in 1 AR. 1/1/1 is epoc day 1 (epoc day 0 does not exist).
-def getEpocDay(day, month, year):
-    cal = MONTH_DAYS
-    isLeapYear = (year % 8) == 0
-    if (isLeapYear):
-        cal = LEAP_DAYS
-
-    epocDay = (YEAR_LENGTH + ( 1.0 / LEAP_YEAR)) * (year - 1)
-    epocDay += sum(cal[:month-1])
-    epocDay += day
-
-    return int(epocDay);
-
-# Returns a number from 1 - 7.
-def getDayOfWeek(day, month, year):
-    epocDay = getEpocDay(day, month, year)
-    dayOfWeek = (epocDay - 1) % len(WEEK) + 1
-
-    return dayOfWeek
-
-def getEpocDayOfWeek(epocDay):
-    return (epocDay - 1) % len(WEEK) + 1
-
-# Returns the name of the day for this date.
-def getNamedDayOfWeek(day, month, year):
-    dayOfWeek = getDayOfWeek(day, month, year)
-
-    return WEEK[dayOfWeek - 1]
-
-# Returns the name of this phase of the Moon.
-def getMoonPhase(day, month, year):
-    epocDay = getEpocDay(day, month, year)
-
-    moonDay = epocDay - int(MOON_PERIOD * int(epocDay / MOON_PERIOD))
-    phase = 0
-    while (moonDay > 0):
-        moonDay -= PHASE_LENGTH[phase]
-        if (moonDay > 0):
-            phase += 1
-
-    return MOON_PHASES[phase]
-
-# Returns the index of this phase of the Moon, 0-7. 0 = Full Moon, 4 = New Moon.
-def getMoonPhaseIndex(day, month, year):
-    epocDay = getEpocDay(day, month, year)
-
-    moonDay = epocDay - int(MOON_PERIOD * int(epocDay / MOON_PERIOD))
-    phase = 0
-    while (moonDay > 0):
-        moonDay -= PHASE_LENGTH[phase]
-        if (moonDay > 0):
-            phase += 1
-
-    return phase
-
-# Get a dictionary containing all the named Full moons of the year. Indexed by
-# the epoc day, with the moon name as the value. Since a 'full moon' spans
-# multiple days, we take the second day of full Moon as the actual day.
-def getMoonsOfYear(year):
-    firstDay = getEpocDay(21, 12, year - 1)
-    lastDay = getEpocDay(31, 12, year)
-    
-    moons = {}
-    isWaxingFull = False
-    isFull = False
-    isWaningFull = False
-    moonName = 0
-    
-    
-    for day in range(firstDay, lastDay + 1):
-        idx = getMoonPhaseIndex(getDayInMonth(day), getMonthInYear(day), year)
-        if (idx == 0):
-            if (isWaxingFull):
-                isFull = True
-                isWaxingFull = False
-            elif (isFull):
-                isFull = False
-                isWaningFull = True
-            else:
-                isWaxingFull = True
-
-            if (getYear(day) == year and isFull):
-                moons[day] = MOON_NAME[moonName]
-                moonName += 1
-        else:
-            isWaxingFull = False
-            isWaningFull = False
-            isFull = False
-    
-    return moons
-
-def calendar(month, year):
-    cal = MONTH_DAYS
-    isLeapYear = (year % 8) == 0
-    if (isLeapYear):
-        cal = LEAP_DAYS
-
-    epocStartDay = getEpocDay(1, month, year)
-    epocEndDay = getEpocDay(cal[month-1], month, year)
-    
-    listOfMoons = getMoonsOfYear(year)
-
-    if (HTML):
-        html = "<div class='month'><h2>" + MONTH[month - 1] + " (" + str(month) + ") " + str(year) + " AR</h2>\n"
-        html += "<p>" + MONTH_TEXT[month - 1] + "</p>"
-        if (args.images):
-            html += "<img src='" + args.images + "/" + str(month) + ".jpg'/>";
-    else:
-        html = "===== " + MONTH[month - 1] + " =====\n"
-
-    if (HTML):
-        html += "<table>\n<tr>"
-        for name in WEEK:
-            html += "<th>" + name + "</th>"
-        html += "</tr>\n"
-    else:
-        html += "\n"
-        for name in WEEK:
-            html += "^  " + name + "  "
-        html += "^\n"
-
-    today = epocStartDay + 1 - getEpocDayOfWeek(epocStartDay)
-    
-    if (HTML):
-        while today <= epocEndDay:
-            if getEpocDayOfWeek(today) == 1:
-                html += "<tr>\n"
-
-            if today < epocStartDay:
-                html += "<td></td>\n"
-            else:
-                phase="<span class='phase'>" + MOON_UNICODE[getMoonPhaseIndex(getDayInMonth(today), month, year)] + "</span>"
-                moonDay = ""
-                if (today in listOfMoons):
-                    moonDay = "<span class='name'>" + listOfMoons[today] + " Moon</span>"
-                html += "<td>" + str(getDayInMonth(today)) + phase + moonDay + "</td>\n"
-
-            if getEpocDayOfWeek(today) == 7:
-                html += "</tr>\n"
-
-            today += 1
-    else:
-        while today <= epocEndDay:
-
-            if today < epocStartDay:
-                html += "| "
-            else:
-                phase = "{{ " + str(getMoonPhaseIndex(getDayInMonth(today), month, year)) + ".png?24&nolink}}"
-                phase = MOON_UNICODE[getMoonPhaseIndex(getDayInMonth(today), month, year)]
-                html += "|  " + str(getDayInMonth(today)) + " " + phase + "\\\\ \\\\ "
-
-            if getEpocDayOfWeek(today) == 7:
-                html += "|\n"
-
-            today += 1
-
-        html += "|\n|"
-
-    if (HTML):
-        print("</table></div>\n")
+from calendars import innersea
+from calendars import cache
+from calendars import export
+from calendars import images
+from calendars import profiling
+from calendars import query
+from calendars import render
+from calendars import timeline
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Output Inner Sea calendar with days and moon phases. " +
+                    "Uses DokuWiki format unless HTML is specified.",
+        epilog="If only a year is specified, outputs the whole year. " +
+               "If a year and month is given, outputs the whole month. " +
+               "If a year, month and day is given, only outputs a single day.")
+    parser.add_argument("-H", "--html", dest="html", action="store_true", default=False, help="Output as HTML.")
+    parser.add_argument("-i", "--images", dest="images", help="Path to image folder.")
+    parser.add_argument("--image-width", dest="imageWidth", type=int, metavar="PIXELS",
+                        help="Resize images to this width. Needs Pillow.")
+    parser.add_argument("--image-format", dest="imageFormat", choices=sorted(images.FORMATS),
+                        help="Convert images to this format (default webp). Needs Pillow.")
+    parser.add_argument("--image-cache", dest="imageCache", metavar="DIR",
+                        help="Where to keep resized images. Defaults to 'prepared' in the image folder.")
+    parser.add_argument("--inline-images", dest="inlineImages", action="store_true", default=False,
+                        help="Put the images in the HTML as data URIs.")
+    parser.add_argument("-c", "--check", dest="check", type=int, metavar="YEAR",
+                        help="Check date conversions for every day up to the end of YEAR, from 1 AR or --from-year.")
+    parser.add_argument("--from-year", dest="fromYear", type=int, metavar="YEAR",
+                        help="Output every year from YEAR to --to-year, rendered in parallel.")
+    parser.add_argument("--to-year", dest="toYear", type=int, metavar="YEAR", help="Last year to output.")
+    parser.add_argument("-j", "--jobs", dest="jobs", type=int,
+                        help="Number of worker processes for --from-year. Defaults to one per CPU.")
+    parser.add_argument("--threads", dest="threads", action="store_true", default=False,
+                        help="Render --from-year with a pool of threads in this process, rather than worker processes.")
+    parser.add_argument("-e", "--events", dest="events", metavar="FILE",
+                        help="File of events to show on the calendar, one per line as <year>-<month>-<day>[..<year>-<month>-<day>] <title>.")
+    parser.add_argument("--cache", dest="cache", metavar="DIR",
+                        help="Directory to cache rendered months in, so that only changed months are rendered.")
+    parser.add_argument("--cache-size", dest="cacheSize", type=int, default=cache.MAX_BYTES // (1024 * 1024),
+                        metavar="MB", help="Largest size the cache may grow to. Each worker process keeps to this separately.")
+    parser.add_argument("--profile", dest="profile", metavar="FILE",
+                        help="Write a JSON report of where the time went to FILE, or - for stderr.")
+    parser.add_argument("-b", "--batch", dest="batch", metavar="FILE",
+                        help="Answer each line of FILE (- for stdin) as a date, either <year> <month> <day>, " +
+                             "<year>-<month>-<day> or an epoc day.")
+    parser.add_argument("--json", dest="json", action="store_true", default=False,
+                        help="With --batch, answer each date as a line of JSON.")
+    parser.add_argument("--line-buffered", dest="lineBuffered", action="store_true", default=False,
+                        help="With --batch, write each answer as soon as it is ready.")
+    parser.add_argument("dates", metavar="Date to display", type=int, nargs='*', help="<year> [<month> [<day>]]")
+
+    args = parser.parse_args(argv)
+
+    # Only this process can be profiled, so ranges are rendered here rather
+    # than by workers unless -j is given.
+    if (args.profile):
+        if (args.jobs is None):
+            args.jobs = 1
+        profiler = profiling.enable()
+        try:
+            return run(parser, args)
+        finally:
+            profiling.disable()
+            profiler.writeReport(args.profile)
+    return run(parser, args)
+
+# Does whatever the command line arguments ask for.
+def run(parser, args):
+    if (args.check is not None):
+        firstYear = 1 if args.fromYear is None else args.fromYear
+        errors = innersea.checkDates(args.check, firstYear)
+        for error in errors:
+            print(error)
+        days = innersea.getEpocDay(31, 12, args.check) - innersea.getEpocDay(1, 1, firstYear) + 1
+        print("Checked " + str(days) + " days, " + str(len(errors)) + " errors.")
+        return 1 if errors else 0
+
+    if (args.batch):
+        if (args.batch == "-"):
+            query.runQueries(sys.stdin, sys.stdout, args.json, args.lineBuffered)
+            return 0
+        try:
+            source = open(args.batch)
+        except OSError as e:
+            print(e)
+            return 2
+        with source:
+            query.runQueries(source, sys.stdout, args.json, args.lineBuffered)
+        return 0
+
+    if ((args.fromYear is None) != (args.toYear is None)):
+        parser.error("--from-year and --to-year must be given together")
+    if (args.fromYear is None and (len(args.dates) == 0 or len(args.dates) > 3)):
+        parser.error("Expected <year> [<month> [<day>]]")
+
+    if (args.fromYear is None and len(args.dates) > 1):
+        try:
+            innersea.SYSTEM.checkDate(args.dates[2] if len(args.dates) == 3 else 1, args.dates[1], args.dates[0])
+        except ValueError as e:
+            parser.error(str(e))
+
+    # If an image directory is specified, validate that it exists and contains
+    # images, then resize or inline them if asked to.
+    if (args.images):
+        error = render.checkImages(args.images, 12)
+        if (error):
+            print(error)
+            return 2
+        if (args.imageWidth or args.imageFormat):
+            try:
+                args.images = images.prepareImages(args.images, 12,
+                                                   args.imageCache or os.path.join(args.images, "prepared"),
+                                                   args.imageWidth or images.DEFAULT_WIDTH,
+                                                   args.imageFormat or "webp", inline=args.inlineImages,
+                                                   workers=args.jobs)
+            except (OSError, images.ImageError) as e:
+                print(e)
+                return 2
+        elif (args.inlineImages):
+            args.images = images.inlineImages(args.images, 12)
+
+    events = None
+    if (args.events):
+        try:
+            events = timeline.loadTimeline(innersea.SYSTEM, args.events)
+        except (OSError, ValueError) as e:
+            print(e)
+            return 2
+
+    fragmentCache = None
+    if (args.cache):
+        fragmentCache = cache.FragmentCache(args.cache, args.cacheSize * 1024 * 1024)
+
+    if (args.fromYear is not None):
+        years, elapsed, rate = export.exportYears("innersea", args.fromYear, args.toYear, sys.stdout,
+                                                  args.html, args.images, args.jobs, events, fragmentCache,
+                                                  args.threads)
+        sys.stderr.write("Rendered %d years in %.2fs (%.1f years/s)\n" % (years, elapsed, rate))
+    elif (len(args.dates) == 3):
+        argDay = int(args.dates[2])
+        argMonth = int(args.dates[1])
+        argYear = int(args.dates[0])
+
+        print( innersea.getNamedDayOfWeek(argDay, argMonth, argYear) + " - " + innersea.getMoonPhase(argDay, argMonth, argYear) )
     else:
-        for d in range(0, 7):
-            html += " +++++++++++ |"
-        html += "\n"
-
-    return html
-
-def outputCSS(title):
-    print("<html>\n<head>\n<title>" + title + "</title>\n")
-    print("<style>\n")
-    print("table, th, td {\n")
-    print("    border: 1px solid black;\n")
-    print("    border-collapse;\n")
-    print("    font-size: large;\n")
-    print("}\n")
-    print("div.month {\n")
-    print("    page-break-inside: avoid;\n")
-    print("}\n")
-    print("img {\n")
-    print("  width: 100%;\n")
-    print("}\n")
-    print("h2 {\n")
-    print("  margin-bottom: 0px\n");
-    print("}\n");
-    print("p {\n")
-    print("  margin: 0px\n");
-    print("}\n");
-    print("td {\n")
-    print("  width: 8em;\n")
-    print("  height: 4.5em;\n")
-    print("  vertical-align: top;\n")
-    print("}\n")
-    print("td span.phase {\n")
-    print("  align: right;\n")
-    print("  float: right;\n")
-    print("}\n")
-    print("td span.name {\n")
-    print("  vertical-align: top;\n")
-    print("  display: block;\n")
-    print("  float: right;\n")
-    print("  clear: right;\n")
-    print("  font-size: small;\n")
-    print("  font-style: italic;\n")
-    print("}\n")
-    print("</style>\n</head>\n<body>\n")
-
-def outputEnd():
-    print("</body>\n</html>\n")
-
-
-parser = argparse.ArgumentParser(
-    description="Output Inner Sea calendar with days and moon phases. " +
-                "Uses DokuWiki format unless HTML is specified.",
-    epilog="If only a year is specified, outputs the whole year. " +
-           "If a year and month is given, outputs the whole month. " +
-           "If a year, month and day is given, only outputs a single day.")
-parser.add_argument("-H", "--html", dest="html", action="store_true", default=False, help="Output as HTML.")
-parser.add_argument("-i", "--images", dest="images", help="Path to image folder.")
-parser.add_argument("dates", metavar="Date to display", type=int, nargs='+', help="<year> [<month> [<day>]]")
+        year = int(args.dates[0])
+        month = None
+        if (len(args.dates) == 2):
+            month = int(args.dates[1])
 
-args = parser.parse_args()
-
-HTML=args.html
-
-# If an image directory is specified, validate that it exists and contains
-# images.
-if (args.images):
-    if (not os.path.exists(args.images)):
-        print("Path [" + args.images + "] does not exist.\n");
-        exit(2)
-    if (not os.path.isdir(args.images)):
-        print("Path [" + args.images + "] is not a directory.\n");
-        exit(2)
-    
-    for m in range(1, 13):
-        if (not os.path.exists(args.images + "/" + str(m) + ".jpg")):
-            print("Directory [" + args.images + "] must contain 12 images 1.jpg .. 12.jpg")
-            exit(2)
-
-if (len(args.dates) == 3):
-    argDay = int(args.dates[2])
-    argMonth = int(args.dates[1])
-    argYear = int(args.dates[0])
-
-    print getNamedDayOfWeek(argDay, argMonth, argYear) + " - " + getMoonPhase(argDay, argMonth, argYear)
-elif (len(args.dates) == 2):
-    argMonth = int(args.dates[1])
-    argYear = int(args.dates[0])
-
-    if (HTML):
-        outputCSS(MONTH[argMonth - 1] + " " + str(argYear) + " AR")
-
-    print calendar(argMonth, argYear)
-
-    if (HTML):
-        outputEnd()
-elif (len(args.dates) == 1):
-    argYear = int(args.dates[0])
-
-    if (HTML):
-        outputCSS(str(argYear) + " AR")
-    else:
-        print "====== " + str(argYear) + " AR ======\n"
+        render.writeFragments(render.innerSeaPage(year, month, args.html, args.images, events, fragmentCache), sys.stdout)
 
+    if (fragmentCache):
+        sys.stderr.write(fragmentCache.getSummary() + "\n")
 
-    for month in range(1, 13):
-        print calendar(month, argYear)
-        
+    return 0
 
-    print "\n"
 
-    if (HTML):
-        outputEnd()
+if __name__ == "__main__":
+    sys.exit(main())
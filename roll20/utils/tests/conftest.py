@@ -0,0 +1,14 @@
+# -*- coding: UTF-8 -*-
+#
+# Lets the tests import the calendars package however pytest is run.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
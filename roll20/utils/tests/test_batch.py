@@ -0,0 +1,60 @@
+# -*- coding: UTF-8 -*-
+#
+# Tests for the batch date and moon phase conversions, with NumPy and with
+# the list fallback, against converting one day at a time.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import pytest
+
+from calendars import batch
+from calendars import ephemeris
+from calendars import innersea
+
+# A whole leap cycle either side of epoc day 0, so negative years are covered.
+EPOC_DAYS = list(range(-innersea.CYCLE_LENGTH - 3, innersea.CYCLE_LENGTH + 3))
+
+# Runs a test with NumPy, and again with the fallback which doesn't need it.
+@pytest.fixture(params=[ "numpy", "lists" ])
+def useNumpy(request, monkeypatch):
+    if (request.param == "numpy"):
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(batch, "numpy", None)
+    return request.param == "numpy"
+
+def getExpected(epocDay):
+    return innersea.getDate(epocDay) + (innersea.getEpocMoonPhaseIndex(epocDay),)
+
+def test_batchDates(useNumpy):
+    columns = batch.batchDates(EPOC_DAYS)
+    assert len(columns) == 5
+    found = [ tuple(int(value) for value in row) for row in zip(*columns) ]
+    assert found == [ getExpected(epocDay) for epocDay in EPOC_DAYS ]
+
+def test_batchEpocDays(useNumpy):
+    dates = [ innersea.getDate(epocDay) for epocDay in EPOC_DAYS ]
+    found = batch.batchEpocDays([ d[2] for d in dates ], [ d[1] for d in dates ], [ d[0] for d in dates ])
+    assert [ int(epocDay) for epocDay in found ] == EPOC_DAYS
+    assert [ int(epocDay) for epocDay in found ] == [ innersea.getEpocDay(d[2], d[1], d[0]) for d in dates ]
+
+def test_batchDatesFromDays(useNumpy):
+    dates = [ innersea.getDate(epocDay) for epocDay in EPOC_DAYS ]
+    columns = batch.batchDatesFromDays([ d[2] for d in dates ], [ d[1] for d in dates ], [ d[0] for d in dates ])
+    assert [ tuple(int(value) for value in row) for row in zip(*columns) ] == [ getExpected(e) for e in EPOC_DAYS ]
+
+# The ephemeris relies on the order of the columns, so its records must be the
+# same whichever way they were worked out.
+def test_ephemerisRecords(useNumpy):
+    first, last = EPOC_DAYS[0], EPOC_DAYS[-1]
+    records = ephemeris.buildRecords(first, last)
+    assert len(records) == len(EPOC_DAYS) * ephemeris.RECORD_SIZE
+    for index, epocDay in enumerate(EPOC_DAYS):
+        year, month, day, weekday = innersea.getDate(epocDay)
+        record = records[index * ephemeris.RECORD_SIZE:(index + 1) * ephemeris.RECORD_SIZE]
+        assert (record[0], record[1], record[3], record[4]) == (weekday, innersea.getEpocMoonPhaseIndex(epocDay),
+                                                                month, day)
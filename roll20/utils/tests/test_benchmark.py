@@ -0,0 +1,37 @@
+# -*- coding: UTF-8 -*-
+#
+# Tests for the benchmarks, run at the smallest scale.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+from calendars import benchmark
+
+def test_runBenchmarks():
+    results = benchmark.runBenchmarks([ 1, 2 ], repeat=1)
+    assert sorted(results) == sorted(name + "/" + str(years) for name, function in benchmark.BENCHMARKS
+                                     for years in (1, 2))
+    assert all(seconds >= 0 for seconds in results.values())
+
+# The Imperium benchmark renders each of its years, not the same year again.
+def test_imperiumRendersRealYears(monkeypatch):
+    rendered = []
+    original = benchmark.render.imperiumCalendar
+    def imperiumCalendar(month, html=False, images=None, year=1, events=None):
+        rendered.append((year, month))
+        return original(month, html, images, year, events)
+    monkeypatch.setattr(benchmark.render, "imperiumCalendar", imperiumCalendar)
+
+    benchmark.benchImperium(3)
+    first = benchmark.IMPERIUM_FIRST_YEAR
+    assert rendered == [ (year, month) for year in range(first, first + 3) for month in range(1, 14) ]
+
+def test_findRegressions():
+    baseline = { "a/1": 1.0, "b/1": 1.0, "c/1": 0.0001 }
+    results = { "a/1": 1.1, "b/1": 1.5, "c/1": 1.0, "d/1": 5.0 }
+    regressions = benchmark.findRegressions(results, baseline, 0.2)
+    assert len(regressions) == 1
+    assert regressions[0].startswith("b/1:")
@@ -0,0 +1,60 @@
+# -*- coding: UTF-8 -*-
+#
+# Tests for the cache of rendered months.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import os
+import types
+
+import calendars
+from calendars import cache
+from calendars import export
+from calendars import images
+from calendars import render
+from calendars import timeline
+
+# Returns the file names of every module in the calendars package which a
+# module uses, directly or through other modules in the package.
+def getPackageModules(module, found=None):
+    found = set() if found is None else found
+    name = os.path.basename(module.__file__)
+    if (name in found):
+        return found
+    found.add(name)
+    for value in vars(module).values():
+        if (isinstance(value, types.ModuleType) and value.__name__.startswith(calendars.__name__ + ".")):
+            getPackageModules(value, found)
+    return found
+
+def test_codeModulesCoverRendering():
+    # Images and events come into the rendered output through these, but
+    # aren't imported by render itself.
+    used = getPackageModules(render) | getPackageModules(images) | getPackageModules(timeline)
+    used.discard("export.py")
+    assert used <= set(cache.CODE_MODULES)
+
+def test_keyChangesWithEvents():
+    fragmentCache = cache.FragmentCache("unused")
+    events = [ timeline.Event(10, 12, "Fair") ]
+    plain = fragmentCache.getKey("innersea", 4707, 3, False, None)
+    assert fragmentCache.getKey("innersea", 4707, 3, False, None, events) != plain
+    assert fragmentCache.getKey("innersea", 4707, 3, True, None) != plain
+
+def test_cachedOutputMatches(tmp_path):
+    fragmentCache = cache.FragmentCache(str(tmp_path))
+    first = list(export.renderYears("innersea", 4707, 4708, html=True, workers=1, cache=fragmentCache))
+    again = list(export.renderYears("innersea", 4707, 4708, html=True, workers=1, cache=fragmentCache))
+    assert first == again == list(export.renderYears("innersea", 4707, 4708, html=True, workers=1))
+    assert fragmentCache.hits == 24
+
+def test_sizeLimit(tmp_path):
+    fragmentCache = cache.FragmentCache(str(tmp_path), 3000)
+    for month in range(1, 13):
+        fragmentCache.put(fragmentCache.getKey("innersea", 4707, month, False, None), "x" * 1000)
+    assert fragmentCache.totalBytes <= 3000
+    assert len(fragmentCache.entries) == 3
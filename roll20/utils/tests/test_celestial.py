@@ -0,0 +1,62 @@
+# -*- coding: UTF-8 -*-
+#
+# Tests for skies with several moons, against working out each day in turn.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import pytest
+
+from calendars import batch
+from calendars import celestial
+from calendars import innersea
+
+# Runs a test with NumPy, and again with the fallback which doesn't need it.
+@pytest.fixture(params=[ "numpy", "lists" ])
+def useNumpy(request, monkeypatch):
+    if (request.param == "numpy"):
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(batch, "numpy", None)
+    return request.param == "numpy"
+
+def getSky():
+    return celestial.Sky([ celestial.getInnerSeaMoon(), celestial.parseMoon("Bret:27.5:3:0.5"),
+                           celestial.parseMoon("Tul:44:-10") ])
+
+def test_checkInnerSeaMoon():
+    assert celestial.checkInnerSeaMoon() == []
+    moon = celestial.getInnerSeaMoon()
+    for epocDay in range(-100, 100):
+        assert moon.getPhase(epocDay) == innersea.getEpocMoonPhaseIndex(epocDay)
+
+@pytest.mark.parametrize("phases", [ [ [ 0 ], [ 0 ], [ 0 ] ],
+                                     [ [ 4 ], None, [ 0, 1, 7 ] ],
+                                     [ None, [ 2 ], None ],
+                                     [ [ 0, 4 ], [ 4 ], [ 3 ] ] ])
+def test_check(useNumpy, phases):
+    first = innersea.getEpocDay(1, 1, -3)
+    assert getSky().check(phases, first, first + 3000) == []
+
+# Moon cycles which share factors still give every conjunction.
+@pytest.mark.parametrize("m1,r1,m2,r2", [ (6, [ 0, 1 ], 4, [ 1, 2 ]), (59, [ 3, 4 ], 59, [ 4 ]),
+                                         (10, [ 3 ], 15, [ 4 ]), (1, [ 0 ], 7, [ 2, 5 ]) ])
+def test_combineCycles(m1, r1, m2, r2):
+    modulus, residues = celestial.combineCycles(m1, r1, m2, r2)
+    assert residues == [ d for d in range(modulus) if d % m1 in r1 and d % m2 in r2 ]
+
+def test_findNextConjunction():
+    sky = getSky()
+    epocDay = innersea.getEpocDay(1, 1, 4707)
+    found = sky.findNextConjunction([ [ 0 ] ] * 3, epocDay)
+    assert found > epocDay
+    assert sky.getPhases(found) == [ 0, 0, 0 ]
+    assert all(sky.getPhases(d) != [ 0, 0, 0 ] for d in range(epocDay + 1, found))
+
+def test_parseMoonErrors():
+    for text in ("Bret", "Bret:1:2:3:4", "Bret:x"):
+        with pytest.raises(ValueError):
+            celestial.parseMoon(text)
@@ -0,0 +1,86 @@
+# -*- coding: UTF-8 -*-
+#
+# Tests for converting dates between calendars. Batch conversions, with and
+# without NumPy, must give the same dates as converting one date at a time.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import datetime
+import itertools
+
+import pytest
+
+from calendars import convert
+
+# Absolute days from 1996 to 2016 AD, which includes negative Imperium years,
+# and from 10 AR back to -10 AR, which is before 1 AD so only the Inner Sea
+# and Imperium calendars have dates for it.
+MODERN = list(range(datetime.date(1996, 1, 1).toordinal(), datetime.date(2016, 12, 31).toordinal() + 1))
+ANCIENT = list(range(convert.toAbsolute("innersea", 1, 1, -10), convert.toAbsolute("innersea", 31, 12, 10) + 1))
+
+CALENDARS = [ "innersea", "imperium", "gregorian" ]
+
+CASES = [ (f, t, MODERN) for f, t in itertools.product(CALENDARS, CALENDARS) ] + \
+        [ (f, t, ANCIENT) for f, t in itertools.product(CALENDARS[:2], CALENDARS[:2]) ]
+
+def caseId(case):
+    return case[0] + "-" + case[1] + ("-ancient" if case[2] is ANCIENT else "")
+
+# Runs a test with NumPy, and again with the fallback which doesn't need it.
+@pytest.fixture(params=[ "numpy", "lists" ])
+def useNumpy(request, monkeypatch):
+    if (request.param == "numpy"):
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(convert, "numpy", None)
+    return request.param == "numpy"
+
+# Returns lists of (days, months, years) for absolute days in a calendar.
+def getDates(calendar, absoluteDays):
+    dates = [ convert.fromAbsolute(calendar, a) for a in absoluteDays ]
+    return ([ d[2] for d in dates ], [ d[1] for d in dates ], [ d[0] for d in dates ])
+
+def toTuples(years, months, days):
+    return [ (int(y), int(m), int(d)) for y, m, d in zip(years, months, days) ]
+
+@pytest.mark.parametrize("fromCalendar,toCalendar,absoluteDays", CASES, ids=[ caseId(c) for c in CASES ])
+def test_batchConvert(useNumpy, fromCalendar, toCalendar, absoluteDays):
+    days, months, years = getDates(fromCalendar, absoluteDays)
+    converted = toTuples(*convert.batchConvert(days, months, years, fromCalendar, toCalendar))
+    assert converted == [ convert.convert(d, m, y, fromCalendar, toCalendar) for d, m, y in zip(days, months, years) ]
+
+    back = toTuples(*convert.batchConvert([ c[2] for c in converted ], [ c[1] for c in converted ],
+                                          [ c[0] for c in converted ], toCalendar, fromCalendar))
+    assert back == list(zip(years, months, days))
+
+@pytest.mark.parametrize("calendar", CALENDARS)
+def test_batchFromAbsolute(useNumpy, calendar):
+    assert toTuples(*convert.batchFromAbsolute(calendar, MODERN)) == [ convert.fromAbsolute(calendar, a) for a in MODERN ]
+
+# The spans cover what the tests are meant to: Imperium holidays and negative
+# years of both calendars.
+def test_spans():
+    days, months, years = getDates("imperium", MODERN)
+    assert months.count(0) == 21
+    assert min(years) < 0
+    days, months, years = getDates("innersea", ANCIENT)
+    assert (min(years), max(years)) == (-10, 10)
+    days, months, years = getDates("imperium", ANCIENT)
+    assert months.count(0) == 21
+
+def test_roundTrips():
+    for absoluteDay in MODERN[::7]:
+        for calendar in CALENDARS:
+            year, month, day = convert.fromAbsolute(calendar, absoluteDay)
+            assert convert.toAbsolute(calendar, day, month, year) == absoluteDay
+            year, dayInYear = convert.absoluteToDayOfYear(calendar, absoluteDay)
+            assert convert.dayOfYearToAbsolute(calendar, dayInYear, year) == absoluteDay
+
+def test_anchors():
+    assert convert.convert(1, 1, 4707, "innersea", "gregorian") == (2007, 1, 1)
+    assert convert.convert(1, 0, 0, "imperium", "gregorian") == (4521, 1, 1)
+    assert convert.convert(1, 1, 4521, "gregorian", "imperium") == (0, 0, 1)
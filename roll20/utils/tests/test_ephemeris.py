@@ -0,0 +1,61 @@
+# -*- coding: UTF-8 -*-
+#
+# Tests for building and reading binary ephemeris files.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import pytest
+
+from calendars import ephemeris
+from calendars import innersea
+
+@pytest.fixture
+def path(tmp_path):
+    path = str(tmp_path / "ephemeris.bin")
+    ephemeris.buildEphemeris(path, -2, 9)
+    return path
+
+def test_check(path):
+    with ephemeris.Ephemeris(path) as e:
+        assert (e.firstDay, e.lastDay) == (innersea.getEpocDay(1, 1, -2), innersea.getEpocDay(31, 12, 9))
+        assert e.check() == []
+
+def test_lookups(path):
+    with ephemeris.Ephemeris(path) as e:
+        epocDay = innersea.getEpocDay(29, 2, 8)
+        assert e.getRecord(epocDay) == (innersea.getEpocDayOfWeek(epocDay), innersea.getEpocMoonPhaseIndex(epocDay),
+                                        0, 2, 29)
+        assert e.getMoonPhaseIndex(29, 2, 8) == innersea.getEpocMoonPhaseIndex(epocDay)
+        day, name = innersea.getNamedMoonsOfYear(4)[0]
+        assert e.getNamedMoon(day) == name
+
+def test_outOfRange(path):
+    with ephemeris.Ephemeris(path) as e:
+        for epocDay in (e.firstDay - 1, e.lastDay + 1):
+            with pytest.raises(IndexError):
+                e.getRecord(epocDay)
+
+def test_truncated(path):
+    with open(path, "r+b") as f:
+        f.truncate(ephemeris.HEADER.size + 10 * ephemeris.RECORD_SIZE)
+    with pytest.raises(ephemeris.EphemerisError, match="truncated"):
+        ephemeris.Ephemeris(path)
+
+def test_tooShort(path):
+    with open(path, "r+b") as f:
+        f.truncate(ephemeris.HEADER.size - 1)
+    with pytest.raises(ephemeris.EphemerisError, match="not an ephemeris"):
+        ephemeris.Ephemeris(path)
+
+def test_changedConstants(path, monkeypatch):
+    monkeypatch.setattr(innersea, "MOON_NAME", innersea.MOON_NAME[1:] + innersea.MOON_NAME[:1])
+    with pytest.raises(ephemeris.EphemerisError, match="different calendar constants"):
+        ephemeris.Ephemeris(path)
+
+def test_buildBackwards(tmp_path):
+    with pytest.raises(ephemeris.EphemerisError):
+        ephemeris.buildEphemeris(str(tmp_path / "ephemeris.bin"), 10, 9)
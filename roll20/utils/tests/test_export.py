@@ -0,0 +1,58 @@
+# -*- coding: UTF-8 -*-
+#
+# Tests for exporting ranges of years with worker processes, which must give
+# exactly the same output as rendering every year in this process.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import io
+
+import pytest
+
+from calendars import cache
+from calendars import export
+from calendars import imperium
+from calendars import innersea
+from calendars import timeline
+
+EVENTS = { "innersea": (innersea.SYSTEM, "4707-3-15 Session 12\n4707-12-30..4708-1-2 Long party\n4704-2-29 Leap day\n"),
+           "imperium": (imperium.SYSTEM, "1105-0-1 Holiday\n1105-3-1..1105-3-7 Refit\n1106-13-28..1107-1-3 Jump\n") }
+
+YEARS = { "innersea": (4703, 4708), "imperium": (1103, 1107) }
+
+def loadEvents(tmp_path, calendar):
+    system, text = EVENTS[calendar]
+    path = tmp_path / "events.txt"
+    path.write_text(text, encoding="utf-8")
+    return timeline.loadTimeline(system, str(path))
+
+@pytest.mark.parametrize("calendar", [ "innersea", "imperium" ])
+@pytest.mark.parametrize("html", [ False, True ])
+@pytest.mark.parametrize("withEvents", [ False, True ])
+@pytest.mark.parametrize("withCache", [ False, True ])
+def test_workersMatchSerial(tmp_path, calendar, html, withEvents, withCache):
+    fromYear, toYear = YEARS[calendar]
+    events = loadEvents(tmp_path, calendar) if withEvents else None
+    serial = list(export.renderYears(calendar, fromYear, toYear, html, workers=1, events=events))
+
+    fragmentCache = cache.FragmentCache(str(tmp_path / "cache")) if withCache else None
+    assert list(export.renderYears(calendar, fromYear, toYear, html, workers=2, events=events,
+                                   cache=fragmentCache)) == serial
+    if (withCache):
+        months = (toYear - fromYear + 1) * len(export.SYSTEMS[calendar].monthDays)
+        assert (fragmentCache.hits, fragmentCache.misses) == (0, months)
+        assert list(export.renderYears(calendar, fromYear, toYear, html, workers=2, events=events,
+                                       cache=fragmentCache)) == serial
+        assert (fragmentCache.hits, fragmentCache.misses) == (months, months)
+
+def test_exportYears(tmp_path):
+    events = loadEvents(tmp_path, "innersea")
+    sink = io.StringIO()
+    years, elapsed, rate = export.exportYears("innersea", 4707, 4709, sink, workers=2, events=events)
+    assert years == 3
+    assert sink.getvalue() == "".join(export.renderYears("innersea", 4707, 4709, workers=1, events=events))
+    assert "Session 12" in sink.getvalue()
@@ -0,0 +1,140 @@
+# -*- coding: UTF-8 -*-
+#
+# Tests for the iCalendar export: the recurring event generators are checked
+# against looking at every day, and lines are checked against the RFC 5545
+# limit on length.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import pytest
+
+from calendars import ics
+from calendars import imperium
+from calendars import innersea
+from calendars import system
+
+# A calendar with a holiday in the middle of the year and a five day week.
+TEST_SYSTEM = system.CalendarSystem({ "name": "Test",
+                                      "era": "TE",
+                                      "months": None,
+                                      "monthDays": [ 30, 30, 30, 30 ],
+                                      "leapDays": [ 30, 30, 30, 31 ],
+                                      "leapYear": 4,
+                                      "week": [ "One", "Two", "Three", "Four", "Five" ],
+                                      "holidays": [ (1, "New Year"), (62, "Midyear") ],
+                                      "epochWeekday": 3 })
+
+SYSTEMS = [ innersea.SYSTEM, imperium.SYSTEM, TEST_SYSTEM ]
+
+# A span of a few years for a calendar, starting and ending part way through
+# a week.
+def getSpan(calendar, year):
+    return (calendar.getYearStart(year) + 3, calendar.getYearStart(year + 3) + 2)
+
+@pytest.mark.parametrize("calendar", SYSTEMS, ids=lambda s: s.name)
+def test_weekdayDays(calendar):
+    first, last = getSpan(calendar, 4)
+    for weekday in range(1, calendar.weekLength + 1):
+        expected = [ d for d in range(first, last + 1) if calendar.getEpocDayOfWeek(d) == weekday ]
+        assert list(ics.weekdayDays(calendar, weekday, first, last)) == expected
+
+def test_weekdayDaysSkipHolidays():
+    first, last = getSpan(TEST_SYSTEM, 4)
+    holidays = [ d for d in range(first, last + 1) if TEST_SYSTEM.getEpocDayOfWeek(d) == 0 ]
+    assert len(holidays) == 6
+    for weekday in range(1, 6):
+        assert not set(holidays) & set(ics.weekdayDays(TEST_SYSTEM, weekday, first, last))
+
+@pytest.mark.parametrize("phase", range(0, 8))
+def test_phaseDays(phase):
+    first, last = getSpan(innersea.SYSTEM, 4706)
+    expected = [ d for d in range(first, last + 1) if innersea.getEpocMoonPhaseIndex(d) == phase and
+                 innersea.getEpocMoonPhaseIndex(d - 1) != phase ]
+    assert list(ics.phaseDays(phase, first, last)) == expected
+
+@pytest.mark.parametrize("calendar", SYSTEMS, ids=lambda s: s.name)
+def test_lastDayOfMonth(calendar):
+    first, last = calendar.getYearStart(1), calendar.getYearStart(calendar.leapYear + 1) - 1
+    expected = []
+    for d in range(first, last + 1):
+        year, month, day, weekday = calendar.getDate(d)
+        if (month and day == calendar.getMonthDays(month, year)):
+            expected.append(d)
+    assert list(ics.monthDays(calendar, "last", None, first, last)) == expected
+
+# Months without the day are skipped, including Calistril in a leap year.
+def test_missingDaysOfMonth():
+    first, last = innersea.getEpocDay(1, 1, 4711), innersea.getEpocDay(31, 12, 4712)
+    days = [ innersea.getDate(d)[:3] for d in ics.monthDays(innersea.SYSTEM, 30, None, first, last) ]
+    assert len(days) == 22
+    assert (4712, 2, 30) not in days
+    assert all(day == 30 for year, month, day in days)
+    days = [ innersea.getDate(d)[:3] for d in ics.monthDays(innersea.SYSTEM, 29, 2, first, last) ]
+    assert days == [ (4712, 2, 29) ]
+
+@pytest.mark.parametrize("rule,expected", [ ("every Oathday", (4707, 1, 2)),
+                                             ("every month", (4707, 1, 1)),
+                                             ("first day of month 3", (4707, 3, 1)),
+                                             ("15th day of every month", (4707, 1, 15)),
+                                             ("last day of Kuthona", (4707, 12, 31)) ])
+def test_parseRule(rule, expected):
+    first, last = innersea.SYSTEM.getYearStart(4707), innersea.SYSTEM.getYearStart(4708) - 1
+    assert innersea.getDate(next(iter(ics.parseRule("innersea", rule)(first, last))))[:3] == expected
+
+@pytest.mark.parametrize("calendar,rule", [ ("innersea", "0th day of every month"),
+                                             ("innersea", "0 day of month 2"),
+                                             ("innersea", "first day of month 13"),
+                                             ("innersea", "first day of month 0"),
+                                             ("innersea", "first day of Smarch"),
+                                             ("innersea", "second day of every month"),
+                                             ("innersea", "every fortnight"),
+                                             ("innersea", "now and then"),
+                                             ("imperium", "every full moon") ])
+def test_parseRuleErrors(calendar, rule):
+    with pytest.raises(ValueError):
+        ics.parseRule(calendar, rule)
+
+def test_mergeEvents():
+    sources = [ iter([ (1, 1, "a"), (5, 5, "a"), (9, 9, "a") ]),
+                iter([ (2, 4, "b"), (5, 6, "b") ]),
+                iter([]),
+                iter([ (0, 0, "c"), (9, 9, "c") ]) ]
+    merged = list(ics.mergeEvents(sources))
+    assert merged == [ (0, 0, "c"), (1, 1, "a"), (2, 4, "b"), (5, 5, "a"), (5, 6, "b"), (9, 9, "a"), (9, 9, "c") ]
+
+# Splits a folded content line back into its physical lines.
+def getPhysicalLines(folded):
+    assert folded.endswith("\r\n")
+    return folded[:-2].split("\r\n")
+
+@pytest.mark.parametrize("line", [ "S" * 75, "S" * 76, "S" * 200, "S" * 74 + "é", "S" * 73 + "é",
+                                   "é" * 100, "🌕" * 40, "SUMMARY:" + "Ünïcödé " * 30 ])
+def test_foldLine(line):
+    folded = getPhysicalLines(ics.foldLine(line))
+    assert all(len(part.encode("utf-8")) <= ics.LINE_LENGTH for part in folded)
+    assert all(part.startswith(" ") for part in folded[1:])
+    assert folded[0] + "".join(part[1:] for part in folded[1:]) == line
+    if (len(line.encode("utf-8")) <= ics.LINE_LENGTH):
+        assert folded == [ line ]
+
+# A character which would go over the limit moves to the next line whole.
+def test_foldLineMultibyte():
+    assert getPhysicalLines(ics.foldLine("S" * 73 + "é")) == [ "S" * 73 + "é" ]
+    assert getPhysicalLines(ics.foldLine("S" * 74 + "é")) == [ "S" * 74, " é" ]
+    assert getPhysicalLines(ics.foldLine("S" * 73 + "🌕")) == [ "S" * 73, " 🌕" ]
+
+def test_exportRejectsDayZero(capsys):
+    with pytest.raises(SystemExit):
+        ics.main([ "--from-year", "4707", "--to-year", "4707", "--recur", "0th day of every month: X" ])
+    assert "no day 0" in capsys.readouterr().err
+
+def test_exportDays(capsys):
+    assert ics.main([ "--from-year", "4707", "--to-year", "4707", "--no-moons",
+                      "--recur", "1st day of every month: X" ]) == 0
+    text = capsys.readouterr().out
+    descriptions = [ line for line in text.split("\r\n") if line.startswith("DESCRIPTION:") ]
+    assert descriptions == [ "DESCRIPTION:1 " + month + " 4707 AR" for month in innersea.MONTH ]
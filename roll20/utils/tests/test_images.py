@@ -0,0 +1,55 @@
+# -*- coding: UTF-8 -*-
+#
+# Tests for month images. Pillow is optional, so the tests that resize images
+# are skipped without it.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import base64
+import os
+
+import pytest
+
+from calendars import images
+
+def writeImages(directory, count, data):
+    for month in range(1, count + 1):
+        (directory / (str(month) + ".jpg")).write_bytes(data + bytes([ month ]))
+
+def test_inlineImages(tmp_path):
+    writeImages(tmp_path, 12, b"first")
+    imageSet = images.inlineImages(str(tmp_path), 12)
+    source = imageSet.getSource(3)
+    assert source == "data:image/jpeg;base64," + base64.b64encode(b"first\x03").decode("ascii")
+
+def test_changedImageIsReadAgain(tmp_path):
+    writeImages(tmp_path, 12, b"first")
+    imageSet = images.inlineImages(str(tmp_path), 12)
+    before = imageSet.getSource(1)
+    key = repr(imageSet)
+
+    path = tmp_path / "1.jpg"
+    stat = os.stat(path)
+    path.write_bytes(b"second\x01")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+    assert imageSet.getSource(1) != before
+    assert imageSet.getSource(1).endswith(base64.b64encode(b"second\x01").decode("ascii"))
+    assert repr(imageSet) != key
+
+def test_resizeWithoutPillow(tmp_path, monkeypatch):
+    monkeypatch.setattr(images, "Image", None)
+    writeImages(tmp_path, 12, b"x")
+    with pytest.raises(images.ImageError, match="Pillow"):
+        images.prepareImages(str(tmp_path), 12, str(tmp_path / "prepared"))
+
+def test_resize(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    for month in range(1, 13):
+        Image.new("RGB", (400, 200), (month * 20, 0, 0)).save(tmp_path / (str(month) + ".jpg"))
+    imageSet = images.prepareImages(str(tmp_path), 12, str(tmp_path / "prepared"), width=100, workers=1)
+    with Image.open(imageSet.getSource(1)) as image:
+        assert image.size == (100, 50)
@@ -0,0 +1,58 @@
+# -*- coding: UTF-8 -*-
+#
+# Tests for finding, parsing and formatting ddd-yyyy Imperial dates.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import io
+
+import pytest
+
+from calendars import imperialdates
+
+def test_check():
+    assert imperialdates.check(-20, 20) == []
+
+@pytest.mark.parametrize("text,expected", [ ("123-1105", (123, 1105)),
+                                            ("  001-0 \n", (1, 0)),
+                                            ("365--20", (365, -20)) ])
+def test_parseDate(text, expected):
+    assert imperialdates.parseDate(text) == expected
+
+@pytest.mark.parametrize("text", [ "000-1105", "366-1105", "999-1105", "12-1105", "1234-1105",
+                                   "123-", "123-1105x", "x123-1105", "123 1105", "", "1105" ])
+def test_parseDateErrors(text):
+    with pytest.raises(imperialdates.DateError):
+        imperialdates.parseDate(text)
+
+def test_findDates():
+    errors = []
+    text = "Left 123-1105, arrived 200-1105; 366-1105 is wrong and 1234-1105 isn't a date."
+    assert list(imperialdates.findDates(text, errors)) == [ (5, 123, 1105), (23, 200, 1105) ]
+    assert errors == [ (33, "366-1105") ]
+
+# Blocks only ever end at the end of a line, so a date that straddles where a
+# block would have been cut is still found, even on lines longer than a block.
+@pytest.mark.parametrize("blockSize", [ 1, 5, 8, 13, 64 ])
+def test_readBlocks(blockSize):
+    text = "Jump 001-1105\nRefuel at 123-1105 then 124-1105\n\n365-1104\nNo date here\n100-1"
+    blocks = list(imperialdates.readBlocks(io.StringIO(text), blockSize))
+    assert "".join(blocks) == text
+    assert all(block.endswith("\n") for block in blocks[:-1])
+    found = [ (d, y) for block in blocks for o, d, y in imperialdates.findDates(block) ]
+    assert found == [ (1, 1105), (123, 1105), (124, 1105), (365, 1104), (100, 1) ]
+
+def test_scanStream():
+    errors = []
+    stream = io.StringIO("001-1105 000-1105\n" * 3)
+    assert list(imperialdates.scanStream(stream, errors)) == [ (1, 1105) ] * 3
+    assert errors == [ "000-1105" ] * 3
+
+def test_describeDate():
+    assert imperialdates.describeDate(1, 1105) == "001-1105 Holiday"
+    assert imperialdates.describeDate(2, 1105) == "002-1105 Wonday, week 1, month 1 day 1"
+    assert imperialdates.formatEpocDay(imperialdates.parseEpocDay("365--1")) == "365--1"
@@ -0,0 +1,179 @@
+# -*- coding: UTF-8 -*-
+#
+# Tests the table driven Inner Sea date conversions against the original
+# floating point functions they replaced, which are copied here unchanged
+# (apart from the calendar constants) so that they can't drift.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import math
+
+import pytest
+
+from calendars import innersea
+
+MONTH_DAYS = innersea.MONTH_DAYS
+LEAP_DAYS = innersea.LEAP_DAYS
+YEAR_LENGTH = innersea.YEAR_LENGTH
+LEAP_YEAR = innersea.LEAP_YEAR
+MOON_PERIOD = innersea.MOON_PERIOD
+PHASE_LENGTH = innersea.PHASE_LENGTH
+
+def oldGetYear(epocDay):
+    yearLength = (YEAR_LENGTH + ( 1.0 / LEAP_YEAR))
+
+    year = math.ceil(epocDay / yearLength)
+
+    return int(year);
+
+def oldGetDayInYear(epocDay):
+    year = oldGetYear(epocDay)
+
+    yearLength = (YEAR_LENGTH + ( 1.0 / LEAP_YEAR))
+    dayInYear = int(epocDay - (year-1) * yearLength) + 1
+
+    return dayInYear;
+
+def oldGetMonthInYear(epocDay):
+    cal = MONTH_DAYS
+    isLeapYear = (oldGetYear(epocDay) % 8) == 0
+    if (isLeapYear):
+        cal = LEAP_DAYS
+
+    dayInYear = oldGetDayInYear(epocDay)
+
+    month = 0
+    while dayInYear > cal[month]:
+        dayInYear -= cal[month]
+        month += 1
+
+    return month + 1
+
+def oldGetDayInMonth(epocDay):
+    cal = MONTH_DAYS
+    isLeapYear = (oldGetYear(epocDay) % 8) == 0
+    if (isLeapYear):
+        cal = LEAP_DAYS
+
+    dayInYear = oldGetDayInYear(epocDay)
+
+    month = 0
+    while dayInYear > cal[month]:
+        dayInYear -= cal[month]
+        month += 1
+
+    return dayInYear
+
+def oldGetEpocDay(day, month, year):
+    cal = MONTH_DAYS
+    isLeapYear = (year % 8) == 0
+    if (isLeapYear):
+        cal = LEAP_DAYS
+
+    epocDay = (YEAR_LENGTH + ( 1.0 / LEAP_YEAR)) * (year - 1)
+    epocDay += sum(cal[:month-1])
+    epocDay += day
+
+    return int(epocDay);
+
+def oldGetMoonPhaseIndex(day, month, year):
+    epocDay = oldGetEpocDay(day, month, year)
+
+    moonDay = epocDay - int(MOON_PERIOD * int(epocDay / MOON_PERIOD))
+    phase = 0
+    while (moonDay > 0):
+        moonDay -= PHASE_LENGTH[phase]
+        if (moonDay > 0):
+            phase += 1
+
+    return phase
+
+# Leap cycles checked day by day, by the year they start in. The old code only
+# worked from 1 AR, and these go far enough out to catch any float rounding.
+CYCLE_YEARS = [ 1, 4697, 9993, 99993, 999993 ]
+
+# The old getDayInYear was a day out for every year after a leap year, so
+# those years are pinned to known dates instead.
+def isOldBroken(year):
+    return year % LEAP_YEAR == 1
+
+def cycleDays(firstYear):
+    start = innersea.getEpocDay(1, 1, firstYear)
+    return range(start, start + innersea.CYCLE_LENGTH)
+
+def test_cycleLength():
+    assert innersea.CYCLE_LENGTH == 2921
+    assert len(innersea.CYCLE_TABLE) == 2921
+
+@pytest.mark.parametrize("firstYear", CYCLE_YEARS)
+def test_getDateMatchesOldCode(firstYear):
+    for epocDay in cycleDays(firstYear):
+        year, month, day, weekday = innersea.getDate(epocDay)
+        assert year == oldGetYear(epocDay)
+        assert innersea.getYear(epocDay) == year
+        assert weekday == innersea.getEpocDayOfWeek(epocDay)
+        if (isOldBroken(year)):
+            continue
+        assert (month, day) == (oldGetMonthInYear(epocDay), oldGetDayInMonth(epocDay))
+        assert innersea.getDayInYear(epocDay) == oldGetDayInYear(epocDay)
+        assert innersea.getMonthInYear(epocDay) == month
+        assert innersea.getDayInMonth(epocDay) == day
+
+@pytest.mark.parametrize("firstYear", CYCLE_YEARS)
+def test_getEpocDayMatchesOldCode(firstYear):
+    for epocDay in cycleDays(firstYear):
+        year, month, day, weekday = innersea.getDate(epocDay)
+        assert innersea.getEpocDay(day, month, year) == epocDay
+        assert oldGetEpocDay(day, month, year) == epocDay
+
+def test_getEpocDayMatchesOldCodeForManyYears():
+    for year in range(1, 10001):
+        cal = LEAP_DAYS if year % LEAP_YEAR == 0 else MONTH_DAYS
+        for month in range(1, 13):
+            for day in (1, cal[month - 1]):
+                assert innersea.getEpocDay(day, month, year) == oldGetEpocDay(day, month, year)
+
+@pytest.mark.parametrize("year", [ 1, 9, 17, 4705, 4713 ])
+def test_yearsAfterLeapYears(year):
+    first = innersea.getEpocDay(1, 1, year)
+    last = innersea.getEpocDay(31, 12, year)
+    assert last - first == 364
+    assert first == 365 * (year - 1) + (year - 1) // 8 + 1
+    assert innersea.getDate(first)[:3] == (year, 1, 1)
+    assert innersea.getDayInYear(first) == 1
+    assert innersea.getDate(last)[:3] == (year, 12, 31)
+    assert innersea.getDayInYear(last) == 365
+    assert innersea.getDate(last + 1)[:3] == (year + 1, 1, 1)
+
+    # The old code thought the first day was the second, and the last day
+    # day 366, past the end of the year.
+    assert oldGetDayInYear(first) == 2
+    with pytest.raises(IndexError):
+        oldGetMonthInYear(last)
+
+def test_pinnedDates():
+    assert innersea.getDate(1) == (1, 1, 1, 1)
+    assert innersea.getDate(365) == (1, 12, 31, 1)
+    assert innersea.getDate(366) == (2, 1, 1, 2)
+    assert innersea.getDate(2921) == (8, 12, 31, 2)
+    assert innersea.getDate(2922) == (9, 1, 1, 3)
+    assert innersea.getDate(innersea.getEpocDay(29, 2, 4712)) == (4712, 2, 29, 4)
+    assert innersea.getEpocDay(1, 1, 17) == 5843
+
+@pytest.mark.parametrize("lastYear, firstYear", [ (40, 1), (4720, 4700), (8, -40) ])
+def test_checkDates(lastYear, firstYear):
+    assert innersea.checkDates(lastYear, firstYear) == []
+
+def test_moonTables():
+    assert len(innersea.MOON_DAY_PHASE) == 31
+    assert len(innersea.MOON_CYCLE_PHASE) == innersea.LUNAR_CYCLE == 59
+
+@pytest.mark.parametrize("firstYear", [ 1, 4697 ])
+def test_moonPhaseMatchesOldCode(firstYear):
+    for epocDay in cycleDays(firstYear):
+        year, month, day, weekday = innersea.getDate(epocDay)
+        assert innersea.getMoonPhaseIndex(day, month, year) == oldGetMoonPhaseIndex(day, month, year)
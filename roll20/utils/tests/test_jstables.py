@@ -0,0 +1,52 @@
+# -*- coding: UTF-8 -*-
+#
+# Tests for the lookup tables written out for Roll20 scripts. The tables are
+# always checked with the Python decoder, and the JavaScript itself is run
+# too if node is installed.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import shutil
+
+import pytest
+
+from calendars import jstables
+
+@pytest.fixture
+def path(tmp_path):
+    path = str(tmp_path / "tables.js")
+    jstables.buildScript(path, 4706, 4714)
+    return path
+
+def test_checkTables(path):
+    assert jstables.checkScript(path, node=False) == ([], False)
+
+def test_checkScript(path):
+    node = shutil.which("node") or shutil.which("nodejs")
+    if (not node):
+        pytest.skip("node is not installed")
+    assert jstables.checkScript(path, 3, node) == ([], True)
+
+def test_readTables(path):
+    tables = jstables.readTables(path)
+    assert (tables["firstYear"], tables["lastYear"]) == (4706, 4714)
+
+def test_notTables(tmp_path):
+    path = tmp_path / "other.js"
+    path.write_text("var x = 1;\n")
+    with pytest.raises(jstables.TableError):
+        jstables.readTables(str(path))
+
+# A changed table is noticed, rather than giving wrong dates.
+def test_badTables(path):
+    weekOffset = jstables.readTables(path)["weekOffset"]
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text.replace('"weekOffset":%d,' % weekOffset, '"weekOffset":%d,' % (weekOffset + 1)))
+    errors, ranNode = jstables.checkScript(path, node=False)
+    assert errors
@@ -0,0 +1,81 @@
+# -*- coding: UTF-8 -*-
+#
+# Tests for profiling calendar rendering.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import threading
+import time
+
+from calendars import export
+from calendars import imperium
+from calendars import innersea
+from calendars import profiling
+from calendars import render
+from calendars import timeline
+
+# Every wrapped function is called when rendering a year of each calendar,
+# so none of them sits in the report doing nothing.
+def test_hotFunctionsAreCalled():
+    innersea.getNamedMoonsOfYear.cache_clear()
+    innersea.getYearLayout.cache_clear()
+    events = timeline.Timeline([ timeline.Event(innersea.getEpocDay(1, 3, 4707), innersea.getEpocDay(3, 3, 4707), "Fair") ])
+    with profiling.profiled() as profiler:
+        for year in (4707, 4708):
+            export.renderYear("innersea", year, True, None, events)
+        export.renderYear("imperium", 1105, False)
+
+    calls = profiler.getReport()["calls"]
+    for stage, owner, names in profiling.HOT_FUNCTIONS:
+        prefix = owner.__name__.split(".")[-1] if hasattr(owner, "__name__") else owner.name.replace(" ", "")
+        for name in names:
+            assert calls.get(prefix + "." + name, 0) > 0, prefix + "." + name
+
+def test_profilingDoesntChangeOutput():
+    expected = render.innerSeaCalendar(3, 4707, html=True)
+    with profiling.profiled():
+        assert render.innerSeaCalendar(3, 4707, html=True) == expected
+        assert render.imperiumCalendar(3, year=1105) == "".join(imperium.SYSTEM.monthFragments(3, 1105))
+    assert render.innerSeaCalendar(3, 4707, html=True) == expected
+    assert "monthFragments" not in vars(innersea.SYSTEM)
+
+# Each thread's stages are its own, so a thread leaving its stage never ends
+# the stage another thread is in.
+def test_threadsKeepTheirOwnStages():
+    profiler = profiling.Profiler()
+    entered = threading.Event()
+    interrupted = threading.Event()
+
+    def first():
+        profiler.enter("dates")
+        entered.set()
+        interrupted.wait()
+        profiler.leave()
+
+    def second():
+        entered.wait()
+        profiler.enter("moons")
+        interrupted.set()
+        time.sleep(0.1)
+        profiler.leave()
+
+    threads = [ threading.Thread(target=first), threading.Thread(target=second) ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert profiler.seconds["moons"] >= 0.1
+    assert profiler.seconds["dates"] < 0.1
+
+def test_threadedRendering():
+    context = render.RenderContext("innersea", True)
+    serial = [ context.renderPage(year) for year in (4707, 4708, 4709, 4710) ]
+    with profiling.profiled() as profiler:
+        assert list(export.renderPages(context, (4707, 4708, 4709, 4710), workers=4)) == serial
+    report = profiler.getReport()
+    assert report["calls"]["render.innerSeaMonth"] == 48
+    assert profiler.getThread().stack == []
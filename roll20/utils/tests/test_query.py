@@ -0,0 +1,64 @@
+# -*- coding: UTF-8 -*-
+#
+# Tests for answering batches of date queries.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import io
+import json
+
+import pytest
+
+import inner_sea_calendar
+from calendars import innersea
+from calendars import query
+from calendars import service
+
+def test_parseQuery():
+    epocDay = innersea.getEpocDay(15, 3, 4707)
+    assert query.parseQuery("4707 3 15") == epocDay
+    assert query.parseQuery("4707-3-15") == epocDay
+    assert query.parseQuery(" " + str(epocDay) + "\n") == epocDay
+    assert query.parseQuery("4712-2-29") == innersea.getEpocDay(29, 2, 4712)
+
+# The batch queries and the service check dates the same way.
+@pytest.mark.parametrize("year, month, day, error", [
+    (4707, 13, 1, "Month must be 1 - 12"),
+    (4707, 0, 1, "Month must be 1 - 12"),
+    (4707, 2, 29, "Day must be 1 - 28"),
+    (4712, 2, 30, "Day must be 1 - 29"),
+    (4707, 4, 0, "Day must be 1 - 30") ])
+def test_badDates(year, month, day, error):
+    with pytest.raises(ValueError, match=error):
+        query.parseQuery("%d %d %d" % (year, month, day))
+    with pytest.raises(service.RequestError, match=error):
+        service.checkDate(year, month, day)
+
+def test_answerQueries():
+    lines = [ "4707 3 15\n", "# comment\n", "nonsense\n", "4707-2-30\n" ]
+    answers = list(query.answerQueries(lines, False))
+    assert answers[0] == "Starday - Waning Gibbous\n"
+    assert answers[1] == "# comment\n"
+    assert answers[2] == "Error: " + query.QUERY_ERROR + "\n"
+    assert answers[3] == "Error: Day must be 1 - 28\n"
+
+def test_jsonMatchesService():
+    epocDay = innersea.getEpocDay(15, 3, 4707)
+    sink = io.StringIO()
+    query.runQueries([ "4707 3 15\n", str(epocDay + 1) + "\n" ], sink, True, False)
+    lines = sink.getvalue().splitlines()
+    assert [ json.loads(line) for line in lines ] == [ service.getDayData(epocDay), service.getDayData(epocDay + 1) ]
+
+def test_batchFile(tmp_path, capsys):
+    path = tmp_path / "dates.txt"
+    path.write_text("4707 3 15\n", encoding="utf-8")
+    assert inner_sea_calendar.main([ "--batch", str(path) ]) == 0
+    assert capsys.readouterr().out == "Starday - Waning Gibbous\n"
+
+def test_missingBatchFile(tmp_path, capsys):
+    assert inner_sea_calendar.main([ "--batch", str(tmp_path / "missing.txt") ]) == 2
+    assert "missing.txt" in capsys.readouterr().out
@@ -0,0 +1,83 @@
+# -*- coding: UTF-8 -*-
+#
+# Golden output tests for both calendar scripts. Each case is run through the
+# script's main() and must match the page saved under tests/data/golden
+# byte for byte.
+#
+# Usage:
+#   python3 tests/test_render.py            # Rewrite the golden pages
+#
+# Only rewrite the golden pages after a change to the output that is meant,
+# and check the differences before committing them.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import os
+import sys
+
+import pytest
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "golden")
+
+# (script, arguments) for each golden page. 4712 AR is a leap year, and the
+# Inner Sea year 9 starts a new cycle of the calendar.
+CASES = [ ("innersea", [ "4707" ]),
+          ("innersea", [ "-H", "4707" ]),
+          ("innersea", [ "9" ]),
+          ("innersea", [ "4712", "2" ]),
+          ("innersea", [ "-H", "4712", "2" ]),
+          ("innersea", [ "4712", "12" ]),
+          ("innersea", [ "-5293", "1" ]),
+          ("innersea", [ "-H", "-5293", "1" ]),
+          ("imperium", [ "1105" ]),
+          ("imperium", [ "-H", "1105" ]),
+          ("imperium", [ "1105", "3" ]),
+          ("imperium", [ "-H", "1105", "3" ]),
+          ("imperium", [ "-1", "13" ]),
+          ("imperium", [ "-H", "-1", "13" ]) ]
+
+# Name of the golden page for a case, e.g. innersea-H-4712-2.txt.
+def goldenName(script, args):
+    return "-".join([ script ] + [ a.lstrip("-") if a.startswith("-H") else a for a in args ]) + ".txt"
+
+def caseId(case):
+    return goldenName(*case)[:-4]
+
+def runScript(script, args):
+    if (script == "innersea"):
+        import inner_sea_calendar as module
+    else:
+        import imperium_calendar as module
+    return module.main(args)
+
+@pytest.mark.parametrize("script,args", CASES, ids=[ caseId(c) for c in CASES ])
+def test_goldenOutput(capsys, script, args):
+    assert not runScript(script, args)
+    with open(os.path.join(GOLDEN_DIR, goldenName(script, args)), encoding="utf-8") as golden:
+        assert capsys.readouterr().out == golden.read()
+
+# Every golden page belongs to a case, so none are left behind when a case is
+# taken out.
+def test_noStrayGoldenPages():
+    assert sorted(os.listdir(GOLDEN_DIR)) == sorted(goldenName(*c) for c in CASES)
+
+def writeGolden():
+    import contextlib
+    import io
+    os.makedirs(GOLDEN_DIR, exist_ok=True)
+    for script, args in CASES:
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            runScript(script, args)
+        with open(os.path.join(GOLDEN_DIR, goldenName(script, args)), "w", encoding="utf-8", newline="") as golden:
+            golden.write(output.getvalue())
+        print(goldenName(script, args))
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    writeGolden()
@@ -0,0 +1,59 @@
+# -*- coding: UTF-8 -*-
+#
+# Tests for the command line arguments of the calendar scripts.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import pytest
+
+import imperium_calendar
+import inner_sea_calendar
+
+@pytest.mark.parametrize("args,expected", [ ([ "1105", "0", "1" ], "Holiday\n"),
+                                            ([ "1105", "1", "1" ], "Wonday\n"),
+                                            ([ "1105", "13", "28" ], "Senday\n") ])
+def test_imperiumDay(capsys, args, expected):
+    assert imperium_calendar.main(args) == 0
+    assert capsys.readouterr().out == expected
+
+@pytest.mark.parametrize("args,error", [ ([ "1105", "14", "1" ], "Month must be 1 - 13"),
+                                         ([ "1105", "0", "5" ], "Holiday must be 1 - 1"),
+                                         ([ "1105", "1", "0" ], "Day must be 1 - 28"),
+                                         ([ "1105", "13", "29" ], "Day must be 1 - 28"),
+                                         ([ "1105", "14" ], "Month must be 1 - 13"),
+                                         ([ "1105", "0" ], "Month must be 1 - 13"),
+                                         ([ "1105", "-1" ], "Month must be 1 - 13") ])
+def test_imperiumBadDates(capsys, args, error):
+    with pytest.raises(SystemExit) as e:
+        imperium_calendar.main(args)
+    assert e.value.code == 2
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert error in captured.err
+
+@pytest.mark.parametrize("args,error", [ ([ "4707", "13", "1" ], "Month must be 1 - 12"),
+                                         ([ "4707", "0", "1" ], "Month must be 1 - 12"),
+                                         ([ "4707", "2", "29" ], "Day must be 1 - 28"),
+                                         ([ "4707", "1", "32" ], "Day must be 1 - 31"),
+                                         ([ "4707", "13" ], "Month must be 1 - 12"),
+                                         ([ "4707", "0" ], "Month must be 1 - 12") ])
+def test_innerSeaBadDates(capsys, args, error):
+    with pytest.raises(SystemExit) as e:
+        inner_sea_calendar.main(args)
+    assert e.value.code == 2
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert error in captured.err
+
+def test_innerSeaLeapDay(capsys):
+    assert inner_sea_calendar.main([ "4712", "2", "29" ]) == 0
+    assert capsys.readouterr().out == "Oathday - Waxing Crescent\n"
+
+# --check 0 checks no years, rather than being taken as not given.
+def test_innerSeaCheckYearZero(capsys):
+    assert inner_sea_calendar.main([ "--check", "0" ]) == 0
+    assert capsys.readouterr().out == "Checked 0 days, 0 errors.\n"
@@ -0,0 +1,53 @@
+# -*- coding: UTF-8 -*-
+#
+# Tests for searching for days by weekday, moon, month and leap year.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import pytest
+
+from calendars import innersea
+from calendars import search
+
+QUERIES = [ dict(weekdays=[ "Starday" ], phases=[ "Full Moon" ]),
+            dict(weekdays=[ 5 ], phases=[ 4 ], months=[ "Rova", 12 ]),
+            dict(moons=[ "Harvest" ], months=[ "Rova" ]),
+            dict(moons=True, leapYear=True),
+            dict(phases=[ "New Moon" ], leapYear=False) ]
+
+@pytest.mark.parametrize("arguments", QUERIES)
+def test_searchMatchesEveryDay(arguments):
+    query = search.DateQuery(**arguments)
+    assert query.check(innersea.getEpocDay(1, 1, 4700), innersea.getEpocDay(31, 12, 4720)) == []
+
+def test_calendarRepeats():
+    years = search.REPEAT // innersea.CYCLE_LENGTH * innersea.LEAP_YEAR
+    assert years == 3304
+    for year in (1, 4707, 4712, -20):
+        moons = innersea.getMoonsOfYear(year)
+        later = innersea.getMoonsOfYear(year + years)
+        assert dict((d + search.REPEAT, name) for d, name in moons.items()) == later
+        first = innersea.getEpocDay(1, 1, year)
+        assert innersea.getDate(first + search.REPEAT) == (year + years,) + innersea.getDate(first)[1:]
+        assert innersea.getEpocMoonPhaseIndex(first + search.REPEAT) == innersea.getEpocMoonPhaseIndex(first)
+
+# Harvest is the ninth named moon of the year and Long the first, so neither
+# is ever in these months.
+@pytest.mark.parametrize("arguments", [ dict(moons=[ "Harvest" ], months=[ "Abadius" ]),
+                                        dict(moons=[ "Long" ], months=[ "Kuthona" ], weekdays=[ "Sunday" ]) ])
+def test_impossibleSearchEnds(arguments):
+    query = search.DateQuery(**arguments)
+    first = innersea.getEpocDay(1, 1, 4707)
+    assert query.findNext(first) is None
+    assert list(search.DateQuery(**arguments).search(first)) == []
+
+def test_searchWithNoEnd():
+    query = search.DateQuery(weekdays=[ "Fireday" ], phases=[ "New Moon" ])
+    start = innersea.getEpocDay(15, 3, 4707)
+    found = query.findNext(start)
+    assert found == next(d for d in range(start + 1, start + 1000) if query.matches(d))
+    assert search.describeDay(found) == "4707-5-23 Fireday, New Moon"
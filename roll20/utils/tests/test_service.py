@@ -0,0 +1,86 @@
+# -*- coding: UTF-8 -*-
+#
+# Tests for the calendar HTTP service.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import asyncio
+import json
+
+import pytest
+
+from calendars import innersea
+from calendars import render
+from calendars import service
+
+def test_day():
+    status, headers, body = service.CalendarService().respond("GET", "/day/4707/3/5", {})
+    assert status == 200
+    assert headers["Content-Type"] == service.CONTENT_TYPES["json"]
+    assert headers["ETag"].startswith('"')
+    assert json.loads(body.decode("utf-8")) == innersea.getDayData(innersea.getEpocDay(5, 3, 4707))
+
+@pytest.mark.parametrize("target,expected", [ ("/month/4712/2?format=dokuwiki", render.innerSeaCalendar(2, 4712)),
+                                              ("/month/4712/2?format=html", render.innerSeaCalendar(2, 4712, True)) ])
+def test_month(target, expected):
+    status, headers, body = service.CalendarService().respond("GET", target, {})
+    assert status == 200
+    assert body.decode("utf-8") == expected
+
+def test_year():
+    status, headers, body = service.CalendarService().respond("GET", "/year/-5", {})
+    assert status == 200
+    assert len(json.loads(body.decode("utf-8"))) == 365
+
+def test_notModified():
+    calendar = service.CalendarService()
+    status, headers, body = calendar.respond("GET", "/month/4707/3", {})
+    etag = headers["ETag"]
+    status, headers, body = calendar.respond("GET", "/month/4707/3", { "if-none-match": '"other", ' + etag })
+    assert (status, headers, body) == (304, { "ETag": etag }, b"")
+    assert (calendar.hits, calendar.misses) == (1, 1)
+    assert calendar.respond("GET", "/month/4707/3", { "if-none-match": '"other"' })[0] == 200
+
+@pytest.mark.parametrize("target,status", [ ("/month/4707/13", 404),
+                                            ("/day/4707/2/29", 404),
+                                            ("/day/4707/0/1", 404),
+                                            ("/day/4707/x/1", 404),
+                                            ("/week/4707/1", 404),
+                                            ("/month/4707/3?format=pdf", 400),
+                                            ("/year/4707?format=xml", 400) ])
+def test_errors(target, status):
+    found, headers, body = service.CalendarService().respond("GET", target, {})
+    assert found == status
+    assert headers["Content-Type"] == "text/plain"
+    assert body
+
+def test_onlyGet():
+    assert service.CalendarService().respond("POST", "/day/4707/3/5", {})[0] == 405
+
+def test_cacheSize():
+    calendar = service.CalendarService(cacheSize=2)
+    for day in (1, 2, 3, 1):
+        calendar.respond("GET", "/day/4707/3/%d" % day, {})
+    assert list(calendar.cache) == [ "/day/4707/3/3", "/day/4707/3/1" ]
+    assert calendar.misses == 4
+
+# Two requests on one keep-alive connection.
+def test_handle():
+    async def run():
+        server = await asyncio.start_server(service.CalendarService().handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GET /day/4707/3/5 HTTP/1.1\r\nHost: x\r\n\r\n" +
+                         b"GET /month/4707/13 HTTP/1.1\r\nConnection: close\r\n\r\n")
+            response = await reader.read()
+            writer.close()
+            return response
+    response = asyncio.run(run())
+    assert response.startswith(b"HTTP/1.1 200 OK\r\n")
+    assert b"HTTP/1.1 404 Not Found\r\n" in response
+    assert response.endswith(b"Month must be 1 - 12\n")
@@ -0,0 +1,118 @@
+# -*- coding: UTF-8 -*-
+#
+# Round trip tests for the calendar engine, over random dates either side of
+# year 1. The dates come from a seeded generator, so a failure can always be
+# repeated.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from calendars import imperium
+from calendars import innersea
+from calendars import render
+from calendars import system
+
+# Number of years either side of 1 that random dates are taken from.
+SPAN = 10000000
+
+# A calendar with holidays between months, a leap year and a five day week,
+# which neither of the real calendars has. Holidays are fixed days of the
+# year, so the leap day goes after the last of them.
+TEST_DEFINITION = { "name": "Test",
+                    "era": "TE",
+                    "months": None,
+                    "monthDays": [ 30, 30, 30, 30 ],
+                    "leapDays": [ 30, 30, 30, 31 ],
+                    "leapYear": 4,
+                    "week": [ "One", "Two", "Three", "Four", "Five" ],
+                    "holidays": [ (1, "New Year"), (62, "Midyear") ],
+                    "epochWeekday": 3 }
+
+SYSTEMS = [ innersea.SYSTEM, imperium.SYSTEM, system.CalendarSystem(TEST_DEFINITION) ]
+
+@pytest.mark.parametrize("calendar", SYSTEMS, ids=lambda s: s.name)
+@pytest.mark.parametrize("seed", range(0, 5))
+def test_roundTrips(calendar, seed):
+    assert system.checkRoundTrips(calendar, 2000, -SPAN, SPAN, seed) == []
+
+@pytest.mark.parametrize("calendar", SYSTEMS, ids=lambda s: s.name)
+def test_roundTripsNearYearOne(calendar):
+    assert system.checkRoundTrips(calendar, 5000, -20, 20, 1) == []
+
+@pytest.mark.parametrize("calendar", SYSTEMS, ids=lambda s: s.name)
+def test_everyDayAroundYearOne(calendar):
+    start = calendar.getYearStart(-calendar.leapYear)
+    end = calendar.getYearStart(calendar.leapYear + 1)
+    for epocDay in range(start, end):
+        year, month, day, weekday = calendar.getDate(epocDay)
+        assert calendar.getEpocDay(day, month, year) == epocDay
+        assert calendar.getEpocDayOfWeek(epocDay) == weekday
+
+def test_negativeYears():
+    assert innersea.getDate(0) == (0, 12, 31, 7)
+    assert innersea.getEpocDay(1, 1, 0) == -365
+    assert innersea.getDate(innersea.getEpocDay(1, 1, -5293))[:3] == (-5293, 1, 1)
+    assert imperium.SYSTEM.getDate(imperium.SYSTEM.getYearStart(-1)) == (-1, 0, 1, 0)
+
+def test_fiveDayWeek():
+    calendar = SYSTEMS[2]
+    previous = None
+    for epocDay in range(calendar.getYearStart(-3), calendar.getYearStart(5)):
+        weekday = calendar.getEpocDayOfWeek(epocDay)
+        assert 0 <= weekday <= 5
+        assert calendar.getDate(epocDay)[3] == weekday
+        if (weekday):
+            if (previous):
+                assert weekday == previous % 5 + 1
+            previous = weekday
+    assert calendar.getEpocDayOfWeek(calendar.getEpocDay(1, 1, 1)) == 3
+
+@pytest.mark.parametrize("html", [ False, True ])
+def test_fiveDayWeekRows(html):
+    text = "".join(SYSTEMS[2].monthFragments(1, 1, html))
+    if (html):
+        rows = text.split("<tr>\n")[1:]
+        assert [ row.count("<td>") for row in rows ] == [ 5, 5, 5, 5, 5, 5, 2 ]
+    else:
+        rows = text.splitlines()[3:]
+        assert rows[0] == "| | |  1 \\\\ \\\\ |  2 \\\\ \\\\ |  3 \\\\ \\\\ |"
+        assert [ row.count("|") for row in rows ] == [ 6, 6, 6, 6, 6, 6, 3, 6 ]
+
+# Months used to be followed by an empty "|" row if they ended on the last
+# day of the week. Arodus 4707 ends on a Sunday, and Rova 4707 doesn't.
+@pytest.mark.parametrize("month, lastRow", [
+    (8, "|  25 🌓\\\\ \\\\ |  26 🌓\\\\ \\\\ |  27 🌓\\\\ \\\\ |  28 🌓\\\\ \\\\ |  29 🌔\\\\ \\\\ |  30 🌔\\\\ \\\\ |  31 🌔\\\\ \\\\ |"),
+    (9, "|  29 🌔\\\\ \\\\ |  30 🌔\\\\ \\\\ |") ])
+def test_noEmptyRowAfterMonth(month, lastRow):
+    rows = render.innerSeaCalendar(month, 4707).splitlines()
+    assert "|" not in rows
+    assert rows[-2] == lastRow
+    assert rows[-1] == "|" + " +++++++++++ |" * 7
+
+def test_imperiumMonthsEndOnSenday():
+    rows = render.imperiumCalendar(13, year=1105).splitlines()
+    assert "|" not in rows
+    assert rows[-2] == "| 359 \\\\ | 360 \\\\ | 361 \\\\ | 362 \\\\ | 363 \\\\ | 364 \\\\ | 365 \\\\ |"
+    assert rows[-1] == "|" + " +++++++++++ |" * 7
+
+def test_imperiumHtmlRows():
+    text = render.imperiumCalendar(3, html=True, year=1105)
+    assert text.count("<tr>") == 5
+    assert text.count("</tr>") == 5
+    assert "<tr>\n<td> 058 </td>\n" in text
+
+# Only checkRoundTrips() needs random, so importing the calendars doesn't.
+def test_noRandomImport():
+    code = "import sys, calendars.innersea, calendars.imperium, calendars.render; print('random' in sys.modules)"
+    result = subprocess.run([ sys.executable, "-c", code ], stdout=subprocess.PIPE, universal_newlines=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert result.stdout == "False\n"
@@ -0,0 +1,104 @@
+# -*- coding: UTF-8 -*-
+#
+# Tests for event timelines, and for rendering them from many threads at once.
+#
+# Copyright (c) 2017, Samuel Penn
+# All rights reserved.
+#
+# Distributed under the BSD licence, see inner_sea_calendar.py for details.
+#
+
+import random
+
+import pytest
+
+from calendars import export
+from calendars import imperium
+from calendars import innersea
+from calendars import render
+from calendars import timeline
+
+EVENTS = """# Test events
+4707-1-1 New year
+4707-3-15 Session 12
+4707-3-20..4707-3-24 Midsummer fair
+4707-12-30..4708-1-2 Long party
+4704-2-29 Leap day
+"""
+
+IMPERIUM_EVENTS = """1105-0-1 Holiday
+1105-3-1..1105-3-7 Refit
+"""
+
+# Every event that overlaps first to last, found by looking at them all.
+def slowBetween(events, first, last):
+    return sorted((e for e in events if e.start <= last and e.end >= first), key=lambda e: (e.start, e.end))
+
+def randomTimeline(count, seed):
+    rng = random.Random(seed)
+    events = []
+    for i in range(0, count):
+        start = rng.randint(0, 5000)
+        events.append(timeline.Event(start, start + rng.randint(0, 60), "Event " + str(i)))
+    return events
+
+def test_between():
+    events = randomTimeline(2000, 1)
+    line = timeline.Timeline(events)
+    rng = random.Random(2)
+    for i in range(0, 200):
+        first = rng.randint(-100, 5100)
+        last = first + rng.randint(0, 40)
+        assert line.between(first, last) == slowBetween(events, first, last)
+
+def test_addKeepsIndex():
+    events = randomTimeline(300, 3)
+    line = timeline.Timeline()
+    for event in events:
+        line.add(event.start, event.end, event.title)
+        assert line.starts == sorted(line.starts)
+    assert len(line) == 300
+    for first in range(-10, 5100, 37):
+        found = [ e.title for e in line.between(first, first + 20) ]
+        assert sorted(found) == sorted(e.title for e in slowBetween(events, first, first + 20))
+
+def test_queriesDontChangeTimeline():
+    line = timeline.Timeline(randomTimeline(100, 4))
+    state = (list(line.events), list(line.starts), list(line.maxEnds), line.size)
+    line.between(0, 5000)
+    line.byDay(100, 200)
+    line.on(50)
+    assert (line.events, line.starts, line.maxEnds, line.size) == state
+
+def test_badEvent():
+    with pytest.raises(ValueError):
+        timeline.Timeline().add(10, 9, "Backwards")
+
+def test_loadTimeline(tmp_path):
+    path = tmp_path / "events.txt"
+    path.write_text(EVENTS, encoding="utf-8")
+    line = timeline.loadTimeline(innersea.SYSTEM, str(path))
+    assert len(line) == 5
+    assert [ e.title for e in line.on(innersea.getEpocDay(22, 3, 4707)) ] == [ "Midsummer fair" ]
+    assert [ e.title for e in line.on(innersea.getEpocDay(1, 1, 4708)) ] == [ "Long party" ]
+
+    path.write_text("4707-2-30 No such day\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="events.txt:1"):
+        timeline.loadTimeline(innersea.SYSTEM, str(path))
+
+@pytest.mark.parametrize("calendar, system, text, years", [
+    ("innersea", innersea.SYSTEM, EVENTS, range(4703, 4709)),
+    ("imperium", imperium.SYSTEM, IMPERIUM_EVENTS, range(1103, 1108)) ])
+@pytest.mark.parametrize("html", [ False, True ])
+def test_threadedMatchesSerial(tmp_path, calendar, system, text, years, html):
+    path = tmp_path / "events.txt"
+    path.write_text(text, encoding="utf-8")
+    context = render.RenderContext(calendar, html, events=timeline.loadTimeline(system, str(path)))
+
+    serial = [ context.renderPage(year) for year in years ]
+    assert list(export.renderPages(context, years, workers=8)) == serial
+    assert "Session 12" in "".join(serial) or "Refit" in "".join(serial)
+
+    months = [ (month, year) for year in years for month in range(1, context.getMonthCount() + 1) ]
+    serialMonths = [ context.renderMonth(month, year) for month, year in months ]
+    assert list(export.renderMonths(context, months, workers=8)) == serialMonths